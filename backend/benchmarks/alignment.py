@@ -0,0 +1,57 @@
+"""
+Date alignment of many tickers: pandas Series indexed by "%Y-%m-%d" strings
+(the old Covariance route path) vs utils.alignReturns on int day numbers.
+
+    cd backend && python -m benchmarks.alignment
+"""
+import time
+import numpy as np
+import pandas as pd
+from utils.alignReturns import _align_returns, _aligned_moments
+
+
+def _series(n, T=1300, seed=0):
+    """n tickers with ragged histories over the last T business days."""
+    rng = np.random.default_rng(seed)
+    all_days = pd.bdate_range(end="2025-06-30", periods=T)
+    out = []
+    for _ in range(n):
+        start = rng.integers(0, T // 4)
+        keep = np.sort(rng.choice(np.arange(start, T), size=T - start - rng.integers(0, 20), replace=False))
+        d = all_days[keep]
+        out.append((d.strftime("%Y-%m-%d").tolist(),
+                    d.values.astype("datetime64[D]").astype(np.int32),
+                    rng.normal(0.0004, 0.01, size=d.size)))
+    return out
+
+
+def _time(fn, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        out = fn()
+    return (time.perf_counter() - t0) / repeat, out
+
+
+def main(sizes=(50, 500), repeat=3):
+    for n in sizes:
+        data = _series(n)
+
+        def pandas_path(how):
+            df = pd.DataFrame({j: pd.Series(r, index=s) for j, (s, _, r) in enumerate(data)})
+            if how == "intersection":
+                df = df.dropna()
+            return df.cov().to_numpy()
+
+        def engine_path(how):
+            _, X = _align_returns([(d, r) for _, d, r in data], how=how)
+            return _aligned_moments(X, how=how)[1]
+
+        for how in ("intersection", "pairwise"):
+            t_pd, c_pd = _time(lambda: pandas_path(how), repeat)
+            t_np, c_np = _time(lambda: engine_path(how), repeat)
+            print(f"n={n:4d} {how:12s} pandas {t_pd*1e3:8.1f} ms  engine {t_np*1e3:7.1f} ms  "
+                  f"x{t_pd / t_np:5.1f}  max|diff| {np.nanmax(np.abs(c_pd - c_np)):.1e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+HRP against the SLSQP min-variance solve (long-only, 50% liquid-share
+target) on synthetic factor returns, for large selections:
+
+    cd backend && python -m benchmarks.allocation --sizes 100 250 500 1000 --days 252 1250
+
+With fewer days than tickers the sample covariance is singular, which is
+where SLSQP tends to stall. Reports runtime, convergence and the in-sample
+volatility each method reaches.
+"""
+import argparse
+import json
+import sys
+
+from benchmarks.suite import _synthetic_returns, _liquid_mask, _time, _metadata
+import numpy as np
+from utils.qpCore import PortfolioQP
+from utils.hrpPortfolio import _hrp_weights
+from utils.getOptimalPortfolio import _project_w_ge_target
+
+SIZES = (100, 250, 500, 1000)
+DAYS = (252, 1250)
+TARGET = 0.5
+
+
+def _bench(n, days, repeat, budget):
+    X = _synthetic_returns(n, T=days)
+    Sigma = np.cov(X, rowvar=False)
+    mask = _liquid_mask(n)
+    qp = PortfolioQP(Sigma, X.mean(axis=0))
+    out = {}
+
+    def hrp():
+        out["hrp"] = _project_w_ge_target(_hrp_weights(Sigma), mask, TARGET)
+
+    def slsqp():
+        w0 = _project_w_ge_target(np.ones(n) / n, mask, TARGET)
+        out["slsqp"] = qp.min_variance(w0, constraints=[qp.budget_constraint(), qp.liquidity_constraint(mask, TARGET)])
+
+    cases = []
+    for name, fn in (("hrp", hrp), ("slsqp", slsqp)):
+        timing = _time(fn, repeat, warmup=0, budget=budget)
+        w = out[name] if name == "hrp" else out[name].x
+        cases.append({
+            "method": name, "n": n, "days": days, **timing,
+            "converged": True if name == "hrp" else bool(out[name].success),
+            "iterations": None if name == "hrp" else int(out[name].nit),
+            "volatility": float(np.sqrt(max(w @ Sigma @ w, 0.0) * 252)),
+            "liquid_share": float(w @ mask),
+        })
+    return cases
+
+
+def run(sizes=SIZES, days=DAYS, repeat=3, budget=60.0, log=print):
+    results = []
+    for T in days:
+        for n in sizes:
+            for c in _bench(n, T, repeat, budget):
+                log(f"days={T:5d} n={n:5d}  {c['method']:<6} median {c['median_s'] * 1e3:10.1f} ms  "
+                    f"converged={c['converged']!s:<5} vol {c['volatility'] * 100:6.2f}%  liquid {c['liquid_share']:.2f}")
+                results.append(c)
+    return {"meta": _metadata(), "results": results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark HRP against SLSQP min-variance.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--days", type=int, nargs="+", default=list(DAYS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget", type=float, default=60.0, help="seconds per case before it stops repeating")
+    parser.add_argument("--output", help="write the JSON results here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, args.days, args.repeat, args.budget, log=lambda m: print(m, file=sys.stderr))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
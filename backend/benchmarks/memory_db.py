@@ -0,0 +1,136 @@
+"""
+In-memory stand-in for the handful of pymongo calls the read paths make, so
+endpoint benchmarks run without a Mongo server:
+
+    from benchmarks.memory_db import _install_memory_db
+    db = _install_memory_db()        # before anything imports db_config
+"""
+import copy
+import sys
+import types
+import uuid
+
+
+def _matches(doc, query):
+    for key, cond in (query or {}).items():
+        value = doc.get(key)
+        if isinstance(cond, dict) and any(k.startswith("$") for k in cond):
+            for op, arg in cond.items():
+                if op == "$in" and value not in arg:
+                    return False
+                if op == "$nin" and value in arg:
+                    return False
+                if op == "$ne" and value == arg:
+                    return False
+        elif value != cond:
+            return False
+    return True
+
+
+def _project(doc, projection):
+    if not projection:
+        return copy.deepcopy(doc)
+    include = {k for k, v in projection.items() if v and k != "_id"}
+    if include:
+        out = {k: copy.deepcopy(doc[k]) for k in include if k in doc}
+    else:
+        out = {k: copy.deepcopy(v) for k, v in doc.items() if projection.get(k, 1)}
+    if projection.get("_id", 1) and "_id" in doc:
+        out["_id"] = doc["_id"]
+    return out
+
+
+class MemoryCollection:
+    def __init__(self):
+        self._docs = []
+
+    def _find(self, query, sort=None):
+        docs = [d for d in self._docs if _matches(d, query)]
+        for key, direction in reversed(sort or []):
+            docs.sort(key=lambda d: (d.get(key) is not None, d.get(key)), reverse=direction < 0)
+        return docs
+
+    def find(self, query=None, projection=None, sort=None):
+        return [_project(d, projection) for d in self._find(query, sort)]
+
+    def find_one(self, query=None, projection=None, sort=None):
+        docs = self._find(query, sort)
+        return _project(docs[0], projection) if docs else None
+
+    def count_documents(self, query):
+        return len(self._find(query))
+
+    def insert_one(self, doc):
+        doc.setdefault("_id", uuid.uuid4().hex)
+        self._docs.append(copy.deepcopy(doc))
+        return types.SimpleNamespace(inserted_id=doc["_id"])
+
+    def insert_many(self, docs):
+        return types.SimpleNamespace(inserted_ids=[self.insert_one(d).inserted_id for d in docs])
+
+    def _update(self, query, update, upsert, many):
+        docs = self._find(query)
+        if not docs and upsert:
+            doc = {k: v for k, v in query.items() if not isinstance(v, dict)}
+            self.insert_one(doc)
+            docs = [self._docs[-1]]
+        for d in docs if many else docs[:1]:
+            d.update(copy.deepcopy(update.get("$set", {})))
+            for key, spec in update.get("$push", {}).items():
+                values = d.setdefault(key, [])
+                values.extend(copy.deepcopy(spec["$each"]) if isinstance(spec, dict) else [copy.deepcopy(spec)])
+                if isinstance(spec, dict) and spec.get("$slice") is not None:
+                    d[key] = values[spec["$slice"]:] if spec["$slice"] < 0 else values[:spec["$slice"]]
+        return types.SimpleNamespace(matched_count=len(docs), modified_count=len(docs if many else docs[:1]))
+
+    def update_one(self, query, update, upsert=False):
+        return self._update(query, update, upsert, many=False)
+
+    def update_many(self, query, update, upsert=False):
+        return self._update(query, update, upsert, many=True)
+
+    def replace_one(self, query, doc, upsert=False):
+        matched = self._find(query)[:1]
+        if not matched and not upsert:
+            return types.SimpleNamespace(matched_count=0)
+        self._docs = [d for d in self._docs if d not in matched]
+        self.insert_one({**{k: v for k, v in query.items() if not isinstance(v, dict)}, **doc})
+        return types.SimpleNamespace(matched_count=len(matched))
+
+    def bulk_write(self, requests, ordered=True):
+        """UpdateOne requests only (what the ingest and refresh writes send)."""
+        matched = sum(self.update_one(r._filter, r._doc, upsert=r._upsert).matched_count for r in requests)
+        return types.SimpleNamespace(matched_count=matched, modified_count=matched)
+
+    def find_one_and_update(self, query, update, upsert=False):
+        before = self.find_one(query)
+        self._update(query, update, upsert, many=False)
+        return before
+
+    def delete_many(self, query):
+        keep = [d for d in self._docs if not _matches(d, query)]
+        deleted, self._docs = len(self._docs) - len(keep), keep
+        return types.SimpleNamespace(deleted_count=deleted)
+
+    def create_index(self, *args, **kwargs):
+        return None
+
+
+class MemoryDatabase:
+    def __init__(self):
+        self._collections = {}
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name):
+        return self._collections.setdefault(name, MemoryCollection())
+
+
+def _install_memory_db():
+    """Register an in-memory `db_config` module; must run before the app modules are imported."""
+    db = MemoryDatabase()
+    sys.modules["db_config"] = types.SimpleNamespace(db=db)
+    return db
@@ -0,0 +1,61 @@
+"""
+Min-variance solve: previous path (DataFrame covariance, sqrt objective,
+finite-difference gradients) vs PortfolioQP (NumPy covariance, scaled
+variance objective, analytic gradients).
+
+    cd backend && python -m benchmarks.qp_core
+"""
+import time
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize
+from utils.portfolioRisk import _portfolio_risk
+from utils.qpCore import PortfolioQP
+
+
+def _returns(n, T=1250, seed=0):
+    rng = np.random.default_rng(seed)
+    A = rng.normal(size=(n, n)) * 0.01
+    return pd.DataFrame(rng.normal(size=(T, n)) @ A + rng.normal(0.0004, 0.002, size=n))
+
+
+def _old_path(df, m_liq, t_liq):
+    Sigma = df.cov()
+    n = df.shape[1]
+    constraints = [
+        {'type': 'eq', 'fun': lambda x: np.sum(x) - 1.0},
+        {'type': 'ineq', 'fun': lambda x, m=m_liq, t=t_liq: float(np.dot(x, m) - t)},
+    ]
+    return minimize(_portfolio_risk, np.ones(n) / n, args=(Sigma,), method="SLSQP",
+                    constraints=constraints, bounds=((0.0, 1.0),) * n,
+                    options={"ftol": 1e-9, "disp": False, "maxiter": 1000})
+
+
+def _new_path(df, m_liq, t_liq):
+    qp = PortfolioQP(df.cov().to_numpy(), df.mean())
+    n = df.shape[1]
+    constraints = [qp.budget_constraint(), qp.liquidity_constraint(m_liq, t_liq)]
+    return qp.min_variance(np.ones(n) / n, constraints=constraints), qp
+
+
+def main(sizes=(5, 20, 40, 100), repeat=3):
+    for n in sizes:
+        df = _returns(n)
+        m_liq = (np.arange(n) % 2 == 0).astype(float)
+
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            old = _old_path(df, m_liq, 0.5)
+        t_old = (time.perf_counter() - t0) / repeat
+
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            new, qp = _new_path(df, m_liq, 0.5)
+        t_new = (time.perf_counter() - t0) / repeat
+
+        print(f"n={n:4d}  old {t_old*1e3:9.1f} ms  new {t_new*1e3:8.1f} ms  "
+              f"speedup x{t_old / t_new:6.1f}  risk old {old.fun:.6e} new {qp.risk(new.x):.6e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Throughput of _get_optimal_portfolio under concurrent callers as the solver
+pool grows from 1 to N processes, against inline solving (SOLVER_WORKERS=0)
+on the same threads:
+
+    cd backend && python -m benchmarks.solver_scaling --n 100 --requests 24 --clients 8
+
+Each request uses a different liquidity target so that no two are identical.
+Reports requests/s, median and p95 latency, and the speedup over one worker.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.suite import _seed_securities, _metadata
+import numpy as np
+import utils.solverPool as solver_pool
+from utils.getOptimalPortfolio import _get_optimal_portfolio
+
+
+def _configure(workers, inflight):
+    """Swap in a fresh pool of `workers` processes (0 = inline) and `inflight` admission slots."""
+    if solver_pool._POOL is not None:
+        solver_pool._POOL.shutdown(wait=True)
+        solver_pool._POOL = None
+    solver_pool.SOLVER_WORKERS = workers
+    solver_pool._SLOTS = solver_pool.threading.BoundedSemaphore(inflight)
+
+
+def _run_level(tickers, requests, clients):
+    labels = {t: ("liquid" if i % 2 == 0 else "illiquid") for i, t in enumerate(tickers)}
+    targets = np.linspace(10, 60, requests)
+
+    def one(target):
+        t0 = time.perf_counter()
+        _, status = _get_optimal_portfolio(tickers, {}, 3.0, "fixed", target, labels)
+        if status != 200:
+            raise RuntimeError(f"optimal portfolio returned {status}")
+        return time.perf_counter() - t0
+
+    one(targets[0])    # start the pool's processes outside the timing
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as ex:
+        latencies = np.array(list(ex.map(one, targets)))
+    wall = time.perf_counter() - start
+    return {"requests": requests, "clients": clients, "wall_s": wall, "throughput_rps": requests / wall,
+            "median_s": float(np.median(latencies)), "p95_s": float(np.percentile(latencies, 95))}
+
+
+def run(n=100, requests=24, clients=8, max_workers=None, log=print):
+    tickers = [f"B{i:04d}" for i in range(n)]
+    _seed_securities(tickers)
+    levels = [0] + [w for w in (1, 2, 4, 8, 16, 32) if w <= (max_workers or os.cpu_count() or 1)]
+    results = []
+    for workers in levels:
+        _configure(workers, inflight=max(clients, 1))
+        r = {"workers": workers, **_run_level(tickers, requests, clients)}
+        results.append(r)
+        log(f"workers={workers:2d}  {r['throughput_rps']:7.2f} req/s  median {r['median_s'] * 1e3:9.1f} ms"
+            f"  p95 {r['p95_s'] * 1e3:9.1f} ms")
+    base = next((r["throughput_rps"] for r in results if r["workers"] == 1), None)
+    for r in results:
+        r["speedup_vs_1"] = r["throughput_rps"] / base if base else None
+    _configure(0, inflight=solver_pool.SOLVER_MAX_INFLIGHT)
+    return {"meta": {**_metadata(), "n": n}, "results": results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure solver-pool throughput scaling.")
+    parser.add_argument("--n", type=int, default=100, help="tickers per request")
+    parser.add_argument("--requests", type=int, default=24)
+    parser.add_argument("--clients", type=int, default=8, help="concurrent callers")
+    parser.add_argument("--max-workers", type=int, help="largest pool to try (default: CPU count)")
+    parser.add_argument("--output", help="write the JSON results here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    report = run(args.n, args.requests, args.clients, args.max_workers, log=lambda m: print(m, file=sys.stderr))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
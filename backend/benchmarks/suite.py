@@ -0,0 +1,279 @@
+"""
+Benchmark suite for the optimization and frontier hot paths.
+
+Times covariance construction, the min-variance solve, frontier generation
+at several num_points and end-to-end endpoint latency (Flask test client on
+an in-memory Mongo stand-in, seeded from FakePriceProvider) for synthetic
+correlated returns, and writes the results as JSON:
+
+    cd backend && python -m benchmarks.suite --output bench.json
+    cd backend && python -m benchmarks.suite --baseline bench.json --tolerance 0.25
+
+With --baseline, cases whose median got slower than baseline * (1 + tolerance)
+are listed and the exit status is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+# isolate the app from the real database, rate sources and covariance store
+from benchmarks.memory_db import _install_memory_db
+_DB = _install_memory_db()
+os.environ.setdefault("RATE_PROVIDER", "fake")
+os.environ.setdefault("COV_STORE_DIR", tempfile.mkdtemp(prefix="covstore-bench-"))
+
+import numpy as np
+import pandas as pd
+import scipy
+from utils.alignReturns import _aligned_moments
+from utils.covEstimators import _estimate_covariance
+from utils.qpCore import PortfolioQP
+from utils.getOptimalPortfolio import _project_w_ge_target
+from utils.getEfficientFrontier import _compute_efficient_frontier, _frontier_corners
+from utils.priceProvider import FakePriceProvider
+from utils.returnsCodec import SCHEMA_VERSION, _encode_returns, _encode_dates
+from utils.returnsPanel import _invalidate_returns_panel
+
+SIZES = (5, 20, 100, 500)
+NUM_POINTS = (50, 200, 1000)
+SCHEMA = 1
+# Per-case time budget: slow cases (N=500 solves) stop repeating once it is spent
+BUDGET_SECONDS = 30.0
+
+
+def _synthetic_returns(n, T=1250, factors=3, seed=0):
+    """(T, n) daily returns with a few common factors, so the covariance is realistically correlated."""
+    rng = np.random.default_rng(seed)
+    k = min(factors, n)
+    F = rng.normal(0.0, 0.01, size=(T, k))
+    L = rng.normal(0.5, 0.3, size=(n, k))
+    eps = rng.normal(0.0, 0.01, size=(T, n)) * rng.uniform(0.5, 1.5, size=n)
+    return F @ L.T + eps + rng.normal(0.0003, 0.0002, size=n)
+
+
+def _liquid_mask(n):
+    return (np.arange(n) % 2 == 0).astype(np.float64)
+
+
+def _time(fn, repeat, warmup=1, budget=BUDGET_SECONDS):
+    """Timings of fn() after `warmup` calls; stops early (after at least one sample) once `budget` seconds are spent."""
+    start = time.perf_counter()
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+        if time.perf_counter() - start > budget:
+            break
+    samples = np.asarray(samples)
+    return {"repeat": int(samples.size), "min_s": float(samples.min()),
+            "median_s": float(np.median(samples)), "mean_s": float(samples.mean())}
+
+
+# --- cases ---
+
+def _bench_covariance(n, X, repeat):
+    out = []
+    for name, fn in (
+        ("covariance/sample", lambda: _aligned_moments(X, how="intersection")),
+        ("covariance/pairwise", lambda: _aligned_moments(X, how="pairwise")),
+        ("covariance/ledoit_wolf", lambda: _estimate_covariance(X, "ledoit_wolf")),
+        ("covariance/factor", lambda: _estimate_covariance(X, "factor")),
+    ):
+        out.append({"name": name, "n": n, "params": {"T": X.shape[0]}, **_time(fn, repeat)})
+    return out
+
+
+def _bench_min_variance(n, mu, Sigma, repeat):
+    m = _liquid_mask(n)
+    w0 = _project_w_ge_target(np.ones(n) / n, m, 0.5)
+    bounds = ((0.0, 1.0),) * n
+
+    def solve():
+        qp = PortfolioQP(Sigma, mu)
+        return qp.min_variance(w0, constraints=[qp.budget_constraint(), qp.liquidity_constraint(m, 0.5)],
+                               bounds=bounds)
+
+    res = solve()     # also the warm-up call
+    rng = np.random.default_rng(n)
+    W = rng.random((64, n))
+    return [
+        {"name": "min_variance", "n": n, "params": {"liquidity_target": 0.5},
+         "converged": bool(res.success), **_time(solve, repeat, warmup=0)},
+        {"name": "project_w_ge_target", "n": n, "params": {"batch": W.shape[0]},
+         **_time(lambda: [_project_w_ge_target(w, m, 0.7) for w in W], repeat)},
+    ]
+
+
+def _bench_frontier(n, tickers, mu, Sigma, num_points, repeat):
+    qp = PortfolioQP(Sigma, mu)
+    bounds = ((0.0, 1.0),) * n
+    res = qp.min_variance(np.ones(n) / n, constraints=[qp.budget_constraint()], bounds=bounds)
+    min_var_port = {"Optimal Weights": res.x, "Return": float(res.x @ mu), "Risk": qp.risk(res.x)}
+
+    out = [{"name": "frontier/corners", "n": n, "params": {},
+            **_time(lambda: _frontier_corners(tickers, mu, Sigma, bounds), repeat)}]
+    corners = _frontier_corners(tickers, mu, Sigma, bounds)
+    for p in num_points:
+        fn = lambda: _compute_efficient_frontier(tickers, mu, Sigma, min_var_port, num_points=p,
+                                                 bounds=bounds, corners=corners, qp=qp)
+        out.append({"name": "frontier/points", "n": n, "params": {"num_points": p}, **_time(fn, repeat)})
+    return out
+
+
+def _seed_securities(tickers):
+    """Replace the stand-in collection with FakePriceProvider histories for `tickers`."""
+    provider = FakePriceProvider(as_of="2025-06-30")
+    log_ret = np.log(provider.download(tickers, period="5y")).diff()
+    docs = []
+    for i, t in enumerate(tickers):
+        col = log_ret[t].dropna()
+        docs.append({
+            "ticker": t,
+            "long_name": t,
+            "schema_version": SCHEMA_VERSION,
+            "close_date": _encode_dates(col.index.values),
+            "daily_return": _encode_returns(col.to_numpy()),
+            "fetched_on": "2025-06-30 22:00:00",
+            "liquidity_label": "liquid" if i % 2 == 0 else "illiquid",
+        })
+    _DB.securities.delete_many({})
+    _DB.securities.insert_many(docs)
+    _invalidate_returns_panel()
+
+
+def _bench_endpoints(n, client, repeat):
+    tickers = [f"B{i:04d}" for i in range(n)]
+    _seed_securities(tickers)
+    labels = {t: ("liquid" if i % 2 == 0 else "illiquid") for i, t in enumerate(tickers)}
+    payload = {"tickers": tickers, "weights": {t: 1.0 / n for t in tickers}, "riskFree": 3.0,
+               "riskFree_Type": "fixed", "liquidityFactor": 50, "labels": labels,
+               "cache": False}    # time the solve, not the result cache
+    query = "/api/securities/Covariance&Correlation?" + "&".join(f"tickers={t}" for t in tickers)
+
+    def optimal():
+        r = client.post("/api/securities/optimal_portfolio", json=payload)
+        if r.status_code != 200:
+            raise RuntimeError(f"optimal_portfolio returned {r.status_code}: {r.get_data(as_text=True)[:200]}")
+
+    def covariance():
+        r = client.get(query)
+        if r.status_code != 200:
+            raise RuntimeError(f"Covariance route returned {r.status_code}")
+
+    return [
+        {"name": "endpoint/optimal_portfolio", "n": n, "params": {"liquidity_target": 0.5}, **_time(optimal, repeat)},
+        {"name": "endpoint/covariance", "n": n, "params": {}, **_time(covariance, repeat)},
+    ]
+
+
+# --- driver ---
+
+def _metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=Path(__file__).resolve().parent).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "schema": SCHEMA,
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def run(sizes=SIZES, num_points=NUM_POINTS, repeat=5, endpoints=True, log=print):
+    results = []
+    client = None
+    if endpoints:
+        from server import app
+        client = app.test_client()
+
+    for n in sizes:
+        X = _synthetic_returns(n)
+        mu = X.mean(axis=0)
+        Sigma = np.cov(X, rowvar=False)
+        tickers = [f"S{i:04d}" for i in range(n)]
+
+        cases = _bench_covariance(n, X, repeat)
+        cases += _bench_min_variance(n, mu, Sigma, repeat)
+        cases += _bench_frontier(n, tickers, pd.Series(mu, index=tickers), Sigma, num_points, repeat)
+        if client is not None:
+            cases += _bench_endpoints(n, client, repeat)
+        for c in cases:
+            log(f"n={n:4d}  {c['name']:<28} {json.dumps(c['params']):<28} median {c['median_s'] * 1e3:10.2f} ms")
+        results += cases
+
+    return {"meta": _metadata(), "results": results}
+
+
+def _case_key(case):
+    return case["name"], case["n"], json.dumps(case["params"], sort_keys=True)
+
+
+def _compare(current, baseline, tolerance):
+    """Cases slower than baseline median * (1 + tolerance)."""
+    base = {_case_key(c): c for c in baseline["results"]}
+    regressions = []
+    for c in current["results"]:
+        b = base.get(_case_key(c))
+        if b is None or b["median_s"] <= 0:
+            continue
+        ratio = c["median_s"] / b["median_s"]
+        c["baseline_median_s"] = b["median_s"]
+        c["ratio"] = ratio
+        if ratio > 1.0 + tolerance:
+            regressions.append(c)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the optimization and frontier hot paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--num-points", type=int, nargs="+", default=list(NUM_POINTS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-endpoints", action="store_true", help="skip the end-to-end endpoint cases")
+    parser.add_argument("--output", help="write the JSON results here (default: stdout)")
+    parser.add_argument("--baseline", help="earlier JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before flagging (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    log = lambda msg: print(msg, file=sys.stderr)
+    report = run(args.sizes, args.num_points, args.repeat, endpoints=not args.no_endpoints, log=log)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = _compare(report, json.load(f), args.tolerance)
+        report["regressions"] = [{"name": c["name"], "n": c["n"], "params": c["params"], "ratio": c["ratio"]}
+                                 for c in regressions]
+        for c in regressions:
+            log(f"REGRESSION n={c['n']} {c['name']} {c['params']}: x{c['ratio']:.2f} vs baseline")
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Tail-risk engine and mean-CVaR LP on synthetic factor returns:
+
+    cd backend && python -m benchmarks.tail_risk --points 500 --scenarios 1250 5000 --sizes 50 200
+
+"evaluate" times historical VaR/CVaR for `points` portfolios at once (one
+product + np.partition) against a per-portfolio full sort. "mean_cvar"
+times the HiGHS LP of the minimum-CVaR portfolio as the scenario count grows,
+and "frontier" a mean-CVaR frontier warm-started on one highspy model
+against one fresh linprog solve per target (when highspy is installed).
+"""
+import argparse
+import json
+import sys
+
+from benchmarks.suite import _synthetic_returns, _time, _metadata
+import numpy as np
+import utils.tailRisk as tail_risk
+from utils.tailRisk import _historical_tail, _mean_cvar_lp, _solve_mean_cvar, _mean_cvar_frontier
+
+SIZES = (50, 200)
+SCENARIOS = (1250, 5000)
+POINTS = 500
+ALPHAS = (0.95, 0.99)
+FRONTIER_POINTS = 20
+
+
+def _sorted_tail(X, W, alphas):
+    """Reference: one full sort per portfolio."""
+    var, cvar = np.empty((len(alphas), len(W))), np.empty((len(alphas), len(W)))
+    for j, w in enumerate(W):
+        r = np.sort(X @ w)
+        for i, a in enumerate(alphas):
+            k = max(1, int(np.ceil(round((1 - a) * r.size, 9))))
+            var[i, j], cvar[i, j] = -r[k - 1], -r[:k].mean()
+    return var, cvar
+
+
+def _bench(n, T, points, repeat, budget):
+    X = _synthetic_returns(n, T=T)
+    W = np.random.default_rng(0).dirichlet(np.ones(n), points)
+    cases = []
+    for name, fn in (("evaluate/partition", lambda: _historical_tail(X, W, ALPHAS)),
+                     ("evaluate/sort_loop", lambda: _sorted_tail(X, W, ALPHAS))):
+        cases.append({"case": name, "n": n, "scenarios": T, "points": points, **_time(fn, repeat, budget=budget)})
+
+    out = {}
+
+    def solve():
+        out["res"] = _solve_mean_cvar(_mean_cvar_lp(X, 0.95))
+
+    timing = _time(solve, repeat, warmup=0, budget=budget)
+    cases.append({"case": "mean_cvar/highs", "n": n, "scenarios": T, **timing,
+                  "converged": bool(out["res"].success), "iterations": int(out["res"].nit)})
+
+    lp = _mean_cvar_lp(X, 0.95)
+    mu = X.mean(axis=0)
+    targets = np.linspace(float(out["res"].x[:n] @ mu), float(mu.max()), FRONTIER_POINTS)
+    targets -= 1e-12 * np.abs(targets)
+    highspy = tail_risk.highspy
+    for name, model in (("frontier/warm_highspy", highspy), ("frontier/linprog", None)):
+        if name == "frontier/warm_highspy" and highspy is None:
+            continue
+        tail_risk.highspy = model
+        try:
+            timing = _time(lambda: _mean_cvar_frontier(lp, targets), repeat, warmup=0, budget=budget)
+        finally:
+            tail_risk.highspy = highspy
+        cases.append({"case": name, "n": n, "scenarios": T, "points": FRONTIER_POINTS, **timing})
+    return cases
+
+
+def run(sizes=SIZES, scenarios=SCENARIOS, points=POINTS, repeat=3, budget=60.0, log=print):
+    results = []
+    for T in scenarios:
+        for n in sizes:
+            for c in _bench(n, T, points, repeat, budget):
+                log(f"scenarios={T:6d} n={n:5d}  {c['case']:<20} median {c['median_s'] * 1e3:10.1f} ms")
+                results.append(c)
+    return {"meta": _metadata(), "results": results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark historical VaR/CVaR and the mean-CVaR LP.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--scenarios", type=int, nargs="+", default=list(SCENARIOS))
+    parser.add_argument("--points", type=int, default=POINTS, help="portfolios evaluated together")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget", type=float, default=60.0, help="seconds per case before it stops repeating")
+    parser.add_argument("--output", help="write the JSON results here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, args.scenarios, args.points, args.repeat, args.budget,
+                 log=lambda m: print(m, file=sys.stderr))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
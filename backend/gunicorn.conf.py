@@ -0,0 +1,16 @@
+from os import getenv
+
+# Import the app once in the master and build the shared returns panel there
+# (when_ready runs before any worker is forked), so pre-forked workers inherit
+# the panel's pages copy-on-write instead of each loading the whole
+# securities collection.
+preload_app = True
+workers = int(getenv("WEB_CONCURRENCY", "2"))
+
+
+def when_ready(server):
+    from server import _warm_returns_panel
+    _warm_returns_panel()
+
+# Each worker starts its own solver process pool on first use (utils/solverPool.py),
+# so the box runs up to workers * SOLVER_WORKERS solver processes.
@@ -0,0 +1,25 @@
+from datetime import timedelta
+from flask import Blueprint, jsonify
+from db_config import db
+from pymongo import ASCENDING
+from utils.jobRunner import _get_job, _cancel_job
+
+# finished or not, job documents are dropped a week after submission
+db.jobs.create_index([("created_at", ASCENDING)], expireAfterSeconds=int(timedelta(days=7).total_seconds()))
+job_bp = Blueprint("job_bp", __name__)
+
+
+@job_bp.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = _get_job(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job), 200
+
+
+@job_bp.route("/jobs/<job_id>", methods=["DELETE"])
+def cancel_job(job_id):
+    job = _cancel_job(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job), 202 if job["status"] not in ("cancelled", "succeeded", "failed") else 200
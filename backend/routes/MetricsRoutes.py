@@ -0,0 +1,10 @@
+from flask import Blueprint, Response
+from utils.instrumentation import _render_metrics
+
+metrics_bp = Blueprint("metrics_bp", __name__)
+
+
+# Prometheus scrape endpoint; metrics are per process, so each gunicorn worker reports its own
+@metrics_bp.route("/metrics", methods=["GET"])
+def get_metrics():
+    return Response(_render_metrics(), mimetype="text/plain; version=0.0.4")
@@ -1,7 +1,24 @@
 from flask import Blueprint, jsonify, request
 from utils.fetchAndStore import _fetch_and_store_security
 from utils.getSecurityInfo import _get_security_info
-from utils.getOptimalPortfolio import _get_optimal_portfolio
+from utils.getOptimalPortfolio import _get_optimal_portfolio, _get_optimal_portfolio_cached
+from utils.resultCache import _invalidate_results
+from utils.scenarioBatch import _run_scenarios
+from utils.portfolioCloud import _portfolio_cloud
+from utils.backtest import _run_backtest
+from utils.rollingCovariance import _get_rolling_covariance
+from utils.tailRisk import _get_tail_risk, _get_mean_cvar_portfolio, TAIL_CONFIDENCES
+from utils.streamFrontier import _stream_optimal_portfolio, STREAM_NUM_POINTS, STREAM_BATCH_SIZE
+from utils.returnsPanel import _invalidate_returns_panel
+from utils.covarianceStore import _schedule_covariance_rebuild, _stored_moments
+from utils.refreshSecurities import _refresh_securities
+from utils.ingestPipeline import _ingest_securities, INGEST_BATCH_SIZE, INGEST_MAX_WORKERS
+from utils.jobRunner import _submit_job
+from utils.alignReturns import ALIGNMENTS, _aligned_moments, _corr_from_cov
+from utils.covEstimators import ESTIMATORS, DEFAULT_FACTORS, FactorCovariance, _estimate_covariance
+from utils.bulkReads import _returns_matrix, MissingTickersError
+from utils.instrumentation import _stage
+from utils.responseEncoding import FORMATS, _response_format, _json_response, _stream_format, _stream_response
 import numpy as np
 from pathlib import Path
 import json
@@ -12,6 +29,17 @@ import pandas as pd
 db.securities.create_index([("ticker", ASCENDING)], unique=True)
 security_bp = Blueprint("security_bp", __name__)
 
+
+def _wants_async(data=None):
+    flag = request.args.get("async") or (data or {}).get("async")
+    return str(flag).lower() in ("1", "true", "yes")
+
+
+def _accepted(job_id):
+    """202 response pointing at the job's status endpoint."""
+    status_url = f"/api/jobs/{job_id}"
+    return jsonify({"job_id": job_id, "status": "queued", "status_url": status_url}), 202, {"Location": status_url}
+
 # Route to post new securities in the db.
 @security_bp.route("/securities", methods=["POST"])
 def post_new_security():
@@ -60,55 +88,105 @@ def get_covariance_correlation_matrix():
         if not tickers:
             return jsonify({"error": "Tickers are required as query parameters."}), 400
 
-        sec_ret = {}
-
-        # Fetch daily returns for each ticker
-        for ticker in tickers:
-            security_data = db.securities.find_one({"ticker": ticker})
-
-            if not security_data:
-                # If the security is not found in the database, fetch and save it
-                result = post_new_security(ticker)
-                security_data = db.securities.find_one({"ticker": ticker})  # Fetch again after insertion
-
-            if not security_data or 'daily_return' not in security_data:
-                return jsonify({"error": f"Data for {ticker} could not be retrieved"}), 404
-
-            # Store daily returns along with their dates (assuming they are stored like this)
-            daily_returns = security_data["daily_return"]
-            dates = security_data["close_date"]  # Assuming 'dates' field exists
-
-            # Add to the dictionary with the date as the index
-            sec_ret[ticker] = pd.Series(data=daily_returns, index=dates[-len(daily_returns):])
-        
-        min_l = min(len(sec_ret[ticker]) for ticker in sec_ret.keys())
-        adj_sec_ret = {ticker: sec_ret[ticker][:min_l] for ticker in sec_ret.keys()}
-
-        # Create a DataFrame from the dictionary, aligning by dates and filling missing data with NaN
-        to_covary = pd.DataFrame(adj_sec_ret).fillna(value=np.nan)
-
-
-        # Check if there are sufficient data points to compute covariance and correlation matrices
-        if to_covary.empty or to_covary.shape[1] < 2:
+        # Estimator: sample (default), ledoit_wolf or a K-factor PCA model
+        estimator = request.args.get('estimator', 'sample')
+        factors = request.args.get('factors', DEFAULT_FACTORS, type=int)
+        if estimator not in ESTIMATORS:
+            return jsonify({"error": f"Unknown covariance estimator '{estimator}', expected one of {ESTIMATORS}."}), 400
+
+        # Date alignment: pairwise-complete (default for the sample estimator) or common dates only,
+        # optionally windowed; the other estimators need a complete matrix
+        alignment = request.args.get('alignment', 'pairwise' if estimator == 'sample' else 'intersection')
+        window = request.args.get('window', type=int)
+        if alignment not in ALIGNMENTS:
+            return jsonify({"error": f"Unknown alignment '{alignment}', expected one of {ALIGNMENTS}."}), 400
+        if estimator != 'sample' and alignment != 'intersection':
+            return jsonify({"error": f"The '{estimator}' estimator needs alignment 'intersection'."}), 400
+
+        tickers = list(dict.fromkeys(tickers))
+        if len(tickers) < 2:
             return jsonify({"error": "Not enough data to compute covariance or correlation matrices."}), 400
 
-        # Calculate covariance and correlation matrices
-        covariance_matrix = to_covary.cov()
-        correlation_matrix = to_covary.corr()
+        # Full-history pairwise statistics come straight from the precomputed store
+        stored = _stored_moments(tickers) if estimator == "sample" and alignment == "pairwise" and not window else None
+        factor_model = None
+        if stored is not None:
+            sub, version = stored
+            cov, corr = sub["cov"], sub["corr"]
+        else:
+            # Fetch daily returns for all tickers in one round trip, aligned by date
+            try:
+                _, X = _returns_matrix(tickers, how=alignment, window=window)
+            except MissingTickersError as e:
+                response, status_code = e.to_response()
+                return jsonify(response), status_code
+
+            # Check if there are sufficient data points to compute covariance and correlation matrices
+            if X.shape[0] < 2:
+                return jsonify({"error": "Not enough data to compute covariance or correlation matrices."}), 400
+
+            # Calculate covariance and correlation matrices
+            with _stage("covariance"):
+                if estimator == "sample":
+                    _, cov, corr = _aligned_moments(X, how=alignment)
+                else:
+                    cov = _estimate_covariance(X, estimator, factors)
+                    if isinstance(cov, FactorCovariance):
+                        factor_model = {"loadings": cov.B.tolist(), "specific_var": cov.d.tolist()}
+                        cov = cov.dense()
+                    corr = _corr_from_cov(cov)
+            version = None
 
         # Prepare the response data
         response_data = {
             "tickers": tickers,
-            "covariance_matrix": covariance_matrix.to_json(orient="split"),  # Convert to list for JSON serialization
-            "correlation_matrix": correlation_matrix.to_json(orient="split")  # Convert to list for JSON serialization
+            "version": version,   # covariance store version, None when computed on the fly
+            "estimator": estimator,
+            "factor_model": factor_model,
         }
+        if _response_format() == "columnar":
+            # plain nested arrays in `tickers` order
+            response_data["covariance_matrix"] = cov
+            response_data["correlation_matrix"] = corr
+        else:
+            # legacy: pandas "split" JSON strings embedded in the JSON
+            response_data["covariance_matrix"] = pd.DataFrame(cov, index=tickers, columns=tickers).to_json(orient="split")
+            response_data["correlation_matrix"] = pd.DataFrame(corr, index=tickers, columns=tickers).to_json(orient="split")
 
-        return jsonify(response_data), 200
+        with _stage("serialize"):
+            return _json_response(response_data, 200)
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
 
+@security_bp.route("/securities/rolling_covariance", methods=["GET"])
+def get_rolling_covariance():
+    """
+    Rolling correlation (or covariance) matrices over the tickers' shared dates:
+    ?tickers=A&tickers=B&window=60&step=5[&halflife=30][&kind=covariance][&layout=full][&maxMatrices=250]
+    """
+    try:
+        tickers = request.args.getlist('tickers')
+        if not tickers:
+            return jsonify({"error": "Tickers are required as query parameters."}), 400
+
+        result, status_code = _get_rolling_covariance(
+            tickers,
+            window=request.args.get('window', 60, type=int),
+            step=request.args.get('step', 5, type=int),
+            halflife=request.args.get('halflife', type=float),
+            kind=request.args.get('kind', 'correlation'),
+            layout=request.args.get('layout', 'upper'),
+            max_matrices=request.args.get('maxMatrices', type=int),
+        )
+        with _stage("serialize"):
+            return _json_response(result, status_code)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @security_bp.route("/securities/optimal_portfolio", methods=["POST"])
 def get_optimal_portfolio():
     try:
@@ -124,15 +202,278 @@ def get_optimal_portfolio():
         risk_free_type = data.get('riskFree_Type', 0.03)
         liquidity_factor = data.get('liquidityFactor',0.5)
         labels_override = data.get('labelsOverride') or data.get('labels') or {}
+        alignment = data.get('alignment', 'intersection')
+        align_window = data.get('alignWindow')
+        cov_estimator = data.get('covEstimator', 'sample')
+        factors = data.get('factors', DEFAULT_FACTORS)
+        frontier_format = data.get('format') if data.get('format') in FORMATS else _response_format()
+        # "min_variance" (SLSQP) or "hrp"; {"includeFrontier": false} returns the allocation only
+        method = data.get('method', 'min_variance')
+        include_frontier = data.get('includeFrontier', True) is not False
+        # {"cache": false} forces a fresh solve
+        optimize = _get_optimal_portfolio_cached if data.get('cache', True) is not False else _get_optimal_portfolio
 
         # Ensure tickers array is populated
         if not tickers:
             return jsonify({"error": "Tickers array is not populated!"}), 400
 
+        # Large selections can run as a background job: 202 + /api/jobs/<id>
+        if _wants_async(data):
+            job_id = _submit_job("optimal_portfolio", optimize,
+                                 tickers, weights, risk_free, risk_free_type, liquidity_factor, labels_override,
+                                 alignment, align_window, cov_estimator, factors, frontier_format,
+                                 method=method, include_frontier=include_frontier)
+            return _accepted(job_id)
+
         # Call the function to calculate the optimal portfolio
-        result, status_code = _get_optimal_portfolio(tickers, weights, risk_free, risk_free_type, liquidity_factor,labels_override)
+        result, status_code = optimize(tickers, weights, risk_free, risk_free_type, liquidity_factor,labels_override,
+                                                     alignment, align_window, cov_estimator, factors, frontier_format,
+                                                     method=method, include_frontier=include_frontier)
+
+        with _stage("serialize"):
+            return _json_response(result, status_code)
+
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+
+@security_bp.route("/securities/optimal_portfolio/stream", methods=["POST"])
+def stream_optimal_portfolio():
+    """
+    optimal_portfolio streamed as NDJSON (default) or Server-Sent Events
+    (?stream=sse or Accept: text/event-stream): the min-variance result first,
+    then the max-Sharpe portfolio, the corner portfolios and the frontier points
+    coarse to fine, and a closing "summary" message. Extra fields:
+    "numPoints" (500) and "batchSize" (128 points per message).
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not data:
+            return jsonify({"error": "Request must contain JSON data"}), 400
+
+        tickers = data.get('tickers', [])
+        if not tickers:
+            return jsonify({"error": "Tickers array is not populated!"}), 400
+
+        messages, error = _stream_optimal_portfolio(
+            tickers,
+            data.get('weights') or {},
+            data.get('riskFree', 0.03),
+            data.get('riskFree_Type', 0.03),
+            liquidity_factor=data.get('liquidityFactor', 0.5),
+            labels_override=data.get('labelsOverride') or data.get('labels') or {},
+            alignment=data.get('alignment', 'intersection'),
+            align_window=data.get('alignWindow'),
+            cov_estimator=data.get('covEstimator', 'sample'),
+            factors=data.get('factors', DEFAULT_FACTORS),
+            num_points=data.get('numPoints', STREAM_NUM_POINTS),
+            batch_size=data.get('batchSize', STREAM_BATCH_SIZE),
+            method=data.get('method', 'min_variance'),
+        )
+        if error:
+            return _json_response(*error)
+        return _stream_response(messages, _stream_format())
+
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+
+@security_bp.route("/securities/optimal_portfolio/batch", methods=["POST"])
+def get_optimal_portfolio_batch():
+    """
+    Many scenarios over one ticker set in one call:
+    {"tickers": [...], "scenarios": [{"name", "liquidityFactor", "riskFree", "riskFree_Type",
+    "bounds"}, ...], "includeFrontier": true, ...}; the other fields are as for optimal_portfolio
+    and act as scenario defaults where they overlap.
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not data:
+            return jsonify({"error": "Request must contain JSON data"}), 400
+
+        tickers = data.get('tickers', [])
+        scenarios = data.get('scenarios') or []
+        if not tickers:
+            return jsonify({"error": "Tickers array is not populated!"}), 400
+        if not isinstance(scenarios, list):
+            return jsonify({"error": "scenarios must be a list."}), 400
+
+        kwargs = {
+            "weights": data.get('weights') or {},
+            "risk_free": data.get('riskFree', 0.03),
+            "risk_free_type": data.get('riskFree_Type'),
+            "liquidity_factor": data.get('liquidityFactor'),
+            "labels_override": data.get('labelsOverride') or data.get('labels') or {},
+            "alignment": data.get('alignment', 'intersection'),
+            "align_window": data.get('alignWindow'),
+            "cov_estimator": data.get('covEstimator', 'sample'),
+            "factors": data.get('factors', DEFAULT_FACTORS),
+            "include_frontier": data.get('includeFrontier', True) is not False,
+            "frontier_format": data.get('format') if data.get('format') in FORMATS else _response_format(),
+        }
+
+        if _wants_async(data):
+            return _accepted(_submit_job("optimal_portfolio_batch", _run_scenarios, tickers, scenarios,
+                                         with_progress=True, **kwargs))
+
+        result, status_code = _run_scenarios(tickers, scenarios, **kwargs)
+        with _stage("serialize"):
+            return _json_response(result, status_code)
+
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+
+@security_bp.route("/securities/portfolio_cloud", methods=["POST"])
+def get_portfolio_cloud():
+    """
+    Monte Carlo cloud of random long-only portfolios for the chart background:
+    {"tickers": [...], "samples": 100000, "alpha": 1.0, "liquidityFactor", "labels",
+    "bins": 60, "maxPoints": 2000, "seed", ...}. Returns a binned density and a
+    bounded point sample, whatever the sample count.
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not data:
+            return jsonify({"error": "Request must contain JSON data"}), 400
+
+        tickers = data.get('tickers', [])
+        if not tickers:
+            return jsonify({"error": "Tickers array is not populated!"}), 400
+
+        kwargs = {
+            "samples": data.get('samples', 100000),
+            "alpha": data.get('alpha', 1.0),
+            "risk_free": data.get('riskFree', 0.03),
+            "risk_free_type": data.get('riskFree_Type'),
+            "liquidity_factor": data.get('liquidityFactor'),
+            "labels_override": data.get('labelsOverride') or data.get('labels') or {},
+            "liquidity_factor": data.get('liquidityFactor'),
+            "bins": data.get('bins', 60),
+            "max_points": data.get('maxPoints', 2000),
+            "seed": data.get('seed'),
+            "alignment": data.get('alignment', 'intersection'),
+            "align_window": data.get('alignWindow'),
+            "cov_estimator": data.get('covEstimator', 'sample'),
+            "factors": data.get('factors', DEFAULT_FACTORS),
+        }
 
-        return jsonify(result), status_code
+        if _wants_async(data):
+            return _accepted(_submit_job("portfolio_cloud", _portfolio_cloud, tickers,
+                                         with_progress=True, **kwargs))
+
+        result, status_code = _portfolio_cloud(tickers, **kwargs)
+        with _stage("serialize"):
+            return _json_response(result, status_code)
+
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+
+@security_bp.route("/securities/backtest", methods=["POST"])
+def backtest_portfolio():
+    """
+    Walk-forward backtest: {"tickers": [...], "window": 252, "rebalance": "monthly" | <days>,
+    "method": "min_variance" | "max_sharpe" | "equal_weight", "liquidityFactor", "labels",
+    "costBps": 0, ...}. Long runs can go async with progress.
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not data:
+            return jsonify({"error": "Request must contain JSON data"}), 400
+
+        tickers = data.get('tickers', [])
+        if not tickers:
+            return jsonify({"error": "Tickers array is not populated!"}), 400
+
+        kwargs = {
+            "window": data.get('window', 252),
+            "rebalance": data.get('rebalance', 'monthly'),
+            "method": data.get('method', 'min_variance'),
+            "liquidity_factor": data.get('liquidityFactor'),
+            "labels_override": data.get('labelsOverride') or data.get('labels') or {},
+            "risk_free": data.get('riskFree', 0.03),
+            "risk_free_type": data.get('riskFree_Type'),
+            "cov_estimator": data.get('covEstimator', 'sample'),
+            "factors": data.get('factors', DEFAULT_FACTORS),
+            "cost_bps": data.get('costBps', 0.0),
+        }
+
+        if _wants_async(data):
+            return _accepted(_submit_job("backtest", _run_backtest, tickers, with_progress=True, **kwargs))
+
+        result, status_code = _run_backtest(tickers, **kwargs)
+        with _stage("serialize"):
+            return _json_response(result, status_code)
+
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+
+@security_bp.route("/securities/tail_risk", methods=["POST"])
+def get_tail_risk():
+    """
+    Historical and parametric one-day VaR/CVaR: {"tickers": [...], "weights": {ticker: w}
+    (equal weights if empty), "confidence": [0.95, 0.99], "window": <days>,
+    "includeFrontier": false, "numPoints": 100}. With includeFrontier every
+    efficient-frontier point gets the same figures, as columns.
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not data:
+            return jsonify({"error": "Request must contain JSON data"}), 400
+
+        tickers = data.get('tickers', [])
+        if not tickers:
+            return jsonify({"error": "Tickers array is not populated!"}), 400
+
+        result, status_code = _get_tail_risk(
+            tickers,
+            weights=data.get('weights') or {},
+            alphas=data.get('confidence', TAIL_CONFIDENCES),
+            window=data.get('window'),
+            include_frontier=data.get('includeFrontier', False) is True,
+            num_points=data.get('numPoints', 100),
+        )
+        with _stage("serialize"):
+            return _json_response(result, status_code)
+
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+
+@security_bp.route("/securities/mean_cvar", methods=["POST"])
+def get_mean_cvar_portfolio():
+    """
+    Minimum-CVaR portfolio (a linear program over the historical scenarios):
+    {"tickers": [...], "alpha": 0.95, "targetReturn": <annual %>, "liquidityFactor",
+    "labels", "window": <days>, "maxWeight": 1.0, "numPoints": 0 (mean-CVaR frontier)}.
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not data:
+            return jsonify({"error": "Request must contain JSON data"}), 400
+
+        tickers = data.get('tickers', [])
+        if not tickers:
+            return jsonify({"error": "Tickers array is not populated!"}), 400
+
+        kwargs = {
+            "alpha": data.get('alpha', 0.95),
+            "target_return": data.get('targetReturn'),
+            "liquidity_factor": data.get('liquidityFactor'),
+            "labels_override": data.get('labelsOverride') or data.get('labels') or {},
+            "window": data.get('window'),
+            "max_weight": data.get('maxWeight', 1.0),
+            "num_points": data.get('numPoints', 0),
+        }
+
+        if _wants_async(data):
+            return _accepted(_submit_job("mean_cvar", _get_mean_cvar_portfolio, tickers, with_progress=True, **kwargs))
+
+        result, status_code = _get_mean_cvar_portfolio(tickers, **kwargs)
+        with _stage("serialize"):
+            return _json_response(result, status_code)
 
     except Exception as e:
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
@@ -234,26 +575,15 @@ def bulk_from_file():
                 "sample": items[:5]
             }), 200
 
-        results = []
-        for it in items:
-            tkr = it["ticker"]
-            label = it.get("label")
-            proxy_category = it.get("proxy_category")
-
-            # fetch & store
-            try:
-                resp, status = _fetch_and_store_security(tkr)
-            except Exception as e:
-                resp, status = {"error": str(e)}, 500
-
-            # tag metadata
-            db.securities.update_one(
-                {"ticker": tkr},
-                {"$set": {"liquidity_label": label, "proxy_category": proxy_category}},
-                upsert=True
-            )
+        # batched download / info lookups / bulk writes
+        options = {
+            "batch_size": request.args.get("batch_size", INGEST_BATCH_SIZE, type=int),
+            "max_workers": request.args.get("concurrency", INGEST_MAX_WORKERS, type=int),
+        }
+        if _wants_async():
+            return _accepted(_submit_job("bulk_from_file", _ingest_securities, items, with_progress=True, **options))
 
-            results.append({"ticker": tkr, "status": int(status)})
+        results = _ingest_securities(items, **options)
 
         # ✅ Always return a response here
         return jsonify({
@@ -269,6 +599,29 @@ def bulk_from_file():
 
 
 
+@security_bp.route("/securities/refresh", methods=["POST"])
+def refresh_securities():
+    """
+    Incrementally refresh stored securities: download only the days after each
+    ticker's last close_date and append them to its rolling 5-year window.
+    Optional JSON body: {"tickers": [...]} (defaults to every stored security).
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        tickers = data.get("tickers") or None
+
+        results = _refresh_securities(tickers)
+        return jsonify({
+            "status": "ok",
+            "count": len(results),
+            "updated": sum(1 for r in results if r["status"] == "updated"),
+            "conflicts": sum(1 for r in results if r["status"] == "conflict"),
+            "results": results
+        }), 200
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
 @security_bp.route("/securities/wipe", methods=["POST"])
 def wipe_securities():
     """
@@ -276,6 +629,9 @@ def wipe_securities():
     """
     try:
         res = db.securities.delete_many({})
+        _invalidate_returns_panel()
+        _invalidate_results()
+        _schedule_covariance_rebuild()
         return jsonify({
             "status": "ok",
             "deleted_count": res.deleted_count
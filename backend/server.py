@@ -2,6 +2,11 @@ from flask import Flask
 from flask_cors import CORS
 from db_config import db  # Import the MongoDB connection from your db_config file
 from routes.SecurityRoutes import security_bp  # Import your security routes blueprint
+from routes.JobRoutes import job_bp
+from routes.MetricsRoutes import metrics_bp
+from utils.instrumentation import _init_instrumentation
+from utils.returnsPanel import _get_returns_panel
+import logging
 
 # Initialize the Flask app
 app = Flask(__name__)
@@ -17,6 +22,23 @@ CORS(app, resources={
 })
 # Register the blueprint for security-related routes
 app.register_blueprint(security_bp, url_prefix='/api')
+app.register_blueprint(job_bp, url_prefix='/api')
+app.register_blueprint(metrics_bp, url_prefix='/api')
+
+# Per-stage Server-Timing headers, latency histograms and opt-in request profiling
+_init_instrumentation(app)
+
+
+def _warm_returns_panel():
+    """
+    Build the shared returns panel up front. Called by the gunicorn master
+    (gunicorn.conf.py) or under __main__ below, never at import: spawn-started
+    solver processes re-import the main module and must not load the panel.
+    """
+    try:
+        _get_returns_panel()
+    except Exception as e:
+        logging.warning("Returns panel not preloaded: %s", e)
 
 # Root route for health check or welcome message
 @app.route('/')
@@ -36,4 +58,5 @@ def internal_error(error):
 
 # Run the app
 if __name__ == "__main__":
+    _warm_returns_panel()
     app.run(debug=True)
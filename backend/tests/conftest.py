@@ -0,0 +1,57 @@
+"""
+Tests run from backend/ (python -m pytest tests) against the in-memory Mongo
+stand-in, installed here before any app module imports db_config.
+"""
+import os
+import tempfile
+
+import numpy as np
+import pytest
+
+from benchmarks.memory_db import _install_memory_db
+
+_DB = _install_memory_db()
+os.environ.setdefault("RATE_PROVIDER", "fake")
+os.environ.setdefault("COV_STORE_DIR", tempfile.mkdtemp(prefix="covstore-test-"))
+
+AS_OF = "2025-06-30"
+
+
+@pytest.fixture
+def db():
+    """The stand-in database, emptied before each test."""
+    from utils.returnsPanel import _invalidate_returns_panel
+    for name in list(_DB._collections):
+        _DB[name].delete_many({})
+    _invalidate_returns_panel()
+    return _DB
+
+
+@pytest.fixture
+def seed(db):
+    """
+    seed(tickers, liquid=(), provider=None) stores five years of FakePriceProvider
+    log returns per ticker (schema 2) and returns the provider.
+    """
+    from utils.priceProvider import FakePriceProvider
+    from utils.returnsCodec import SCHEMA_VERSION, _encode_returns, _encode_dates
+    from utils.returnsPanel import _invalidate_returns_panel
+
+    def _seed(tickers, liquid=(), provider=None, fetched_on="2025-06-30 22:00:00"):
+        provider = provider or FakePriceProvider(as_of=AS_OF)
+        prices = provider.download(tickers, period="5y")
+        for t in tickers:
+            col = np.log(prices[t].dropna()).diff().dropna()
+            db.securities.insert_one({
+                "ticker": t,
+                "long_name": t,
+                "schema_version": SCHEMA_VERSION,
+                "close_date": _encode_dates(col.index.values),
+                "daily_return": _encode_returns(col.to_numpy()),
+                "fetched_on": fetched_on,
+                "liquidity_label": "liquid" if t in liquid else "illiquid",
+            })
+        _invalidate_returns_panel()
+        return provider
+
+    return _seed
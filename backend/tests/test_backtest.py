@@ -0,0 +1,44 @@
+import numpy as np
+
+from utils.backtest import _hold
+
+
+def _compounded(X, starts, W):
+    """Reference: price paths exp(cumsum) of the log returns, held period by period."""
+    T, n = X.shape
+    prices = np.exp(np.vstack([np.zeros((1, n)), np.cumsum(X, axis=0)]))   # row t + 1 = close of day t
+    ends = np.append(starts[1:], T)
+    value, level = [], 1.0
+    for k, (s, e) in enumerate(zip(starts, ends)):
+        units = level * W[k] / prices[s]            # bought at the close before the period
+        value.extend(prices[s + 1:e + 1] @ units)
+        level = value[-1]
+    value = np.array(value)
+    return value / np.append(1.0, value[:-1]) - 1.0, value
+
+
+def test_hold_compounds_log_returns():
+    rng = np.random.default_rng(7)
+    T, n = 5 * 252, 6
+    X = rng.normal(0.0002, 0.02, size=(T, n))       # daily log returns, 2% volatility
+    starts = np.arange(0, T, 21)
+    W = rng.dirichlet(np.ones(n), starts.size)
+
+    ret, drift = _hold(X, starts, W)
+    expected_ret, expected_value = _compounded(X, starts, W)
+
+    np.testing.assert_allclose(ret, expected_ret, rtol=0, atol=1e-12)
+    np.testing.assert_allclose(np.cumprod(1.0 + ret)[-1], expected_value[-1], rtol=1e-10)
+    # weights drifted to each period's last close
+    prices = np.exp(np.cumsum(X, axis=0))
+    last = np.append(starts[1:], T) - 1
+    base = np.exp(np.vstack([np.zeros((1, n)), np.cumsum(X, axis=0)]))[starts]
+    held = W * prices[last] / base
+    np.testing.assert_allclose(drift, held / held.sum(axis=1, keepdims=True), rtol=1e-10)
+
+
+def test_single_asset_buy_and_hold_ends_at_price_ratio():
+    rng = np.random.default_rng(1)
+    X = rng.normal(0.0, 0.02, size=(1260, 1))
+    ret, _ = _hold(X, np.array([0]), np.ones((1, 1)))
+    assert np.isclose(np.cumprod(1.0 + ret)[-1], np.exp(X.sum()), rtol=1e-10)
@@ -0,0 +1,108 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+import utils.covarianceStore as cov_store
+import utils.refreshSecurities as refresh
+from utils.covarianceStore import _build_covariance_store, _get_covariance_store, _stored_moments
+from utils.getOptimalPortfolio import _load_moments
+from utils.priceProvider import FakePriceProvider
+from utils.refreshSecurities import _refresh_securities
+from utils.returnsPanel import _get_returns_panel
+
+TICKERS = ["CA", "CB", "CC", "CD"]
+
+
+def _pointer():
+    with open(cov_store.COV_STORE_DIR / cov_store._POINTER, encoding="utf-8") as f:
+        return json.load(f)["version"]
+
+
+def _sample(tickers, provider):
+    """Reference moments from a fresh download: common-date log returns and np.cov."""
+    lo = provider.as_of - pd.DateOffset(years=5)
+    X = np.log(provider.download(tickers, start=lo)).diff().iloc[1:].dropna().to_numpy()
+    return X.mean(axis=0), np.cov(X, rowvar=False)
+
+
+def test_store_slices_match_the_sample_covariance(seed):
+    provider = seed(TICKERS)
+    built = _build_covariance_store()
+
+    assert built == {"version": _pointer(), "tickers": len(TICKERS)}
+    store = _get_covariance_store()
+    assert store.version == built["version"]
+    assert store.signature == _get_returns_panel().signature
+
+    picked = ["CC", "CA", "CD"]
+    sub, version = _stored_moments(picked, common_dates_only=True)
+    mu, Sigma = _sample(picked, provider)
+    assert version == built["version"]
+    np.testing.assert_allclose(sub["mean"], mu, rtol=1e-12, atol=0)
+    np.testing.assert_allclose(sub["cov"], Sigma, rtol=1e-10, atol=0)
+    np.testing.assert_allclose(np.diag(sub["corr"]), 1.0)
+
+    moments, error = _load_moments(picked)
+    assert error is None
+    assert moments[2] == built["version"]
+    np.testing.assert_allclose(moments[1], Sigma, rtol=1e-10, atol=0)
+
+
+def test_refresh_bumps_the_version_and_the_pointer(seed, monkeypatch):
+    monkeypatch.setattr(refresh, "_schedule_covariance_rebuild", _build_covariance_store)
+    seed(TICKERS, provider=FakePriceProvider(as_of="2025-06-20"), fetched_on="2025-06-20 22:00:00")
+    first = _build_covariance_store()["version"]
+
+    results = _refresh_securities(TICKERS, provider=FakePriceProvider(as_of="2025-06-30"), window=10_000)
+
+    assert {r["status"] for r in results} == {"updated"}
+    second = _pointer()
+    assert second > first
+    store = _get_covariance_store()
+    assert store.version == second and store.signature == _get_returns_panel().signature
+    sub, version = _stored_moments(TICKERS, common_dates_only=True)
+    assert version == second
+    # the rebuilt store includes the new days
+    _, X = _get_returns_panel().matrix(TICKERS)
+    np.testing.assert_allclose(sub["cov"], np.cov(X, rowvar=False), rtol=1e-10, atol=0)
+    assert int(sub["counts"][0, 0]) == X.shape[0]
+
+
+def test_stale_store_is_not_served(seed, db):
+    seed(TICKERS)
+    _build_covariance_store()
+    assert _stored_moments(TICKERS) is not None
+
+    # another writer changes the collection: the panel signature moves on, the store is stale
+    db.securities.update_one({"ticker": "CA"}, {"$set": {"fetched_on": "2025-07-01 06:00:00"}})
+    _get_returns_panel(force=True)
+    assert _stored_moments(TICKERS) is None
+    moments, error = _load_moments(TICKERS)
+    assert error is None and moments[2] is None
+
+
+def test_pairwise_counts_that_differ_fall_back_for_intersection(seed):
+    closed = ["2023-03-01", "2024-07-02", "2025-02-14"]
+    seed(TICKERS, provider=FakePriceProvider(as_of="2025-06-30", closed={"CB": closed}))
+    version = _build_covariance_store()["version"]
+
+    # intersection alignment would need common-date statistics, which the pairwise store does not hold
+    assert _stored_moments(TICKERS, common_dates_only=True) is None
+    moments, error = _load_moments(TICKERS, alignment="intersection")
+    assert error is None
+    mu, Sigma, cov_version = moments
+    assert cov_version is None
+    _, X = _get_returns_panel().matrix(TICKERS, how="intersection")
+    np.testing.assert_allclose(Sigma, np.cov(X, rowvar=False), rtol=1e-12, atol=0)
+
+    # pairwise alignment is served from the store, and equals DataFrame.cov on the gapped panel
+    moments, error = _load_moments(TICKERS, alignment="pairwise")
+    assert error is None and moments[2] == version
+    frame = pd.DataFrame(_get_returns_panel().matrix(TICKERS, how="pairwise")[1], columns=TICKERS)
+    np.testing.assert_allclose(moments[1], frame.cov().to_numpy(), rtol=1e-10, atol=0)
+    assert not np.allclose(moments[1], Sigma, rtol=1e-6, atol=0)
+
+    # pairs that do not involve CB still share every date, so they are sliced from the store
+    sub, v = _stored_moments(["CA", "CC", "CD"], common_dates_only=True)
+    assert v == version
@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+
+import utils.criticalLine as critical_line
+from utils.criticalLine import _critical_line, _interpolate_frontier
+from utils.getEfficientFrontier import _frontier_columns
+from utils.qpCore import PortfolioQP
+
+BOUNDS = {
+    "long_only": lambda n: (np.zeros(n), np.ones(n)),
+    "capped": lambda n: (np.zeros(n), np.full(n, 0.3)),
+    "floored": lambda n: (np.full(n, 0.02), np.full(n, 0.6)),
+}
+
+
+def _problem(seed, n=8, T=400):
+    rng = np.random.default_rng(seed)
+    F = rng.normal(0.0, 0.01, size=(T, 2))
+    X = F @ rng.normal(0.5, 0.3, size=(n, 2)).T + rng.normal(0.0, 0.01, size=(T, n))
+    mu = rng.normal(0.0005, 0.0004, size=n)
+    return mu, np.cov(X, rowvar=False)
+
+
+def _slsqp(qp, target, lb, ub, extra=()):
+    """Reference: SLSQP min-variance at a target daily return."""
+    cons = [qp.budget_constraint(), *extra]
+    if target is not None:
+        cons.append(qp.return_constraint(target))
+    w0 = np.clip(np.ones(qp.n) / qp.n, lb, ub)
+    res = qp.min_variance(w0, constraints=cons, bounds=tuple(zip(lb, ub)), options={"ftol": 1e-15, "maxiter": 5000})
+    assert res.success, res.message
+    return res.x
+
+
+@pytest.mark.parametrize("bounds", sorted(BOUNDS))
+@pytest.mark.parametrize("seed", range(4))
+def test_corners_and_interpolated_points_match_slsqp(seed, bounds):
+    mu, Sigma = _problem(seed)
+    lb, ub = BOUNDS[bounds](mu.size)
+    qp = PortfolioQP(Sigma, mu)
+
+    corners = _critical_line(mu, Sigma, lb, ub)
+
+    rets = np.array([c["return"] for c in corners])
+    assert (np.diff(rets) <= 1e-12).all()           # decreasing, up to the corner tolerance
+    for c in corners:
+        assert c["weights"].sum() == pytest.approx(1.0)
+        assert (c["weights"] >= lb - 1e-12).all() and (c["weights"] <= ub + 1e-12).all()
+    # the last corner is the global minimum-variance portfolio
+    w_mv = _slsqp(qp, None, lb, ub)
+    assert corners[-1]["variance"] == pytest.approx(qp.variance(w_mv), rel=1e-6)
+
+    # every corner, and points interpolated between corners, solve the target-return problem
+    mids = [(a["return"] + b["return"]) / 2 for a, b in zip(corners, corners[1:]) if a["return"] - b["return"] > 1e-7]
+    inner = [c["return"] for c in corners[1:-1] if rets[-1] <= c["return"] <= rets[0]]
+    targets = np.array(inner + mids)
+    W = _interpolate_frontier(corners, targets)
+    assert W.shape == (targets.size, mu.size)
+    np.testing.assert_allclose(W @ mu, targets, rtol=0, atol=1e-12)
+    for w, t in zip(W, targets):
+        ref = _slsqp(qp, t, lb, ub)
+        assert qp.variance(w) == pytest.approx(qp.variance(ref), rel=1e-6)
+        assert qp.variance(w) <= qp.variance(ref) * (1 + 1e-9)
+
+
+def test_interpolation_is_linear_between_bracketing_corners():
+    mu, Sigma = _problem(11)
+    corners = _critical_line(mu, Sigma)
+    a, b = next((a, b) for a, b in zip(corners, corners[1:]) if a["return"] - b["return"] > 1e-7)
+    for alpha in (0.0, 0.25, 0.5, 0.75):
+        t = (1 - alpha) * b["return"] + alpha * a["return"]
+        w, = _interpolate_frontier(corners, [t])
+        np.testing.assert_allclose(w, (1 - alpha) * b["weights"] + alpha * a["weights"], atol=1e-12)
+    # targets outside [min-variance return, max return] are dropped
+    assert _interpolate_frontier(corners, [corners[0]["return"] + 1e-3, corners[-1]["return"] - 1e-3]).shape[0] == 0
+
+
+@pytest.mark.parametrize("binding", [False, True])
+def test_liquidity_constrained_min_variance_against_the_frontier(binding):
+    mu, Sigma = _problem(5)
+    qp = PortfolioQP(Sigma, mu)
+    n = mu.size
+    corners = _critical_line(mu, Sigma)
+    w_mv = corners[-1]["weights"]
+    mask = (np.arange(n) < 3).astype(float)
+    target = float(w_mv @ mask) + (0.25 if binding else -0.05)
+
+    w = _slsqp(qp, None, np.zeros(n), np.ones(n), extra=[qp.liquidity_constraint(mask, target)])
+
+    assert w @ mask >= target - 1e-9
+    if not binding:
+        np.testing.assert_allclose(w, w_mv, atol=1e-5)
+    else:
+        # the liquidity target costs variance: the portfolio lies inside the unconstrained frontier
+        assert w @ mask == pytest.approx(target, abs=1e-7)
+        t = float(np.clip(w @ mu, corners[-1]["return"], corners[0]["return"]))
+        frontier_w, = _interpolate_frontier(corners, [t])
+        assert qp.variance(w) > qp.variance(frontier_w)
+
+
+def test_above_the_asset_cap_the_frontier_falls_back_to_slsqp(monkeypatch):
+    mu, Sigma = _problem(2, n=6)
+    qp = PortfolioQP(Sigma, mu)
+    tickers = [f"T{i}" for i in range(mu.size)]
+    corners = _critical_line(mu, Sigma)
+
+    monkeypatch.setattr(critical_line, "CRITICAL_LINE_MAX_ASSETS", 5)
+    with pytest.raises(ValueError, match="CRITICAL_LINE_MAX_ASSETS"):
+        _critical_line(mu, Sigma)
+    swept = _frontier_columns(tickers, mu, Sigma, None, num_points=25, qp=qp)
+
+    # the sweep's efficient points have the variance of the exact frontier at their return
+    # (the pure single-asset seeds are left out)
+    W = swept["weights"][swept["weights"].max(axis=1) < 1.0 - 1e-12]
+    r = W @ mu
+    W = W[(r >= corners[-1]["return"]) & (r <= corners[0]["return"])]
+    assert len(W) >= 10
+    exact = _interpolate_frontier(corners, W @ mu)
+    np.testing.assert_allclose(qp.variances(W), qp.variances(exact), rtol=1e-6)
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from utils.getOptimalPortfolio import _min_variance_problem, _project_w_ge_target, _get_optimal_portfolio
+from utils.hrpPortfolio import _hrp_weights
+
+TICKERS = ["HA", "HB", "HC", "HD", "HE"]
+
+
+@pytest.mark.parametrize("seed_", range(20))
+def test_projection_reaches_any_target_when_a_ticker_is_liquid(seed_):
+    rng = np.random.default_rng(seed_)
+    n = int(rng.integers(2, 12))
+    w = rng.dirichlet(np.ones(n))
+    mask = np.zeros(n)
+    mask[rng.choice(n, int(rng.integers(1, n + 1)), replace=False)] = 1.0
+    target = float(rng.uniform(0.0, 1.0))
+
+    p = _project_w_ge_target(w, mask, target)
+
+    assert p.sum() == pytest.approx(1.0) and (p >= 0).all()
+    assert p @ mask >= target - 1e-12
+    if w @ mask >= target:
+        np.testing.assert_allclose(p, w, rtol=0, atol=1e-15)
+
+
+def test_hrp_allocation_is_projected_onto_the_liquid_target(seed):
+    seed(TICKERS, liquid=("HA",))
+    labels = {"HA": "liquid"}
+
+    free, error = _min_variance_problem(TICKERS, {}, 3.0, "fixed", None, labels, method="hrp")
+    assert error is None
+    np.testing.assert_allclose(free["w_star"], _hrp_weights(free["qp"].Sigma))
+    assert free["w_star"] @ free["m_liq"] < 0.6
+
+    problem, error = _min_variance_problem(TICKERS, {}, 3.0, "fixed", 60, labels, method="hrp")
+    assert error is None
+    assert problem["w_star"] @ problem["m_liq"] == pytest.approx(0.6)
+    # the illiquid weights keep their HRP proportions
+    illiquid = problem["m_liq"] == 0
+    np.testing.assert_allclose(problem["w_star"][illiquid] / problem["w_star"][illiquid].sum(),
+                               free["w_star"][illiquid] / free["w_star"][illiquid].sum())
+
+
+def test_hrp_target_without_liquid_tickers_is_rejected(seed):
+    seed(TICKERS)
+    payload, status = _get_optimal_portfolio(TICKERS, {}, 3.0, "fixed", 50, {}, method="hrp",
+                                             include_frontier=False)
+    assert status == 400
+    assert "no liquid tickers" in payload["error"]
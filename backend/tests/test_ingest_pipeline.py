@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+from utils.ingestPipeline import _ingest_securities
+from utils.priceProvider import FakePriceProvider
+from utils.returnsCodec import _decode_security
+
+
+def test_ingest_keeps_returns_across_another_tickers_trading_days(db):
+    # XAA trades every business day; XBB is closed on two of them
+    closed = ["2025-03-03", "2025-05-19"]
+    provider = FakePriceProvider(as_of="2025-06-30", closed={"XBB": closed})
+
+    results = _ingest_securities([{"ticker": "XAA"}, {"ticker": "XBB"}], provider=provider,
+                                 retries=1, backoff=0.0)
+    assert [r["status"] for r in results] == [201, 201]
+
+    lo = provider.as_of - pd.DateOffset(years=5)
+    for t in ("XAA", "XBB"):
+        doc = db.securities.find_one({"ticker": t})
+        days, ret = _decode_security(doc)
+        expected = np.log(provider._path(t).loc[lo:]).diff().dropna()
+        assert days.size == expected.size
+        np.testing.assert_array_equal(days, expected.index.values.astype("datetime64[D]").astype(days.dtype))
+        np.testing.assert_allclose(ret, expected.to_numpy(), rtol=0, atol=1e-15)
+
+    # the day after each closure carries the two-day return
+    days, ret = _decode_security(db.securities.find_one({"ticker": "XBB"}))
+    px = provider._path("XBB")
+    for d in closed:
+        after = px.index[px.index > pd.Timestamp(d)][0]
+        before = px.index[px.index < pd.Timestamp(d)][-1]
+        k = np.searchsorted(days, np.datetime64(after.date(), "D").astype(days.dtype))
+        assert np.isclose(ret[k], np.log(px[after] / px[before]))
+
+
+def test_single_and_batch_ingest_store_the_same_series(db, monkeypatch):
+    import utils.fetchAndStore as fetch_and_store
+    from models.SecurityModel import Security
+
+    provider = FakePriceProvider(as_of="2025-06-30", closed={"XCC": ["2024-12-24"]})
+
+    def offline_security(ticker):
+        # the model's own log-return code, on the fake provider's prices instead of yfinance
+        security = Security.__new__(Security)
+        security.symbol, security.long_name = ticker, f"{ticker} Fake Corp."
+        security.returns_data = provider.download([ticker], period="5y")[ticker].dropna()
+        log_ret = security.get_Log_returns()
+        security.daily_returns = log_ret.astype("float64")
+        security.close_date = pd.to_datetime(log_ret.index).to_pydatetime()
+        security.fetched_on = pd.Timestamp("2025-06-30 22:00:00").to_pydatetime()
+        return security
+
+    monkeypatch.setattr(fetch_and_store, "Security", offline_security)
+    monkeypatch.setattr(fetch_and_store, "_schedule_covariance_rebuild", lambda: None)
+
+    payload, status = fetch_and_store._fetch_and_store_security("XCC")
+    assert status == 201
+    single = _decode_security(db.securities.find_one({"ticker": "XCC"}))
+    db.securities.delete_many({})
+
+    results = _ingest_securities([{"ticker": "XCC"}], provider=provider, retries=1, backoff=0.0)
+    assert results[0]["status"] == 201
+    batch = _decode_security(db.securities.find_one({"ticker": "XCC"}))
+
+    # both keep every log return, the first one spanning the first two closes of the window
+    px = provider.download(["XCC"], period="5y")["XCC"].dropna()
+    assert single[1].size == batch[1].size == px.size - 1
+    assert np.isclose(batch[1][0], np.log(px.iloc[1] / px.iloc[0]))
+    np.testing.assert_array_equal(single[0], batch[0])
+    np.testing.assert_array_equal(single[1], batch[1])
+    assert payload["security_data"]["daily_return"] == batch[1].tolist()
@@ -0,0 +1,137 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import utils.jobRunner as job_runner
+from utils.jobRunner import _submit_job, _get_job, FINAL_STATES
+
+TICKERS = ["JA", "JB", "JC"]
+
+
+@pytest.fixture
+def client(db):
+    from server import app
+    return app.test_client()
+
+
+@pytest.fixture
+def one_worker(monkeypatch):
+    """A single job thread, so a second job stays queued behind a blocked first one."""
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-test")
+    monkeypatch.setattr(job_runner, "_EXECUTOR", executor)
+    yield executor
+    executor.shutdown(wait=True)
+
+
+def _wait_final(job_id, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = _get_job(job_id)
+        if job["status"] in FINAL_STATES:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not finish: {_get_job(job_id)}")
+
+
+def test_async_request_returns_202_and_a_status_url(client, seed):
+    seed(TICKERS, liquid=("JA",))
+    body = {"tickers": TICKERS, "scenarios": [{"name": "base"}, {"name": "capped", "bounds": [0, 0.5]}],
+            "riskFree": 3.0, "riskFree_Type": "fixed", "includeFrontier": False}
+
+    res = client.post("/api/securities/optimal_portfolio/batch?async=1", json=body)
+
+    assert res.status_code == 202
+    job_id = res.get_json()["job_id"]
+    assert res.get_json() == {"job_id": job_id, "status": "queued", "status_url": f"/api/jobs/{job_id}"}
+    assert res.headers["Location"] == f"/api/jobs/{job_id}"
+
+    _wait_final(job_id)
+    job = client.get(f"/api/jobs/{job_id}").get_json()
+    assert job["status"] == "succeeded" and job["result_status"] == 200
+    assert job["kind"] == "optimal_portfolio_batch"
+    assert job["progress"]["done"] == job["progress"]["total"] == 2
+    assert [r["name"] for r in job["result"]["results"]] == ["base", "capped"]
+
+
+def test_job_moves_from_queued_to_running_to_succeeded(db, one_worker):
+    started, release = threading.Event(), threading.Event()
+
+    def blocked():
+        started.set()
+        release.wait(10)
+        return {"value": np.float64(1.5)}, 200
+
+    job_id = _submit_job("test", blocked)
+    assert db.jobs.find_one({"_id": job_id})["status"] in ("queued", "running")
+    assert started.wait(10)
+    running = db.jobs.find_one({"_id": job_id})
+    assert running["status"] == "running" and running["started_at"] is not None
+
+    release.set()
+    job = _wait_final(job_id)
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"value": 1.5} and job["result_status"] == 200
+    assert job["finished_at"] >= running["started_at"]
+
+
+def test_stored_result_is_plain_python(db):
+    def numpy_payload():
+        return {
+            "weights": np.array([0.25, 0.75]),
+            "sharpe": np.float64(1.2),
+            "count": np.int64(3),
+            "risk": float("nan"),
+            "nested": [{1: np.float32(0.5)}],
+        }, 400
+
+    job = _wait_final(_submit_job("test", numpy_payload))
+
+    assert job["status"] == "failed" and job["result_status"] == 400
+    result = job["result"]
+    assert result == {"weights": [0.25, 0.75], "sharpe": 1.2, "count": 3, "risk": None, "nested": [{"1": 0.5}]}
+    assert type(result["sharpe"]) is float and type(result["count"]) is int
+    assert all(type(w) is float for w in result["weights"])
+
+
+def test_delete_cancels_a_queued_job(client, db, one_worker):
+    started, release = threading.Event(), threading.Event()
+    ran = []
+    first = _submit_job("test", lambda: started.set() or release.wait(10) or ({}, 200))
+    assert started.wait(10)
+    second = _submit_job("test", lambda: ran.append(True) or ({}, 200))
+    assert db.jobs.find_one({"_id": second})["status"] == "queued"
+
+    res = client.delete(f"/api/jobs/{second}")
+
+    assert res.status_code == 200
+    assert res.get_json()["status"] == "cancelled" and res.get_json()["cancel_requested"]
+    release.set()
+    assert _wait_final(first)["status"] == "succeeded"
+    one_worker.shutdown(wait=True)
+    assert not ran and _get_job(second)["status"] == "cancelled"
+
+
+def test_delete_stops_a_running_job_at_its_next_progress_report(client, db, monkeypatch):
+    monkeypatch.setattr(job_runner, "_CANCEL_POLL_SECONDS", 0.0)
+    started, release = threading.Event(), threading.Event()
+
+    def long_job(progress):
+        started.set()
+        release.wait(10)
+        progress(1, 10)
+        return {}, 200
+
+    job_id = _submit_job("test", long_job, with_progress=True)
+    assert started.wait(10)
+    res = client.delete(f"/api/jobs/{job_id}")
+    assert res.status_code == 202 and res.get_json()["status"] == "running"
+    release.set()
+    assert _wait_final(job_id)["status"] == "cancelled"
+
+
+def test_unknown_job_is_404(client):
+    assert client.get("/api/jobs/does-not-exist").status_code == 404
+    assert client.delete("/api/jobs/does-not-exist").status_code == 404
@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import utils.refreshSecurities as refresh
+from utils.priceProvider import FakePriceProvider
+from utils.refreshSecurities import _refresh_securities, _refresh_update, _apply_refresh
+from utils.returnsCodec import SCHEMA_VERSION, _decode_security
+
+STORED_AS_OF = "2025-06-20"
+AS_OF = "2025-06-30"
+
+
+@pytest.fixture(autouse=True)
+def no_rebuild(monkeypatch):
+    """The covariance store is rebuilt in a background thread after a refresh; not under test here."""
+    monkeypatch.setattr(refresh, "_schedule_covariance_rebuild", lambda: None)
+
+
+def _expected(ticker, start):
+    """Log returns of a full download up to AS_OF, from `start` on."""
+    r = np.log(FakePriceProvider(as_of=AS_OF)._path(ticker)).diff().dropna()
+    return r.loc[pd.Timestamp(start):]
+
+
+def _legacy_doc(provider, ticker):
+    """Schema 1 document: plain lists, one more close_date than daily_return."""
+    px = provider.download([ticker], period="5y")[ticker].dropna()
+    return {
+        "ticker": ticker,
+        "long_name": ticker,
+        "close_date": [str(d.date()) for d in px.index],
+        "daily_return": np.log(px).diff().dropna().tolist(),
+        "fetched_on": "2025-06-20 22:00:00",
+    }
+
+
+def test_refresh_appends_the_new_tail_to_binary_documents(seed, db):
+    seed(["RA", "RB"], provider=FakePriceProvider(as_of=STORED_AS_OF), fetched_on="2025-06-20 22:00:00")
+    before = {t: _decode_security(db.securities.find_one({"ticker": t})) for t in ("RA", "RB")}
+
+    results = _refresh_securities(["RA", "RB"], provider=FakePriceProvider(as_of=AS_OF), window=10_000)
+
+    new_days = pd.bdate_range("2025-06-23", AS_OF)
+    assert [r["status"] for r in results] == ["updated", "updated"]
+    assert all(r["added"] == new_days.size and r["last_date"] == AS_OF for r in results)
+    for t in ("RA", "RB"):
+        doc = db.securities.find_one({"ticker": t})
+        assert doc["schema_version"] == SCHEMA_VERSION
+        assert doc["fetched_on"] > "2025-06-20 22:00:00"
+        days, ret = _decode_security(doc)
+        np.testing.assert_array_equal(days[:before[t][0].size], before[t][0])
+        np.testing.assert_array_equal(ret[:before[t][1].size], before[t][1])
+        # the appended returns equal those of a full download, the first chained to the last stored close
+        tail = _expected(t, "2025-06-23")
+        np.testing.assert_array_equal(days[-new_days.size:], new_days.values.astype("datetime64[D]").astype(days.dtype))
+        np.testing.assert_allclose(ret[-new_days.size:], tail.to_numpy(), rtol=0, atol=1e-15)
+
+
+def test_refresh_pushes_onto_legacy_documents(db):
+    old = FakePriceProvider(as_of=STORED_AS_OF)
+    db.securities.insert_one(_legacy_doc(old, "RL"))
+
+    result = _refresh_securities(["RL"], provider=FakePriceProvider(as_of=AS_OF), window=10_000)[0]
+
+    doc = db.securities.find_one({"ticker": "RL"})
+    assert result["status"] == "updated"
+    assert "schema_version" not in doc and isinstance(doc["daily_return"], list)
+    assert doc["fetched_on"] > "2025-06-20 22:00:00"
+    assert doc["close_date"][-1] == AS_OF
+    assert len(doc["close_date"]) == len(doc["daily_return"]) + 1
+    np.testing.assert_allclose(doc["daily_return"][-result["added"]:],
+                               _expected("RL", "2025-06-23").to_numpy(), rtol=0, atol=1e-15)
+
+
+@pytest.mark.parametrize("legacy", [False, True])
+def test_refresh_trims_to_the_rolling_window(seed, db, legacy):
+    old = FakePriceProvider(as_of=STORED_AS_OF)
+    if legacy:
+        db.securities.insert_one(_legacy_doc(old, "RW"))
+    else:
+        seed(["RW"], provider=old)
+
+    assert _refresh_securities(["RW"], provider=FakePriceProvider(as_of=AS_OF), window=250)[0]["status"] == "updated"
+
+    days, ret = _decode_security(db.securities.find_one({"ticker": "RW"}))
+    assert ret.size == days.size == 250
+    assert str(days.astype("datetime64[D]")[-1]) == AS_OF
+    np.testing.assert_allclose(ret, _expected("RW", "2020-01-01").to_numpy()[-250:], rtol=0, atol=1e-15)
+
+
+def test_refresh_leaves_current_documents_alone(seed, db):
+    seed(["RU"], provider=FakePriceProvider(as_of=AS_OF), fetched_on="2025-06-30 22:00:00")
+    before = db.securities.find_one({"ticker": "RU"})
+
+    results = _refresh_securities(["RU", "NOPE"], provider=FakePriceProvider(as_of=AS_OF))
+
+    assert results == [{"ticker": "RU", "status": "up_to_date"}, {"ticker": "NOPE", "status": "not_found"}]
+    assert db.securities.find_one({"ticker": "RU"}) == before
+
+
+def test_apply_refresh_reports_concurrent_writes_as_conflicts(seed, db):
+    seed(["RC", "RD"], provider=FakePriceProvider(as_of=STORED_AS_OF), fetched_on="2025-06-20 22:00:00")
+    docs = {d["ticker"]: d for d in db.securities.find({})}
+    prices = FakePriceProvider(as_of=AS_OF).download(["RC", "RD"], start="2025-06-20")
+    fetched_on = "2025-07-01 06:00:00"
+    ops, results = [], {}
+    for t, doc in docs.items():
+        last_day = int(_decode_security(doc)[0][-1])
+        new_days, new_ret = refresh._new_log_returns(prices[t], last_day)
+        ops.append((t, _refresh_update(doc, new_days, new_ret, fetched_on, 10_000)))
+        results[t] = {"status": "updated"}
+
+    # another worker refreshes RD between our read and our write
+    db.securities.update_one({"ticker": "RD"}, {"$set": {"fetched_on": "2025-07-01 05:59:00"}})
+
+    assert _apply_refresh(ops, results, fetched_on) == ["RC"]
+    assert results["RC"] == {"status": "updated"}
+    assert results["RD"]["status"] == "conflict"
+    assert db.securities.find_one({"ticker": "RC"})["fetched_on"] == fetched_on
+    assert db.securities.find_one({"ticker": "RD"})["fetched_on"] == "2025-07-01 05:59:00"
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from bson.binary import Binary
+
+from utils.migrateReturnsStorage import _migrate_returns_storage
+from utils.returnsCodec import (SCHEMA_VERSION, _encode_returns, _encode_dates, _decode_returns, _decode_dates,
+                                _decode_security, _days_to_dates)
+
+
+def _legacy(ticker, n=30, extra_dates=1, seed=0):
+    """Schema 1 document: float lists and date strings, with `extra_dates` leading dates without a return."""
+    rng = np.random.default_rng(seed)
+    dates = np.arange(np.datetime64("2025-01-02"), np.datetime64("2025-01-02") + n + extra_dates)
+    return {"ticker": ticker, "long_name": ticker, "daily_return": rng.normal(0.0, 0.01, n).tolist(),
+            "close_date": [str(d) for d in dates], "fetched_on": "2025-06-30 22:00:00"}
+
+
+def test_encode_decode_round_trip():
+    ret = np.random.default_rng(1).normal(0.0, 0.01, 1260)
+    ret[5] = np.nan
+    dates = np.arange(np.datetime64("2020-06-30"), np.datetime64("2020-06-30") + 1260)
+
+    blob_r, blob_d = _encode_returns(ret), _encode_dates(dates)
+
+    assert SCHEMA_VERSION == 2
+    assert isinstance(blob_r, Binary) and isinstance(blob_d, Binary)
+    assert len(blob_r) == 8 * ret.size and len(blob_d) == 4 * dates.size
+    assert bytes(blob_r) == ret.astype("<f8").tobytes()
+    assert bytes(blob_d) == dates.astype("datetime64[D]").astype(np.int64).astype("<i4").tobytes()
+
+    r, d = _decode_returns(blob_r), _decode_dates(blob_d)
+    assert r.dtype == np.dtype("<f8") and d.dtype == np.dtype("<i4")
+    np.testing.assert_array_equal(r, ret)                      # bit-exact, NaN included
+    np.testing.assert_array_equal(_days_to_dates(d), dates)
+    assert not r.flags.writeable                                # zero-copy view of the blob
+
+
+def test_dates_accept_strings_datetimes_and_datetime64():
+    expected = _decode_dates(_encode_dates(np.array(["2025-03-03", "2025-03-04"], dtype="datetime64[D]")))
+    for dates in (["2025-03-03", "2025-03-04"], np.array(["2025-03-03T00:00", "2025-03-04T00:00"], dtype="datetime64[ns]")):
+        np.testing.assert_array_equal(_decode_dates(_encode_dates(dates)), expected)
+    assert expected.tolist() == [20150, 20151]
+
+
+def test_legacy_reader_aligns_returns_to_the_last_dates():
+    doc = _legacy("LG", n=30, extra_dates=1)
+    days, ret = _decode_security(doc)
+    assert days.dtype == np.int32 and ret.dtype == np.float64
+    assert days.size == ret.size == 30
+    np.testing.assert_array_equal(ret, doc["daily_return"])
+    np.testing.assert_array_equal(_days_to_dates(days).astype(str), doc["close_date"][1:])
+
+    assert [a.size for a in _decode_security({"ticker": "EMPTY"})] == [0, 0]
+    assert [a.size for a in _decode_security({"daily_return": [], "close_date": ["2025-01-02"]})] == [0, 0]
+
+
+def test_migration_rewrites_legacy_documents_once(db):
+    db.securities.insert_many([_legacy("MA", seed=1), _legacy("MB", seed=2, extra_dates=0)])
+    db.securities.insert_one({**_legacy("MBAD", seed=3, extra_dates=0), "close_date": ["2025-01-02"]})
+    before = {d["ticker"]: _decode_security(d) for d in db.securities.find({})}
+
+    assert _migrate_returns_storage(dry_run=True) == {"migrated": 2, "skipped": ["MBAD"], "dry_run": True}
+    assert all("schema_version" not in d for d in db.securities.find({}))
+
+    assert _migrate_returns_storage(batch_size=1) == {"migrated": 2, "skipped": ["MBAD"], "dry_run": False}
+    for t in ("MA", "MB"):
+        doc = db.securities.find_one({"ticker": t})
+        assert doc["schema_version"] == SCHEMA_VERSION
+        assert isinstance(doc["daily_return"], bytes) and isinstance(doc["close_date"], bytes)
+        days, ret = _decode_security(doc)
+        np.testing.assert_array_equal(days, before[t][0])
+        np.testing.assert_array_equal(ret, before[t][1])
+    migrated = {d["ticker"]: d for d in db.securities.find({"ticker": {"$in": ["MA", "MB"]}})}
+
+    # a second run finds nothing to do and leaves the documents untouched
+    assert _migrate_returns_storage() == {"migrated": 0, "skipped": ["MBAD"], "dry_run": False}
+    assert {d["ticker"]: d for d in db.securities.find({"ticker": {"$in": ["MA", "MB"]}})} == migrated
+    assert "schema_version" not in db.securities.find_one({"ticker": "MBAD"})
+
+
+@pytest.mark.parametrize("schema", [1, 2])
+def test_panel_reads_both_layouts_alike(db, schema):
+    from utils.returnsPanel import _panel_matrix
+    doc = _legacy("PL", n=40, extra_dates=1, seed=4)
+    if schema == 2:
+        days, ret = _decode_security(doc)
+        doc = {**doc, "daily_return": _encode_returns(ret), "close_date": _encode_dates(_days_to_dates(days)),
+               "schema_version": SCHEMA_VERSION}
+    db.securities.insert_one(doc)
+    days, X = _panel_matrix(["PL"])
+    np.testing.assert_array_equal(X[:, 0], _legacy("PL", n=40, extra_dates=1, seed=4)["daily_return"])
+    assert str(_days_to_dates(days[[0, -1]])[0]) == "2025-01-03"
+    assert str(_days_to_dates(days[[0, -1]])[1]) == "2025-02-11"
@@ -0,0 +1,123 @@
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import utils.riskFreeRates as rates
+from utils.riskFreeRates import _get_risk_free_rate, _set_rate_fetchers
+
+
+class Fetcher:
+    """Local stand-in for a rate source: returns `value` (or raises it) and records the calling threads."""
+
+    def __init__(self, value):
+        self.value = value
+        self.threads = []
+
+    def __call__(self):
+        self.threads.append(threading.current_thread())
+        if isinstance(self.value, Exception):
+            raise self.value
+        return self.value
+
+
+@pytest.fixture
+def fetchers(db):
+    saved = dict(rates._FETCHERS)
+    stand_ins = {"^TNX": Fetcher(0.041), "STR": Fetcher(0.029)}
+    _set_rate_fetchers(stand_ins)
+    yield stand_ins
+    _wait_idle()
+    _set_rate_fetchers(saved)
+
+
+def _wait_idle(timeout=5.0):
+    """Wait for background refreshes to finish."""
+    deadline = time.monotonic() + timeout
+    while rates._REFRESHING and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not rates._REFRESHING
+
+
+def _age(source, seconds):
+    """Make the cached value `seconds` old."""
+    value, as_of, fetched = rates._CACHE[source]
+    rates._CACHE[source] = (value, as_of, time.monotonic() - seconds)
+
+
+def test_cold_start_serves_the_snapshot_without_fetching_on_the_caller(fetchers, db):
+    fetchers["^TNX"].value = ConnectionError("offline")
+    db.rates.insert_one({"_id": "^TNX", "value": 0.0375, "as_of": datetime(2025, 6, 30)})
+
+    rate, meta = _get_risk_free_rate("^TNX", 0.03)
+
+    assert rate == pytest.approx(0.0375)
+    assert meta == {"source": "^TNX", "as_of": datetime(2025, 6, 30), "stale": True}
+    _wait_idle()
+    assert fetchers["^TNX"].threads and threading.main_thread() not in fetchers["^TNX"].threads
+
+
+def test_cold_start_without_a_snapshot_serves_the_fixed_rate(fetchers):
+    rate, meta = _get_risk_free_rate("STR", 0.02)
+    assert rate == pytest.approx(0.02)
+    assert meta == {"source": "fixed", "as_of": None, "stale": True}
+
+
+def test_fresh_values_are_served_until_the_ttl_expires(fetchers, db):
+    rates._refresh_rate("^TNX")
+    assert db.rates.find_one({"_id": "^TNX"})["value"] == pytest.approx(0.041)
+    fetchers["^TNX"].value = 0.045
+
+    rate, meta = _get_risk_free_rate("^TNX", 0.03)
+    _wait_idle()
+    assert rate == pytest.approx(0.041) and not meta["stale"]
+    assert len(fetchers["^TNX"].threads) == 1          # within the TTL nothing is fetched
+
+    _age("^TNX", rates.RATE_TTL["^TNX"] + 1)
+    rate, meta = _get_risk_free_rate("^TNX", 0.03)
+    assert rate == pytest.approx(0.041) and meta["stale"]    # the old value, while the refresh runs
+    _wait_idle()
+
+    rate, meta = _get_risk_free_rate("^TNX", 0.03)
+    assert rate == pytest.approx(0.045) and not meta["stale"]
+    assert db.rates.find_one({"_id": "^TNX"})["value"] == pytest.approx(0.045)
+
+
+def test_failed_refresh_keeps_the_stale_value_and_backs_off(fetchers):
+    rates._refresh_rate("STR")
+    _age("STR", rates.RATE_TTL["STR"] + 1)
+    fetchers["STR"].value = TimeoutError("euribor-rates.eu timed out")
+
+    rate, meta = _get_risk_free_rate("STR", 0.02)
+    _wait_idle()
+    assert rate == pytest.approx(0.029) and meta["stale"]
+    assert "STR" in rates._FAILED_AT
+    calls = len(fetchers["STR"].threads)
+
+    # within RATE_RETRY_SECONDS the failed source is not fetched again
+    rate, meta = _get_risk_free_rate("STR", 0.02)
+    _wait_idle()
+    assert rate == pytest.approx(0.029) and meta["stale"]
+    assert len(fetchers["STR"].threads) == calls
+
+
+def test_concurrent_callers_share_one_background_refresh(fetchers):
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return np.float64(0.05)
+
+    _set_rate_fetchers({"^TNX": slow})
+    _get_risk_free_rate("^TNX", 0.03)
+    assert started.wait(5)
+    for _ in range(10):
+        _get_risk_free_rate("^TNX", 0.03)
+    assert rates._REFRESHING == {"^TNX"}
+    release.set()
+    _wait_idle()
+    assert _get_risk_free_rate("^TNX", 0.03)[0] == pytest.approx(0.05)
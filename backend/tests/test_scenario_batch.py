@@ -0,0 +1,51 @@
+import numpy as np
+
+from utils.qpCore import PortfolioQP
+from utils.scenarioBatch import _run_scenarios
+
+TICKERS = ["SA", "SB", "SC", "SD"]
+LIQUID = ("SA", "SC")
+LABELS = {t: ("liquid" if t in LIQUID else "illiquid") for t in TICKERS}
+
+
+def _liquid_share(result):
+    return sum(result["optimal_weights"][t] for t in LIQUID) / 100.0
+
+
+def test_scenarios_fall_back_to_the_batch_liquidity_factor(seed, monkeypatch):
+    seed(TICKERS, liquid=LIQUID)
+    factored = []
+    factorize = PortfolioQP._factorize
+    monkeypatch.setattr(PortfolioQP, "_factorize",
+                        staticmethod(lambda Sigma: factored.append(Sigma.shape) or factorize(Sigma)))
+
+    scenarios = [
+        {"name": "bounds only", "bounds": [0.0, 0.4]},
+        {"name": "rate only", "riskFree": 1.0},
+        {"name": "own target", "liquidityFactor": 90},
+        {"name": "unconstrained", "liquidityFactor": None},
+    ]
+    payload, status = _run_scenarios(TICKERS, scenarios, risk_free_type="fixed", liquidity_factor=80,
+                                     labels_override=LABELS, include_frontier=True)
+    assert status == 200
+    bounds_only, rate_only, own, free = payload["results"]
+
+    for r, target in ((bounds_only, 80.0), (rate_only, 80.0), (own, 90.0)):
+        assert r["liquid_target_min"] == target
+        assert r["liquid_share_achieved"] >= target - 0.01
+        assert _liquid_share(r) >= target / 100.0 - 1e-3
+    assert max(bounds_only["optimal_weights"].values()) <= 40.0 + 0.01
+    assert free["liquid_target_min"] is None
+
+    # moments loaded and covariance factored once for the whole batch
+    assert factored == [(len(TICKERS), len(TICKERS))]
+    assert payload["stats"]["frontiers"] == 2
+
+
+def test_batch_without_a_liquidity_factor_leaves_scenarios_unconstrained(seed):
+    seed(TICKERS, liquid=LIQUID)
+    payload, status = _run_scenarios(TICKERS, [{"bounds": [0.0, 0.5]}], risk_free_type="fixed",
+                                     labels_override=LABELS, include_frontier=False)
+    assert status == 200
+    assert payload["results"][0]["liquid_target_min"] is None
+    assert np.isclose(sum(payload["results"][0]["optimal_weights"].values()), 100.0, atol=0.05)
@@ -0,0 +1,132 @@
+"""
+The solver pool with real spawned workers (SOLVER_WORKERS=2). Tasks defined
+here pickle by reference, so this module must stay importable in a worker:
+it imports nothing that reaches db_config.
+"""
+import multiprocessing
+import os
+import time
+
+import numpy as np
+import pytest
+
+import utils.solverPool as solver_pool
+from utils.qpCore import PortfolioQP
+from utils.getEfficientFrontier import _sweep_frontier_slsqp
+
+
+def _task_inspect(qp):
+    """The worker's view of the shared moments."""
+    return os.getpid(), qp.Sigma.copy(), qp.mu.copy(), qp.Sigma.flags.writeable
+
+
+def _task_sleep(qp, seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def _task_die_in_worker(qp):
+    """Kills the solver process it runs in (as an OOM kill would); inline it just answers."""
+    if multiprocessing.parent_process() is not None:
+        os._exit(1)
+    return float(qp.mu.sum())
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(solver_pool, "SOLVER_WORKERS", 2)
+    monkeypatch.setattr(solver_pool, "_SLOTS", solver_pool.threading.BoundedSemaphore(2))
+    monkeypatch.setattr(solver_pool, "_POOL", None)
+    yield solver_pool
+    if solver_pool._POOL is not None:
+        solver_pool._POOL.shutdown(wait=True)
+        solver_pool._POOL = None
+
+
+@pytest.fixture
+def qp():
+    rng = np.random.default_rng(3)
+    n = 6
+    A = rng.normal(0.0, 0.01, size=(500, n))
+    return PortfolioQP(np.cov(A, rowvar=False), rng.normal(0.0004, 0.0002, size=n))
+
+
+def test_workers_attach_the_shared_moments_read_only(pool, qp):
+    with pool._solver_session(timeout=60) as session:
+        session.share(qp)
+        pid, Sigma, mu, writeable = session.result(session.submit(_task_inspect))
+    assert pid != os.getpid()
+    np.testing.assert_array_equal(Sigma, qp.Sigma)
+    np.testing.assert_array_equal(mu, qp.mu)
+    assert not writeable
+
+
+def test_chunked_sweep_matches_the_inline_sweep(pool, qp):
+    targets = np.linspace(qp.mu.min(), qp.mu.max(), 12)[1:-1]
+    w_start = np.ones(qp.n) / qp.n
+    bounds = ((0.0, 1.0),) * qp.n
+    with pool._solver_session(timeout=60) as session:
+        session.share(qp)
+        pooled = pool._pooled_sweep(session, targets, w_start, bounds)
+    inline = _sweep_frontier_slsqp(qp, targets, w_start, bounds)
+    assert len(pooled) == len(inline) == targets.size
+    np.testing.assert_allclose(np.array(pooled) @ qp.mu, targets, atol=1e-9)
+    np.testing.assert_allclose(qp.variances(np.array(pooled)), qp.variances(np.array(inline)), rtol=1e-5)
+
+
+def test_timeout_keeps_the_slot_until_the_task_finishes(pool, qp):
+    with pool._solver_session(timeout=60) as session:      # start the workers outside the deadline
+        session.share(qp)
+        session.result(session.submit(_task_sleep, 0.0))
+
+    with pytest.raises(pool.SolverTimeout):
+        with pool._solver_session(timeout=0.5) as session:
+            session.share(qp)
+            session.result(session.submit(_task_sleep, 2.0))
+    assert pool._SLOTS._value == 1          # the sleeping task still holds its request's slot
+    deadline = time.monotonic() + 10
+    while pool._SLOTS._value < 2 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert pool._SLOTS._value == 2
+
+
+def test_dead_worker_replaces_the_pool_and_finishes_inline(pool, qp):
+    with pool._solver_session(timeout=60) as session:
+        broken = session.pool
+        session.share(qp)
+        assert session.result(session.submit(_task_die_in_worker)) == pytest.approx(qp.mu.sum())
+        assert session.pool is None                          # the rest of this request runs inline
+        assert session.result(session.submit(_task_sleep, 0.0)) == 0.0
+    assert pool._POOL is None
+
+    # the next request gets a fresh, working pool
+    with pool._solver_session(timeout=60) as session:
+        assert session.pool is not None and session.pool is not broken
+        session.share(qp)
+        pid, *_ = session.result(session.submit(_task_inspect))
+    assert pid != os.getpid()
+    assert pool._SLOTS._value == 2
+
+
+def _task_burn(qp, rounds):
+    """CPU-bound stand-in for a sweep chunk."""
+    for _ in range(rounds):
+        np.linalg.cholesky(qp.Sigma @ qp.Sigma.T + np.eye(qp.n))
+    return rounds
+
+
+@pytest.mark.skipif((os.cpu_count() or 1) < 2, reason="scaling needs at least two cores")
+def test_two_workers_outrun_one(pool, qp, monkeypatch):
+    elapsed = {}
+    for workers in (1, 2):
+        monkeypatch.setattr(pool, "SOLVER_WORKERS", workers)
+        if pool._POOL is not None:
+            pool._POOL.shutdown(wait=True)
+            pool._POOL = None
+        with pool._solver_session(timeout=120) as session:
+            session.share(qp)
+            session.map(_task_burn, [(1,)] * workers)         # start the workers
+            t0 = time.perf_counter()
+            session.map(_task_burn, [(40000,)] * 4)
+            elapsed[workers] = time.perf_counter() - t0
+    assert elapsed[1] / elapsed[2] > 1.4
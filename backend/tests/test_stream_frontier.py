@@ -0,0 +1,69 @@
+import time
+
+import numpy as np
+import pytest
+
+import utils.solverPool as solver_pool
+from utils.getOptimalPortfolio import _get_optimal_portfolio, _min_variance_problem
+from utils.streamFrontier import _frontier_messages, _stream_optimal_portfolio
+
+TICKERS = ["SA", "SB", "SC", "SD", "SE", "SF"]
+
+
+def _rows(W):
+    """Frontier weights as a set of rows, up to float noise."""
+    return {tuple(w) for w in np.round(np.asarray(W), 9) + 0.0}
+
+
+@pytest.fixture
+def inline_solver(monkeypatch):
+    monkeypatch.setattr(solver_pool, "SOLVER_WORKERS", 0)
+
+
+def test_streamed_points_are_the_buffered_frontier(seed, inline_solver):
+    seed(TICKERS)
+
+    buffered, status = _get_optimal_portfolio(TICKERS, {}, 3.0, "fixed", frontier_format="columnar")
+    assert status == 200
+    messages, error = _stream_optimal_portfolio(TICKERS, {}, 3.0, "fixed")
+    assert error is None
+    messages = list(messages)
+
+    by_type = {}
+    for m in messages:
+        by_type.setdefault(m["type"], []).append(m)
+    summary = by_type["summary"][0]
+    assert summary["method"] == "critical_line"
+
+    # the pure-asset seeds: one per asset with a non-negative mean return
+    (seeds,) = by_type["seeds"]
+    assert seeds["weights"].shape[1] == len(TICKERS)
+    assert summary["seeds"] == len(seeds["weights"]) > 0
+    assert (seeds["weights"].sum(axis=1) == 1).all() and (seeds["weights"].max(axis=1) == 1).all()
+
+    # the seeds and the points, exactly
+    streamed = _rows(np.vstack([seeds["weights"], *[m["weights"] for m in by_type["points"]]]))
+    frontier = _rows(buffered["efficient_frontier"]["weights"])
+    assert streamed <= frontier
+
+    # plus the min-variance point, an SLSQP solve of its own on each path: equal to its tolerance
+    (w_mv,) = by_type["min_variance"][0]["point"]["weights"]
+    (rest,) = frontier - streamed
+    np.testing.assert_allclose(rest, w_mv, rtol=0, atol=1e-5)
+
+
+def test_seeds_leave_out_assets_with_a_negative_mean(seed):
+    seed(TICKERS)
+    problem, error = _min_variance_problem(TICKERS, {}, 3.0, "fixed")
+    assert error is None
+    problem["mu"] = problem["mu"].copy()
+    problem["mu"].iloc[[1, 4]] = -1e-4
+
+    messages = _frontier_messages(problem, time.perf_counter(), 0.0, num_points=20, batch_size=8)
+    assert [next(messages)["type"] for _ in range(2)] == ["min_variance", "max_sharpe"]
+    seeds = next(messages)
+    messages.close()
+
+    assert seeds["type"] == "seeds"
+    np.testing.assert_array_equal(seeds["weights"], np.eye(len(TICKERS))[[0, 2, 3, 5]])
+    np.testing.assert_allclose(seeds["Return"], (1 + problem["mu"].to_numpy()[[0, 2, 3, 5]])**252 - 1)
@@ -0,0 +1,131 @@
+import numpy as np
+import pytest
+from scipy.stats import norm
+
+import utils.tailRisk as tail_risk
+from utils.tailRisk import (_historical_tail, _parametric_tail, _mean_cvar_lp, _solve_mean_cvar,
+                            _mean_cvar_frontier, _get_tail_risk, _get_mean_cvar_portfolio)
+
+ALPHAS = (0.95, 0.99)
+
+
+def _scenarios(T=1000, n=5, seed=0):
+    rng = np.random.default_rng(seed)
+    F = rng.standard_t(4, size=(T, 1)) * 0.01
+    return F @ rng.uniform(0.3, 1.2, size=(1, n)) + rng.normal(0.0004, 0.008, size=(T, n))
+
+
+def _sorted_tail(X, w, alpha):
+    """Reference: full sort of one portfolio's returns."""
+    r = np.sort(X @ w)
+    k = max(1, int(np.ceil(round((1 - alpha) * r.size, 9))))
+    return -r[k - 1], -r[:k].mean()
+
+
+def test_historical_tail_matches_a_full_sort():
+    X = _scenarios()
+    W = np.random.default_rng(1).dirichlet(np.ones(X.shape[1]), 40)
+
+    var, cvar = _historical_tail(X, W, ALPHAS)
+
+    assert var.shape == cvar.shape == (len(ALPHAS), len(W))
+    assert (cvar >= var).all()
+    assert (var[1] >= var[0]).all() and (cvar[1] >= cvar[0]).all()
+    for i, a in enumerate(ALPHAS):
+        for j, w in enumerate(W):
+            np.testing.assert_allclose((var[i, j], cvar[i, j]), _sorted_tail(X, w, a), rtol=1e-12)
+
+
+def test_parametric_tail_is_the_gaussian_formula():
+    mu_p, sigma_p = np.array([0.0005, -0.001]), np.array([0.01, 0.02])
+
+    var, cvar = _parametric_tail(mu_p, sigma_p, ALPHAS)
+
+    assert (cvar >= var).all()
+    np.testing.assert_allclose(var[0], 1.6448536269514722 * sigma_p - mu_p)
+    np.testing.assert_allclose(cvar[0], 2.0627128075074257 * sigma_p - mu_p)
+    # CVaR is the mean loss beyond VaR: check by quadrature
+    z = np.linspace(norm.ppf(0.99), 12, 200_001)
+    tail = np.trapezoid(z * norm.pdf(z), z) / 0.01
+    np.testing.assert_allclose(cvar[1], tail * sigma_p - mu_p, rtol=1e-6)
+
+
+def test_lp_optimum_is_the_cvar_of_its_weights():
+    X = _scenarios(T=1000)                  # (1 - 0.95) T = 50 scenarios in the tail, a whole number
+    lp = _mean_cvar_lp(X, 0.95)
+    res = _solve_mean_cvar(lp)
+    assert res.success
+    n = X.shape[1]
+    w = res.x[:n]
+
+    var, cvar = _historical_tail(X, w[None, :], (0.95,))
+    assert w.sum() == pytest.approx(1.0) and (w >= -1e-12).all()
+    assert res.fun == pytest.approx(cvar[0, 0], rel=1e-8)
+    assert res.x[n] == pytest.approx(var[0, 0], rel=1e-6)
+    # and no other portfolio has a lower CVaR
+    W = np.random.default_rng(2).dirichlet(np.ones(n), 500)
+    assert (_historical_tail(X, W, (0.95,))[1] >= res.fun - 1e-12).all()
+
+
+@pytest.mark.parametrize("warm", [True, False])
+def test_frontier_points_are_monotone(monkeypatch, warm):
+    if warm:
+        pytest.importorskip("highspy")
+    else:
+        monkeypatch.setattr(tail_risk, "highspy", None)
+    X = _scenarios(T=800, n=6, seed=3)
+    mu = X.mean(axis=0)
+    lp = _mean_cvar_lp(X, 0.95)
+    w0 = _solve_mean_cvar(lp).x[:6]
+    targets = np.linspace(w0 @ mu, mu.max(), 15)
+    seen = []
+
+    results = _mean_cvar_frontier(lp, targets, progress=lambda done, total: seen.append((done, total)))
+
+    assert all(r.success for r in results)
+    W = np.vstack([r.x[:6] for r in results])
+    cvar = np.array([r.fun for r in results])
+    assert (np.diff(W @ mu) > 0).all()
+    assert (np.diff(cvar) >= -1e-12).all()
+    np.testing.assert_allclose(W @ mu, targets, rtol=1e-7)
+    np.testing.assert_allclose(cvar, _historical_tail(X, W, (0.95,))[1][0], rtol=1e-7)
+    assert seen[-1] == (15, 15) and len(seen) == 16
+
+
+def test_warm_started_frontier_matches_fresh_solves(monkeypatch):
+    pytest.importorskip("highspy")
+    X = _scenarios(T=600, seed=4)
+    mu = X.mean(axis=0)
+    m_liq = np.array([1.0, 1.0, 0.0, 0.0, 0.0])
+    lp = _mean_cvar_lp(X, 0.95, m_liq=m_liq, t_liq=0.3, max_weight=0.5)
+    top = tail_risk._max_return(mu, m_liq, 0.3, 0.5)
+    targets = np.linspace(_solve_mean_cvar(lp).x[:5] @ mu, top, 10)
+    targets[-1] -= 1e-12 * abs(top)
+
+    warm = [r.fun for r in _mean_cvar_frontier(lp, targets)]
+    monkeypatch.setattr(tail_risk, "highspy", None)
+    fresh = [r.fun for r in _mean_cvar_frontier(lp, targets)]
+
+    np.testing.assert_allclose(warm, fresh, rtol=1e-8)
+
+
+def test_endpoints_on_the_panel(seed):
+    tickers = ["VA", "VB", "VC", "VD", "VE"]
+    seed(tickers, liquid=("VA", "VB"))
+
+    risk, status = _get_tail_risk(tickers, {"VA": 1, "VB": 1}, include_frontier=True, num_points=20)
+    assert status == 200
+    for rec in risk["portfolio"]["tail"]:
+        assert rec["historical_cvar"] >= rec["historical_var"] > 0
+        assert rec["parametric_cvar"] >= rec["parametric_var"] > 0
+    assert (risk["frontier"]["historical_cvar"] >= risk["frontier"]["historical_var"]).all()
+
+    payload, status = _get_mean_cvar_portfolio(tickers, 0.95, liquidity_factor=40,
+                                               labels_override={"VA": "liquid", "VB": "liquid"}, num_points=12)
+    assert status == 200
+    assert payload["liquid_share_achieved"] >= 40 - 0.01
+    front = payload["frontier"]
+    assert len(front["CVaR"]) == 12
+    assert (np.diff(front["Return"]) > 0).all() and (np.diff(front["CVaR"]) >= -1e-12).all()
+    assert front["CVaR"][0] * 100 == pytest.approx(payload["optimal_cvar"], abs=1e-4)
+    assert (front["weights"] @ np.array([1.0, 1.0, 0, 0, 0]) >= 0.4 - 1e-7).all()
@@ -0,0 +1,93 @@
+import numpy as np
+
+ALIGNMENTS = ("intersection", "pairwise")
+
+
+def _union_matrix(series):
+    """
+    Scatter every (days, returns) pair into one matrix on the union of dates.
+    `series` is a list of (int day numbers, float64 returns). Returns (days, X)
+    with NaN where a column has no observation. All columns are placed with a
+    single searchsorted and a single fancy-index assignment.
+    """
+    if not series:
+        return np.array([], dtype=np.int32), np.empty((0, 0))
+    lengths = np.fromiter((d.size for d, _ in series), dtype=np.intp, count=len(series))
+    all_days = np.concatenate([d for d, _ in series])
+    all_ret = np.concatenate([r for _, r in series])
+    days = np.unique(all_days)
+    rows = np.searchsorted(days, all_days)
+    cols = np.repeat(np.arange(len(series)), lengths)
+    X = np.full((days.size, len(series)), np.nan, dtype=np.float64, order="F")
+    X[rows, cols] = all_ret
+    return days, X
+
+
+def _select_rows(days, X, how="intersection", window=None):
+    """
+    Keep the rows a given alignment uses:
+      intersection - dates every column has (a complete matrix)
+      pairwise     - dates at least one column has (NaN kept for pairwise stats)
+    `window` keeps only the most recent `window` of those dates.
+    """
+    if how not in ALIGNMENTS:
+        raise ValueError(f"Unknown alignment '{how}', expected one of {ALIGNMENTS}.")
+    present = ~np.isnan(X)
+    rows = present.all(axis=1) if how == "intersection" else present.any(axis=1)
+    days, X = days[rows], X[rows]
+    if window:
+        days, X = days[-int(window):], X[-int(window):]
+    return days, X
+
+
+def _align_returns(series, how="intersection", window=None):
+    """Date-aligned returns matrix for a list of (days, returns) series."""
+    if how == "intersection" and series:
+        # intersect the date sets first so the matrix is only as tall as needed
+        common = series[0][0]
+        for d, _ in series[1:]:
+            common = np.intersect1d(common, d, assume_unique=True)
+        X = np.empty((common.size, len(series)), dtype=np.float64, order="F")
+        for j, (d, r) in enumerate(series):
+            X[:, j] = r[np.searchsorted(d, common)]
+        if window:
+            common, X = common[-int(window):], X[-int(window):]
+        return common, X
+    return _select_rows(*_union_matrix(series), how=how, window=window)
+
+
+def _pairwise_moments(X):
+    """
+    Means, covariance, correlation and observation counts of a matrix with
+    NaN gaps, each pair using the rows where both columns are present (like
+    DataFrame.cov / DataFrame.corr), from a handful of matrix products
+    instead of N² pairwise loops.
+    """
+    M = (~np.isnan(X)).astype(np.float64)
+    Xz = np.where(M > 0, X, 0.0)
+    counts = M.T @ M
+    S = Xz.T @ M                      # S[i, j] = sum of x_i over rows where x_j is present
+    Q = (Xz * Xz).T @ M               # Q[i, j] = sum of x_i² over rows where x_j is present
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = (Xz.T @ Xz - S * S.T / counts) / (counts - 1)
+        var = (Q - S * S / counts) / (counts - 1)   # var of x_i over the pair's rows
+        corr = cov / np.sqrt(var * var.T)
+        mu = Xz.sum(axis=0) / M.sum(axis=0)
+    cov[counts < 2] = np.nan
+    corr[counts < 2] = np.nan
+    return mu, cov, corr, counts
+
+
+def _corr_from_cov(cov):
+    sd = np.sqrt(np.diag(cov))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return cov / np.outer(sd, sd)
+
+
+def _aligned_moments(X, how="intersection"):
+    """(mu, Sigma, corr) of an aligned matrix; pairwise statistics if it has gaps."""
+    if how == "intersection":
+        cov = np.atleast_2d(np.cov(X, rowvar=False))
+        return X.mean(axis=0), cov, _corr_from_cov(cov)
+    mu, cov, corr, _ = _pairwise_moments(X)
+    return mu, cov, corr
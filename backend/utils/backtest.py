@@ -0,0 +1,207 @@
+import numpy as np
+from utils.qpCore import PortfolioQP
+from utils.returnsPanel import _panel_matrix
+from utils.returnsCodec import _days_to_dates
+from utils.bulkReads import MissingTickersError
+from utils.riskFreeRates import _get_risk_free_rate
+from utils.tangencyPortfolio import _tangency_portfolio
+from utils.covEstimators import ESTIMATORS, DEFAULT_FACTORS, _estimate_covariance
+from utils.instrumentation import _stage
+from utils.getOptimalPortfolio import _liquid_mask_from_labels, _liquidity_target, _project_w_ge_target
+
+BACKTEST_METHODS = ("min_variance", "max_sharpe", "equal_weight")
+REBALANCE_FREQUENCIES = {"daily": 1, "weekly": 5, "monthly": 21, "quarterly": 63, "yearly": 252}
+
+
+def _rebalance_days(rebalance):
+    """Trading days between rebalances from a count or a name in REBALANCE_FREQUENCIES. Returns (days, error)."""
+    if isinstance(rebalance, str) and not rebalance.isdigit():
+        if rebalance not in REBALANCE_FREQUENCIES:
+            return None, f"Unknown rebalance frequency '{rebalance}', expected a number of days or one of {tuple(REBALANCE_FREQUENCIES)}."
+        return REBALANCE_FREQUENCIES[rebalance], None
+    days = int(rebalance)
+    if days < 1:
+        return None, "rebalance must be at least one day."
+    return days, None
+
+
+def _max_drawdown(value):
+    """Drawdown series 1 - V / running max of V, and its maximum."""
+    dd = 1.0 - value / np.maximum.accumulate(value)
+    return dd, float(dd.max()) if dd.size else 0.0
+
+
+def _hold(X, starts, W):
+    """
+    Buy-and-hold between rebalances, for every period at once. X is the (T, n)
+    out-of-sample daily log returns (as stored), `starts` the first row of
+    each period and W the (periods, n) weights set on those rows. Asset growth
+    since the period start comes from one cumulative sum of the log returns
+    with the period's starting level subtracted, so portfolio value is a
+    single row-wise product of growth and (repeated) weights.
+    Returns (daily portfolio returns, end-of-period drifted weights).
+    """
+    T = X.shape[0]
+    period = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, T)))
+    L = np.cumsum(X, axis=0)
+    base = np.vstack([np.zeros((1, X.shape[1])), L])[starts]        # level just before each period
+    G = np.exp(L - base[period])
+    value = np.einsum("ij,ij->i", G, W[period])                     # V_t / V_start
+    prev = np.ones(T)
+    prev[1:] = value[:-1]
+    prev[starts] = 1.0
+    ret = value / prev - 1.0
+
+    ends = np.append(starts[1:], T) - 1
+    drift = W * G[ends]
+    drift /= drift.sum(axis=1, keepdims=True)
+    return ret, drift
+
+
+def _summary(ret, risk_free):
+    """Annualized performance of a daily return series."""
+    value = np.cumprod(1.0 + ret)
+    years = ret.size / 252
+    ann_ret = value[-1] ** (1 / years) - 1 if years > 0 and value[-1] > 0 else None
+    vol = float(ret.std(ddof=1) * np.sqrt(252)) if ret.size > 1 else None
+    _, mdd = _max_drawdown(value)
+    return {
+        "total_return": round(float(value[-1] - 1) * 100, 2),
+        "annual_return": None if ann_ret is None else round(ann_ret * 100, 2),
+        "realized_volatility": None if vol is None else round(vol * 100, 2),
+        "sharpe": round((ann_ret - risk_free) / vol, 2) if ann_ret is not None and vol else None,
+        "max_drawdown": round(mdd * 100, 2),
+    }
+
+
+def _run_backtest(tickers, window=252, rebalance="monthly", method="min_variance",
+                  liquidity_factor=None, labels_override=None, risk_free=0.03, risk_free_type=None,
+                  cov_estimator="sample", factors=DEFAULT_FACTORS, cost_bps=0.0, progress=None):
+    """
+    Walk-forward backtest over the stored daily returns (dates all tickers share).
+
+    Every `rebalance` days the portfolio is re-solved on the trailing `window`
+    days (min-variance, optionally with the liquid-share target, or
+    max-Sharpe; each solve warm-started from the previous weights) and then
+    held, drifting with prices, until the next rebalance. Turnover is measured
+    against the drifted weights; `cost_bps` is charged on it. An equal-weight
+    portfolio rebalanced on the same days is reported alongside.
+    Returns (payload, status).
+    """
+    if not tickers or len(tickers) < 2:
+        return {"error": "Insufficient number of tickers"}, 400
+    if method not in BACKTEST_METHODS:
+        return {"error": f"Unknown method '{method}', expected one of {BACKTEST_METHODS}."}, 400
+    if cov_estimator not in ESTIMATORS:
+        return {"error": f"Unknown covariance estimator '{cov_estimator}', expected one of {ESTIMATORS}."}, 400
+    step, error = _rebalance_days(rebalance)
+    if error:
+        return {"error": error}, 400
+    window = int(window)
+    if window < 2:
+        return {"error": "window must be at least 2 days."}, 400
+
+    try:
+        days, X = _panel_matrix(tickers)
+    except MissingTickersError as e:
+        return e.to_response()
+    T, n = X.shape
+    if T <= window:
+        return {"error": f"Not enough shared history: {T} days for a {window}-day estimation window."}, 400
+
+    m_liq = _liquid_mask_from_labels(tickers, labels_override or {})
+    t_liq, error = _liquidity_target(liquidity_factor, m_liq)
+    if error:
+        return {"error": error}, 400
+    risk_free, risk_free_meta = _get_risk_free_rate(risk_free_type, np.float64(risk_free) / 100.0)
+    rf_daily = (1 + risk_free) ** (1/252) - 1
+    bounds = ((0.0, 1.0),) * n
+
+    # --- one solve per rebalance day, each on the trailing window ---
+    starts = np.arange(window, T, step)
+    W = np.empty((starts.size, n))
+    failures = 0
+    w_prev = np.ones(n) / n
+    with _stage("solves"):
+        for k, t in enumerate(starts):
+            if progress is not None:
+                progress(k, starts.size)
+            if method == "equal_weight":
+                W[k] = w_prev
+                continue
+            est = X[t - window:t]
+            mu = est.mean(axis=0)
+            Sigma = np.cov(est, rowvar=False) if cov_estimator == "sample" else _estimate_covariance(est, cov_estimator, factors)
+            qp = PortfolioQP(Sigma, mu)
+            w = None
+            if method == "max_sharpe":
+                w, _ = _tangency_portfolio(qp, mu, rf_daily, m_liq, t_liq)
+            else:
+                w0 = w_prev if t_liq is None else _project_w_ge_target(w_prev, m_liq, t_liq)
+                constraints = [qp.budget_constraint()]
+                if t_liq is not None:
+                    constraints.append(qp.liquidity_constraint(m_liq, t_liq))
+                res = qp.min_variance(w0, constraints=constraints, bounds=bounds)
+                w = res.x if res.success else None
+            if w is None:
+                failures += 1      # keep the previous allocation
+                w = w_prev
+            W[k] = w_prev = np.clip(w, 0.0, None) / np.clip(w, 0.0, None).sum()
+        if progress is not None:
+            progress(starts.size, starts.size)
+
+    # --- out-of-sample: every period in one pass ---
+    with _stage("evaluate"):
+        X_oos = X[window:]
+        rel = starts - window
+        ret, drift = _hold(X_oos, rel, W)
+        ew_ret, ew_drift = _hold(X_oos, rel, np.full_like(W, 1.0 / n))
+
+        held = np.vstack([np.ones((1, n)) / n, drift[:-1]])        # weights just before each rebalance
+        turnover = 0.5 * np.abs(W - held).sum(axis=1)
+        turnover[0] = 0.0                                          # initial allocation, not a trade
+        ret[rel] -= 2 * turnover * cost_bps / 1e4                  # both legs of each trade
+        ew_turnover = 0.5 * np.abs(1.0 / n - np.vstack([np.ones((1, n)) / n, ew_drift[:-1]])).sum(axis=1)
+        ew_turnover[0] = 0.0
+        ew_ret[rel] -= 2 * ew_turnover * cost_bps / 1e4
+
+        value = np.cumprod(1.0 + ret)
+        drawdown, _ = _max_drawdown(value)
+
+    years = ret.size / 252
+    dates = _days_to_dates(days[window:]).astype(str)
+    return {
+        "tickers": list(tickers),
+        "method": method,
+        "window": window,
+        "rebalance_days": step,
+        "cost_bps": float(cost_bps),
+        "riskFree": np.float64(risk_free),
+        "riskFreeSource": risk_free_meta,
+        "liquid_target_min": None if t_liq is None else round(t_liq * 100, 2),
+        "start": dates[0],
+        "end": dates[-1],
+        "rebalances": int(starts.size),
+        "solver_failures": failures,
+        "performance": {
+            **_summary(ret, risk_free),
+            "average_turnover": round(float(turnover[1:].mean()) * 100, 2) if starts.size > 1 else 0.0,
+            "annual_turnover": round(float(turnover.sum()) / years * 100, 2),
+        },
+        "equal_weight": {
+            **_summary(ew_ret, risk_free),
+            "annual_turnover": round(float(ew_turnover.sum()) / years * 100, 2),
+        },
+        "series": {
+            "dates": dates,
+            "value": value,
+            "drawdown": drawdown,
+            "equal_weight_value": np.cumprod(1.0 + ew_ret),
+        },
+        "allocations": {
+            "dates": dates[rel],
+            "weights": W,              # rebalances x tickers
+            "turnover": turnover,
+            "liquid_share": W @ m_liq,
+        },
+    }, 200
@@ -0,0 +1,48 @@
+from db_config import db
+from utils.returnsCodec import _decode_security
+from utils.alignReturns import _align_returns
+from utils.instrumentation import _stage
+
+_RETURN_FIELDS = ("daily_return", "close_date")
+
+
+class MissingTickersError(LookupError):
+    """Raised when some requested tickers are not stored; carries all of them."""
+
+    def __init__(self, missing):
+        self.missing = list(missing)
+        super().__init__(f"Data for {', '.join(self.missing)} could not be retrieved")
+
+    def to_response(self):
+        return {"error": str(self), "missing": self.missing}, 404
+
+
+def _fetch_securities(tickers, fields=_RETURN_FIELDS):
+    """
+    One `$in` query for all tickers, projected on `fields`.
+    Returns {ticker: doc}; raises MissingTickersError listing every ticker not found.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    projection = {"_id": 0, "ticker": 1, **{f: 1 for f in fields}}
+    with _stage("mongo"):
+        docs = {d["ticker"]: d for d in db.securities.find({"ticker": {"$in": tickers}}, projection)}
+    missing = [t for t in tickers if t not in docs]
+    if missing:
+        raise MissingTickersError(missing)
+    return docs
+
+
+def _fetch_returns(tickers):
+    """{ticker: (days, returns)} for all tickers from a single round trip."""
+    docs = _fetch_securities(tickers)
+    return {t: _decode_security(docs[t]) for t in tickers}
+
+
+def _returns_matrix(tickers, how="pairwise", window=None):
+    """
+    Date-aligned returns of `tickers` from a single round trip.
+    Returns (days, X): int day numbers and a (n_days, len(tickers)) float64
+    matrix; see utils.alignReturns for the `how`/`window` options.
+    """
+    series = _fetch_returns(tickers)
+    return _align_returns([series[t] for t in tickers], how=how, window=window)
@@ -0,0 +1,160 @@
+import json
+import logging
+import os
+import shutil
+import threading
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+from utils.alignReturns import _pairwise_moments
+from utils.returnsPanel import _get_returns_panel
+
+COV_STORE_DIR = Path(os.getenv("COV_STORE_DIR", Path(__file__).resolve().parent.parent / "cache" / "covstore"))
+_POINTER = "current.json"
+_ARRAYS = ("cov", "corr", "mean", "counts")
+_KEEP_VERSIONS = 2
+
+_STORE = None
+_STORE_LOCK = threading.Lock()
+_REBUILD_LOCK = threading.Lock()
+_REBUILD_STATE = {"running": False, "pending": False}
+
+
+class CovarianceStore:
+    """
+    Full-universe covariance, correlation, means and pairwise observation
+    counts, memory-mapped from `.npy` files. Requests are served by slicing
+    the submatrix of their tickers with np.ix_.
+    """
+
+    def __init__(self, meta, arrays):
+        self.version = meta["version"]
+        self.built_at = meta["built_at"]
+        self.signature = tuple(meta["signature"]) if meta.get("signature") else None
+        self.tickers = meta["tickers"]
+        self.index = {t: j for j, t in enumerate(self.tickers)}
+        self.cov, self.corr, self.mean, self.counts = (arrays[k] for k in _ARRAYS)
+
+    def missing(self, tickers):
+        return [t for t in tickers if t not in self.index]
+
+    def submatrix(self, tickers):
+        """{"mean", "cov", "corr", "counts"} restricted to `tickers` (in that order)."""
+        idx = np.fromiter((self.index[t] for t in tickers), dtype=np.intp, count=len(tickers))
+        ix = np.ix_(idx, idx)
+        return {"mean": self.mean[idx], "cov": self.cov[ix], "corr": self.corr[ix], "counts": self.counts[ix]}
+
+
+def _build_covariance_store():
+    """
+    Recompute the universe statistics from the returns panel in one vectorized
+    pass and publish them as a new version directory; the pointer file is
+    swapped atomically so readers never see a half-written store.
+    """
+    panel = _get_returns_panel(force=True)
+    mean, cov, corr, counts = _pairwise_moments(panel.values)
+
+    version = datetime.utcnow().strftime("%Y%m%dT%H%M%S%fZ")
+    target = COV_STORE_DIR / version
+    target.mkdir(parents=True, exist_ok=True)
+    for name, arr in zip(_ARRAYS, (cov, corr, mean, counts.astype(np.int32))):
+        np.save(target / f"{name}.npy", np.ascontiguousarray(arr))
+
+    meta = {
+        "version": version,
+        "built_at": datetime.utcnow().isoformat() + "Z",
+        "signature": list(panel.signature) if panel.signature else None,
+        "tickers": panel.tickers,
+        "n_dates": int(panel.days.size),
+    }
+    with open(target / "meta.json", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    tmp = COV_STORE_DIR / (_POINTER + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": version}, f)
+    os.replace(tmp, COV_STORE_DIR / _POINTER)
+
+    # drop old versions (mapped files stay readable until their readers let go)
+    versions = sorted(p for p in COV_STORE_DIR.iterdir() if p.is_dir())
+    for old in versions[:-_KEEP_VERSIONS]:
+        shutil.rmtree(old, ignore_errors=True)
+
+    logging.info("Covariance store %s built: %d tickers", version, len(panel.tickers))
+    return {"version": version, "tickers": len(panel.tickers)}
+
+
+def _load_covariance_store(version):
+    target = COV_STORE_DIR / version
+    with open(target / "meta.json", "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    arrays = {k: np.load(target / f"{k}.npy", mmap_mode="r") for k in _ARRAYS}
+    return CovarianceStore(meta, arrays)
+
+
+def _get_covariance_store():
+    """Current store for this process (re-mapped when another process published a new version), or None."""
+    global _STORE
+    try:
+        with open(COV_STORE_DIR / _POINTER, "r", encoding="utf-8") as f:
+            version = json.load(f)["version"]
+    except (FileNotFoundError, ValueError, KeyError):
+        return None
+    with _STORE_LOCK:
+        if _STORE is None or _STORE.version != version:
+            try:
+                _STORE = _load_covariance_store(version)
+            except (FileNotFoundError, ValueError) as e:
+                logging.warning("Covariance store %s unreadable: %s", version, e)
+                return None
+        return _STORE
+
+
+def _rebuild_loop():
+    while True:
+        try:
+            _build_covariance_store()
+        except Exception as e:
+            logging.error("Covariance store rebuild failed: %s", e)
+        with _REBUILD_LOCK:
+            if not _REBUILD_STATE["pending"]:
+                _REBUILD_STATE["running"] = False
+                return
+            _REBUILD_STATE["pending"] = False
+
+
+def _schedule_covariance_rebuild():
+    """
+    Rebuild the store in the background after an ingestion/refresh. Calls made
+    while a rebuild is running collapse into one more rebuild afterwards.
+    """
+    with _REBUILD_LOCK:
+        if _REBUILD_STATE["running"]:
+            _REBUILD_STATE["pending"] = True
+            return
+        _REBUILD_STATE["running"] = True
+    threading.Thread(target=_rebuild_loop, daemon=True, name="covstore-rebuild").start()
+
+
+def _stored_moments(tickers, common_dates_only=False):
+    """
+    Store slice for `tickers` if the store is current with the returns panel
+    and covers them all, else None. With `common_dates_only`, only answers
+    when every pair was estimated on the same dates, i.e. when the pairwise
+    statistics equal the common-date ones.
+    Returns (submatrix dict, version) or None.
+    """
+    store = _get_covariance_store()
+    if store is None or store.missing(tickers):
+        return None
+    if store.signature != _get_returns_panel().signature:
+        return None      # data changed since the last build
+    sub = store.submatrix(tickers)
+    if common_dates_only and (sub["counts"] != sub["counts"][0, 0]).any():
+        return None
+    return sub, store.version
+
+
+if __name__ == "__main__":
+    # cd backend && python -m utils.covarianceStore
+    logging.info("Covariance store built: %s", _build_covariance_store())
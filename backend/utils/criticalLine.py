@@ -0,0 +1,243 @@
+from os import getenv
+import numpy as np
+
+# Larger problems raise ValueError, so callers fall back to their SLSQP sweep
+CRITICAL_LINE_MAX_ASSETS = int(getenv("CRITICAL_LINE_MAX_ASSETS", "1000"))
+# The free-block inverse is refactored from scratch after this many rank-one updates
+_REFACTOR_EVERY = 64
+
+
+def _bound_lambdas(cov_f_inv, cov_fb, mean_f, w_b, lb_f, ub_f):
+    """
+    Lambda at which each free asset would hit its lower or upper bound, for
+    all of them at once (the C^-1 terms are shared). Returns (lambdas,
+    bounds hit), NaN where undefined.
+    """
+    c4 = cov_f_inv.sum(axis=1)                   # C^-1 1
+    c2 = cov_f_inv @ mean_f
+    c1, c3 = c4.sum(), c4 @ mean_f
+    c = -c1 * c2 + c3 * c4
+    bi = np.where(c > 0, ub_f, lb_f)
+    if w_b is None:
+        num = c4 - c1 * bi
+    else:
+        l2 = cov_f_inv @ (cov_fb @ w_b)
+        num = (1 - w_b.sum() + l2.sum()) * c4 - c1 * (bi + l2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lam = num / c
+    lam[c == 0] = np.nan
+    return lam, bi
+
+
+def _compute_w(cov_f_inv, cov_fb, mean_f, w_b, lam):
+    """Weights of the free assets for a given lambda (bounded assets fixed at w_b)."""
+    ones_f = np.ones(mean_f.shape[0])
+    g1 = ones_f @ cov_f_inv @ mean_f
+    g2 = ones_f @ cov_f_inv @ ones_f
+    if w_b is None:
+        g = -lam * g1 / g2 + 1 / g2
+        w1 = np.zeros(mean_f.shape[0])
+    else:
+        g3 = w_b.sum()
+        w1 = cov_f_inv @ (cov_fb @ w_b)
+        g4 = ones_f @ w1
+        g = -lam * g1 / g2 + (1 - g3 + g4) / g2
+    w2 = cov_f_inv @ ones_f
+    w3 = cov_f_inv @ mean_f
+    return -w1 + g * w2 + lam * w3
+
+
+def _sub_matrices(mu, Sigma, w, free):
+    bounded = np.setdiff1d(np.arange(mu.shape[0]), free)
+    cov_f = Sigma[np.ix_(free, free)]
+    mean_f = mu[free]
+    if bounded.size == 0:
+        return cov_f, None, mean_f, None
+    return cov_f, Sigma[np.ix_(free, bounded)], mean_f, w[bounded]
+
+
+def _add_to_inverse(cov_f_inv, Sigma, free, i):
+    """Inverse of the free block after appending asset i (bordered inverse, O(F²))."""
+    b = Sigma[free, i]
+    u = cov_f_inv @ b
+    s = Sigma[i, i] - b @ u
+    f = len(free)
+    out = np.empty((f + 1, f + 1))
+    out[:f, :f] = cov_f_inv + np.outer(u, u) / s
+    out[:f, f] = out[f, :f] = -u / s
+    out[f, f] = 1.0 / s
+    return out
+
+
+def _drop_from_inverse(cov_f_inv, j):
+    """Inverse of the free block after removing its j-th asset (O(F²))."""
+    keep = np.r_[0:j, j + 1:cov_f_inv.shape[0]]
+    col = cov_f_inv[keep, j]
+    return cov_f_inv[np.ix_(keep, keep)] - np.outer(col, col) / cov_f_inv[j, j]
+
+
+def _free_lambdas(cov_f_inv, mu, Sigma, w, free, bounded):
+    """
+    Lambda at which each bounded asset i would become free, i.e. with i
+    appended to the free set and held at its current bound. The inverse of each bordered block follows from cov_f_inv
+    through its Schur complement s_i = Sigma_ii - b_i' C^-1 b_i, so all
+    candidates cost two (F x B) products instead of one inversion each.
+    NaN where lambda is undefined.
+    """
+    U = cov_f_inv @ Sigma[np.ix_(free, bounded)]             # C^-1 b_i, one column per candidate
+    s = Sigma[bounded, bounded] - np.einsum("fb,fb->b", Sigma[np.ix_(free, bounded)], U)
+    q = U.sum(axis=0)                                        # 1' C^-1 b_i
+    ones_inv = cov_f_inv.sum(axis=0)                         # 1' C^-1
+    mu_f = mu[free]
+    w_bd = w[bounded]
+    # bounded assets other than i: r = Sigma[cand, B \ i] w[B \ i]
+    R = Sigma[np.ix_(free, bounded)] @ w_bd
+    r_i = Sigma[np.ix_(bounded, bounded)] @ w_bd - Sigma[bounded, bounded] * w_bd
+    r_f_u = U.T @ R - (Sigma[bounded, bounded] - s) * w_bd  # u_i' r_F
+    r_f_1 = ones_inv @ R - q * w_bd                          # 1' C^-1 r_F
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        c4 = (1.0 - q) / s                                   # (A^-1 1)_last
+        c1 = ones_inv.sum() + (1.0 - q) * c4
+        c2 = (mu[bounded] - U.T @ mu_f) / s                  # (A^-1 mean)_last
+        c3 = ones_inv @ mu_f + c2 * (1.0 - q)
+        l2 = (r_i - r_f_u) / s
+        l3 = r_f_1 + l2 * (1.0 - q)
+        l1 = w_bd.sum() - w_bd
+        c = -c1 * c2 + c3 * c4
+        lam = ((1.0 - l1 + l3) * c4 - c1 * (w_bd + l2)) / c
+    lam[(c == 0) | ~np.isfinite(lam)] = np.nan
+    return lam
+
+
+def _init_solution(mu, lb, ub):
+    """Starting corner: fill the highest-mean assets up to their upper bound."""
+    w = lb.copy()
+    order = np.argsort(-mu, kind="stable")
+    free = None
+    for i in order:
+        w[i] = ub[i]
+        if w.sum() >= 1:
+            w[i] += 1 - w.sum()
+            free = i
+            break
+    if free is None:
+        raise ValueError("Upper bounds sum to less than 1; no feasible portfolio.")
+    return [int(free)], w
+
+
+def _critical_line(mu, Sigma, lb=None, ub=None, tol=1e-10):
+    """
+    Markowitz critical line algorithm for the long-only (box-bounded) mean-variance problem.
+
+    Returns the corner portfolios from the max-return corner down to the
+    global minimum-variance portfolio as a list of dicts
+    {"weights", "lambda", "return", "variance"}, ordered by decreasing return.
+    Between two consecutive corners the optimal weights are an affine function
+    of the target return, so every frontier point can be recovered exactly.
+    """
+    return list(_iter_critical_line(mu, Sigma, lb, ub, tol))
+
+
+def _iter_critical_line(mu, Sigma, lb=None, ub=None, tol=1e-10):
+    """_critical_line as a generator: each corner is yielded as soon as it is found."""
+    mu = np.asarray(mu, dtype=float).ravel()
+    Sigma = np.asarray(Sigma, dtype=float)
+    n = mu.shape[0]
+    if n > CRITICAL_LINE_MAX_ASSETS:
+        raise ValueError(f"{n} assets exceed CRITICAL_LINE_MAX_ASSETS ({CRITICAL_LINE_MAX_ASSETS}).")
+    lb = np.zeros(n) if lb is None else np.asarray(lb, dtype=float)
+    ub = np.ones(n) if ub is None else np.asarray(ub, dtype=float)
+
+    free, w = _init_solution(mu, lb, ub)
+    # inverse of the free block, kept in step with `free` by bordered updates
+    cov_f_inv, updates = np.linalg.inv(Sigma[np.ix_(free, free)]), 0
+    lambdas = [None]
+    last = None
+
+    def corner(w_c, lam):
+        # drop corners that violate the constraints through numerical error
+        if abs(w_c.sum() - 1) > 1e-8 or (w_c < lb - 1e-8).any() or (w_c > ub + 1e-8).any():
+            return None
+        w_c = np.clip(w_c, lb, ub)
+        ret = float(w_c @ mu)
+        # only keep corners on the efficient (upper) branch
+        if last is not None and ret > last["return"] + tol:
+            return None
+        return {"weights": w_c, "lambda": lam, "return": ret, "variance": float(w_c @ Sigma @ w_c)}
+
+    last = corner(w.copy(), None)
+    if last is not None:
+        yield last
+
+    for _ in range(4 * n + 10):
+        # a) one free weight moves to a bound
+        l_in, i_in, bi_in = None, None, None
+        if updates >= _REFACTOR_EVERY:
+            cov_f_inv, updates = np.linalg.inv(Sigma[np.ix_(free, free)]), 0
+        if len(free) > 1:
+            cov_f, cov_fb, mean_f, w_b = _sub_matrices(mu, Sigma, w, free)
+            lam, bi = _bound_lambdas(cov_f_inv, cov_fb, mean_f, w_b, lb[free], ub[free])
+            if not np.isnan(lam).all():
+                j = int(np.nanargmax(lam))
+                l_in, i_in, bi_in = float(lam[j]), free[j], float(bi[j])
+
+        # b) one bounded weight becomes free
+        l_out, i_out = None, None
+        if len(free) < n:
+            bounded = np.setdiff1d(np.arange(n), free)
+            lam = _free_lambdas(cov_f_inv, mu, Sigma, w, free, bounded)
+            ok = ~np.isnan(lam)
+            if lambdas[-1] is not None:
+                ok &= lam < lambdas[-1] - tol
+            if ok.any():
+                k = int(np.argmax(np.where(ok, lam, -np.inf)))
+                l_out, i_out = float(lam[k]), int(bounded[k])
+
+        if (l_in is None or l_in < 0) and (l_out is None or l_out < 0):
+            # c) no more turning points: close the line at the minimum-variance portfolio
+            lambdas.append(0.0)
+            cov_f, cov_fb, mean_f, w_b = _sub_matrices(mu, Sigma, w, free)
+            mean_f = np.zeros_like(mean_f)
+        else:
+            if l_out is None or (l_in is not None and l_in > l_out):
+                lambdas.append(l_in)
+                cov_f_inv = _drop_from_inverse(cov_f_inv, free.index(i_in))
+                free.remove(i_in)
+                w[i_in] = bi_in
+            else:
+                lambdas.append(l_out)
+                cov_f_inv = _add_to_inverse(cov_f_inv, Sigma, free, i_out)
+                free.append(i_out)
+            updates += 1
+            cov_f, cov_fb, mean_f, w_b = _sub_matrices(mu, Sigma, w, free)
+
+        w[free] = _compute_w(cov_f_inv, cov_fb, mean_f, w_b, lambdas[-1])
+        c = corner(w.copy(), lambdas[-1])
+        if c is not None:
+            last = c
+            yield c
+        if lambdas[-1] == 0:
+            break
+    else:
+        raise RuntimeError("Critical line algorithm did not terminate.")
+
+
+def _interpolate_frontier(corners, targets):
+    """
+    Exact frontier weights at each target return by linear interpolation
+    between the two corner portfolios that bracket it.
+    Targets outside [min-variance return, max return] are dropped.
+    Returns an array of shape (len(kept_targets), n).
+    """
+    rets = np.array([c["return"] for c in corners])[::-1]       # increasing
+    W = np.vstack([c["weights"] for c in corners])[::-1]
+    targets = np.asarray(targets, dtype=float)
+    targets = targets[(targets >= rets[0]) & (targets <= rets[-1])]
+    if len(corners) == 1 or targets.size == 0:
+        return np.repeat(W[:1], targets.size, axis=0)
+
+    k = np.clip(np.searchsorted(rets, targets, side="right") - 1, 0, len(rets) - 2)
+    span = rets[k + 1] - rets[k]
+    alpha = np.divide(targets - rets[k], span, out=np.zeros_like(targets), where=span > 0)
+    return (1 - alpha)[:, None] * W[k] + alpha[:, None] * W[k + 1]
@@ -1,6 +1,10 @@
 import logging
 from db_config import db
 from models.SecurityModel import Security
+from utils.returnsPanel import _invalidate_returns_panel
+from utils.covarianceStore import _schedule_covariance_rebuild
+from utils.resultCache import _invalidate_results
+from utils.returnsCodec import SCHEMA_VERSION, _encode_returns, _encode_dates
 
 def _fetch_and_store_security(ticker):
     """
@@ -19,12 +23,16 @@ def _fetch_and_store_security(ticker):
         logging.info("Creating Security instance for ticker: %s", ticker)
         security = Security(ticker)
 
-        # Prepare data for MongoDB, ensuring JSON compatibility
+        # Prepare data for MongoDB, ensuring JSON compatibility; every log return is
+        # kept (the first already spans the first two closes), as in the batch ingest
+        close_date = security.close_date
+        daily_return = security.daily_returns.to_numpy()
         security_data = {
             "ticker": ticker,
             "long_name": security.long_name,
-            "close_date": [date.strftime("%Y-%m-%d") for date in security.close_date[1:]],  # Convert dates to strings
-            "daily_return": security.daily_returns.tolist()[1:],  # Convert numpy array to list
+            "schema_version": SCHEMA_VERSION,
+            "close_date": _encode_dates(close_date),        # int32 day offsets
+            "daily_return": _encode_returns(daily_return),  # float64
             "fetched_on": security.fetched_on.strftime("%Y-%m-%d %H:%M:%S")
         }
 
@@ -32,6 +40,13 @@ def _fetch_and_store_security(ticker):
         logging.info("Inserting security data into MongoDB for ticker: %s", ticker)
         result = db.securities.insert_one(security_data)
         security_data["_id"] = str(result.inserted_id)
+        _invalidate_returns_panel()
+        _invalidate_results([ticker])
+        _schedule_covariance_rebuild()
+
+        # JSON-friendly copy of the stored columns for the response
+        security_data["close_date"] = [date.strftime("%Y-%m-%d") for date in close_date]
+        security_data["daily_return"] = daily_return.tolist()
 
         logging.info("Security data recorded successfully for ticker: %s", ticker)
         return {"message": "Security data recorded successfully!", "security_data": security_data}, 201
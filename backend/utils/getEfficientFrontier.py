@@ -1,70 +1,132 @@
 import numpy as np
-import pandas as pd
-from scipy.optimize import minimize
 from utils.portfolioRisk import _portfolio_risk
+from utils.qpCore import PortfolioQP
+from utils.criticalLine import _critical_line, _interpolate_frontier
 
-def _compute_efficient_frontier(tickers, mu, Sigma, min_var_port, num_points=1000, bounds=None):
+
+def _frontier_record(tickers, w, mu, Sigma):
+    return {
+        **{f"w_{tickers[j]}": np.float64(w[j]) for j in range(len(tickers))},
+        "Return": (1+np.float64(w @ mu))**252-1,
+        "Risk":   np.float64(_portfolio_risk(w, Sigma))*np.sqrt(252)
+    }
+
+
+def _frontier_corners(tickers, mu, Sigma, bounds=None):
+    """Corner portfolios of the long-only frontier (critical line algorithm)."""
     n = len(mu)
     if bounds is None:
         bounds = ((0.0, 1.0),) * n
+    lb = np.array([b[0] for b in bounds], dtype=float)
+    ub = np.array([b[1] for b in bounds], dtype=float)
+    return _critical_line(np.asarray(mu, dtype=float), np.asarray(Sigma, dtype=float), lb, ub)
 
-    # 1) Seed with “pure” asset portfolios
-    records = []
-    for i in range(n):
-        w = np.zeros(n)
-        w[i] = 1.0
-        if np.float64(mu.iloc[i]) >= 0:
-            records.append({
-                **{f"w_{tickers[j]}": np.float64(w[j]) for j in range(n)},
-                "Return": (1+np.float64(mu.iloc[i]))**252-1,
-                "Risk":   np.float64(_portfolio_risk(w,Sigma))*np.sqrt(252)
-            })
-    
-
-    # 2) Global minimum‐variance portfolio (no return target)
-    if not min_var_port:
-        cons_minvar = [{"type":"eq", "fun": lambda w: w.sum() - 1}]
-        w0 = np.ones(n) / n
-        res_minvar = minimize(_portfolio_risk, w0, args=(Sigma,), method="SLSQP", bounds=bounds, constraints=cons_minvar)
-        if res_minvar.success:
-            w_mv = res_minvar.x
-            min_var_port = {
-                'Optimal Weights':w_mv,
-                "Return": np.float64(w_mv @ mu),
-                "Risk":   np.float64(_portfolio_risk(w_mv,Sigma))
-            }
-
-    w_mv = min_var_port['Optimal Weights'].tolist()
-    
-    records.append({
-        **{f'w_{tickers[j]}':np.float64(min_var_port['Optimal Weights'][j]) for j in range(len(tickers))},
-        'Return':(1+min_var_port['Return'])**252-1,
-        'Risk':min_var_port['Risk']*np.sqrt(252)
-    })
-
-    # 3) Now sweep target returns **between** the min‐var return and max‐mu return
-    ret_min = mu.min()
-    ret_max = mu.max()
-    targets = np.linspace(max(0,ret_min), ret_max, num_points)
-
-    # 4) For each interior target, solve min‐var w/ return constraint
-    last_w = w_mv.copy()
+
+def _corner_records(tickers, corners, mu, Sigma):
+    return [
+        {**_frontier_record(tickers, c["weights"], np.asarray(mu, dtype=float), np.asarray(Sigma, dtype=float)),
+         "lambda": None if c["lambda"] is None else np.float64(c["lambda"])}
+        for c in corners
+    ]
+
+
+def _corner_columns(tickers, corners, mu, Sigma):
+    """Corner portfolios in the columnar frontier layout, plus each corner's lambda."""
+    W = np.vstack([c["weights"] for c in corners]) if corners else np.zeros((0, len(tickers)))
+    Sigma = np.asarray(Sigma, dtype=float)
+    return {
+        "tickers": list(tickers),
+        "weights": W,
+        "Return": (1 + W @ np.asarray(mu, dtype=float))**252 - 1,
+        "Risk": np.sqrt(np.einsum("ij,ij->i", W @ Sigma, W)) * np.sqrt(252),
+        "lambda": [None if c["lambda"] is None else np.float64(c["lambda"]) for c in corners or []],
+    }
+
+
+def _sweep_frontier_slsqp(qp, targets, w_start, bounds):
+    """Fallback: one SLSQP solve per target return, warm-started from the previous point."""
+    weights = []
+    last_w = np.asarray(w_start, dtype=float)
     for target in targets:
-        cons = [
-            {"type":"eq", "fun": lambda w: w.sum() - 1},
-            {"type":"eq", "fun": lambda w, mu=mu, t=target: w @ mu - t}
-        ]
-        res = minimize(_portfolio_risk, last_w, args=(Sigma,), method="SLSQP", bounds=bounds, constraints=cons)
+        cons = [qp.budget_constraint(), qp.return_constraint(target)]
+        res = qp.min_variance(last_w, constraints=cons, bounds=bounds, options={"ftol": 1e-9})
         if not res.success:
             continue
         last_w = res.x
-        records.append({
-            **{f"w_{tickers[j]}": np.float64(last_w[j]) for j in range(n)},
-            "Return": (1+np.float64(last_w @ mu))**252-1,
-            "Risk":   np.float64(_portfolio_risk(last_w, Sigma))*np.sqrt(252)
-        })
+        weights.append(last_w)
+    return weights
+
+
+def _frontier_columns(tickers, mu, Sigma, min_var_port, num_points=1000, bounds=None, corners=None, qp=None,
+                      sweep=None):
+    """
+    Efficient frontier in columnar form: {"tickers", "weights" (points x tickers),
+    "Return", "Risk"} with annualized return and risk per point.
+    `sweep(targets, w_start, bounds)` replaces the sequential SLSQP fallback.
+    `corners=[]` means the critical line already failed: go straight to the sweep.
+    """
+    n = len(mu)
+    mu_arr = np.asarray(mu, dtype=float)
+    if qp is None:
+        qp = PortfolioQP(Sigma, mu)
+    if bounds is None:
+        bounds = ((0.0, 1.0),) * n
+
+    # 1) Seed with “pure” asset portfolios
+    pure = np.flatnonzero(mu_arr >= 0)
+    blocks = [np.eye(n)[pure]]
+
+    # 2) Corner portfolios of the critical line (falls back to SLSQP sweep if it breaks down)
+    if corners is None:
+        try:
+            corners = _frontier_corners(tickers, mu, Sigma, bounds)
+        except (np.linalg.LinAlgError, ValueError, RuntimeError):
+            corners = []
+
+    # 3) Global minimum‐variance portfolio (no return target)
+    if not min_var_port:
+        if corners:
+            w_mv = corners[-1]["weights"]
+        else:
+            w0 = np.ones(n) / n
+            res_minvar = qp.min_variance(w0, bounds=bounds, options={"ftol": 1e-9})
+            w_mv = res_minvar.x if res_minvar.success else w0
+        min_var_port = {'Optimal Weights': w_mv}
+
+    w_mv = np.asarray(min_var_port['Optimal Weights'], dtype=float)
+    blocks.append(w_mv[None, :])
+
+    # 4) Fill target returns between the min‐var return and max‐mu return
+    if corners:
+        ret_lo, ret_hi = corners[-1]["return"], corners[0]["return"]
+        targets = np.linspace(max(0, ret_lo), ret_hi, num_points)
+        frontier_w = _interpolate_frontier(corners, targets)
+    else:
+        targets = np.linspace(max(0,mu.min()), mu.max(), num_points)
+        frontier_w = (sweep or (lambda *a: _sweep_frontier_slsqp(qp, *a)))(targets, w_mv, bounds)
+    if len(frontier_w):
+        blocks.append(np.vstack(frontier_w))
+
+    W = np.vstack(blocks)
+    rets = (1 + W @ mu_arr)**252 - 1
+    risks = np.sqrt(qp.variances(W)) * np.sqrt(252)
+
+    # drop exact duplicates (same corner might re‐appear), keeping the first occurrence
+    _, first = np.unique(np.column_stack([W, rets, risks]), axis=0, return_index=True)
+    keep = np.sort(first)
+    return {"tickers": list(tickers), "weights": W[keep], "Return": rets[keep], "Risk": risks[keep]}
+
+
+def _frontier_records(frontier):
+    """Columnar frontier as the legacy list of {"w_<ticker>", "Return", "Risk"} records."""
+    keys = [f"w_{t}" for t in frontier["tickers"]]
+    return [
+        {**dict(zip(keys, map(np.float64, w))), "Return": np.float64(r), "Risk": np.float64(s)}
+        for w, r, s in zip(frontier["weights"], frontier["Return"], frontier["Risk"])
+    ]
 
-    # Build DataFrame and drop duplicates (same corner might re‐appear)
-    df = pd.DataFrame(records).drop_duplicates().reset_index(drop=True)
 
-    return df.to_dict(orient='records')
+def _compute_efficient_frontier(tickers, mu, Sigma, min_var_port, num_points=1000, bounds=None, corners=None, qp=None):
+    return _frontier_records(
+        _frontier_columns(tickers, mu, Sigma, min_var_port, num_points, bounds, corners, qp)
+    )
@@ -1,24 +1,23 @@
 import numpy as np
 import pandas as pd
-import yfinance as yf
-import requests as req
-from bs4 import BeautifulSoup
-from functools import lru_cache
-from scipy.optimize import minimize
-from utils.portfolioRisk import _portfolio_risk
-from utils.getSecurityInfo import _get_security_info
-from utils.getEfficientFrontier import _compute_efficient_frontier
-
-@lru_cache
-def euribor_rate():
-    res = req.get('https://www.euribor-rates.eu/en/current-euribor-rates/')
-    if res.status_code == 200:
-        soup = BeautifulSoup(res.text, 'html.parser')
-    for tr in soup.find_all("tr"):
-        th = tr.find("th")
-        if th and th.find("a", href='/en/current-euribor-rates/4/euribor-rate-12-months/'):
-            euribor = np.float64(tr.find('td').text.replace(' %',''))
-    return np.float64(euribor/100)
+from utils.qpCore import PortfolioQP
+from utils.returnsPanel import _panel_with
+from utils.bulkReads import MissingTickersError
+from utils.alignReturns import ALIGNMENTS, _aligned_moments
+from utils.riskFreeRates import _get_risk_free_rate
+from utils.tangencyPortfolio import _tangency_portfolio
+from utils.covarianceStore import _stored_moments
+from utils.covEstimators import ESTIMATORS, DEFAULT_FACTORS, _estimate_covariance
+from utils.instrumentation import _stage, _count
+from utils.resultCache import _cached_result
+from utils.hrpPortfolio import _hrp_weights
+from utils.solverPool import (SolverBusy, SolverTimeout, _solver_session, _pooled_min_variance, _pooled_sweep,
+                              _task_tangency, _task_corners)
+from utils.getEfficientFrontier import (_frontier_columns, _frontier_records,
+                                       _corner_records, _corner_columns)
+
+# "min_variance": SLSQP; "hrp": Hierarchical Risk Parity (no solve, no inversion)
+METHODS = ("min_variance", "hrp")
 
 def _liquid_mask_from_labels(tickers, labels_override):
     """
@@ -82,26 +81,99 @@ def _project_w_ge_target(w, mask, target):
     w_new = np.clip(wL + wN, 0, None)
     return w_new / w_new.sum()
 
-def _get_optimal_portfolio(tickers, weights, risk_free, risk_free_type,
-                           liquidity_factor=None, labels_override=None):
+def _liquidity_target(liquidity_factor, m_liq):
+    """Liquid-share target as a fraction (percent accepted), or None. Returns (target, error)."""
+    if liquidity_factor is None:
+        return None, None
+    t = float(liquidity_factor)
+    if t > 1.0:  # treat as %
+        t = t / 100.0
+    t_liq = float(np.clip(t, 0.0, 1.0))
+    if int(m_liq.sum()) == 0 and t_liq > 0:
+        return None, f"Requested liquid share {t_liq:.2%} infeasible: no liquid tickers in selection."
+    return t_liq, None
 
+def _max_sharpe_summary(tickers, w_tan, mu, qp, risk_free, m_liq):
+    ret_tan = (1 + np.dot(w_tan, mu)) ** 252 - 1
+    risk_tan = qp.risk(w_tan) * np.sqrt(252)
+    return {
+        "max_sharpe_weights": {tickers[i]: round(w * 100, 2) for i, w in enumerate(w_tan.tolist())},
+        "max_sharpe_return": round(ret_tan * 100, 2),
+        "max_sharpe_risk": round(risk_tan * 100, 2),
+        "max_sharpe": round((ret_tan - risk_free) / risk_tan, 2) if risk_tan != 0 else None,
+        "max_sharpe_liquid_share": round(float(np.dot(w_tan, m_liq)) * 100, 2),
+    }
+
+def _load_moments(tickers, alignment="intersection", align_window=None,
+                  cov_estimator="sample", factors=DEFAULT_FACTORS):
+    """
+    Expected daily returns and covariance for `tickers`.
+    Returns ((mu Series, covariance, cov_version), None) or (None, (error, status)).
+    The covariance is an ndarray, or a FactorCovariance for cov_estimator="factor".
+    """
+    if alignment not in ALIGNMENTS:
+        return None, ({"error": f"Unknown alignment '{alignment}', expected one of {ALIGNMENTS}."}, 400)
+    if cov_estimator not in ESTIMATORS:
+        return None, ({"error": f"Unknown covariance estimator '{cov_estimator}', expected one of {ESTIMATORS}."}, 400)
+    if cov_estimator != "sample" and alignment != "intersection":
+        return None, ({"error": f"The '{cov_estimator}' estimator needs alignment 'intersection'."}, 400)
+
+    # --- returns matrix: column slice of the shared panel, aligned by date ---
+    panel = _panel_with(tickers)
+    missing = panel.missing(tickers)
+    if missing:
+        return None, MissingTickersError(missing).to_response()
+
+    # full-history sample statistics of tickers sharing the same dates are sliced from the store
+    stored = None
+    if cov_estimator == "sample" and not align_window:
+        with _stage("cov_store"):
+            stored = _stored_moments(tickers, common_dates_only=(alignment == "intersection"))
+    if stored is not None:
+        sub, cov_version = stored
+        mu, Sigma = np.array(sub["mean"]), np.array(sub["cov"])
+    else:
+        with _stage("matrix"):
+            _, X = panel.matrix(tickers, how=alignment, window=align_window)
+        if X.shape[0] < 2:
+            return None, ({"error": "Not enough overlapping history for the selected tickers."}, 400)
+        with _stage("covariance"):
+            if cov_estimator == "sample":
+                mu, Sigma, _ = _aligned_moments(X, how=alignment)
+            else:
+                mu, Sigma = X.mean(axis=0), _estimate_covariance(X, cov_estimator, factors)
+        cov_version = None
+    if isinstance(Sigma, np.ndarray) and np.isnan(Sigma).any():
+        return None, ({"error": "Not enough overlapping history for the selected tickers."}, 400)
+    return (pd.Series(mu, index=tickers), Sigma, cov_version), None
+
+
+def _min_variance_problem(tickers, weights, risk_free, risk_free_type,
+                          liquidity_factor=None, labels_override=None,
+                          alignment="intersection", align_window=None,
+                          cov_estimator="sample", factors=DEFAULT_FACTORS, session=None,
+                          method="min_variance"):
+    """
+    Shared first half of an optimal-portfolio request: risk-free rate, moments,
+    liquidity target and the min-variance solve (on the solver pool when a
+    `session` is given), or the HRP allocation for method="hrp".
+    Returns (problem dict, None) or (None, (error, status)).
+    """
     if not tickers or len(tickers) < 2:
-        return {"error": "Insufficient number of tickers"}, 400
+        return None, ({"error": "Insufficient number of tickers"}, 400)
+    if method not in METHODS:
+        return None, ({"error": f"Unknown method '{method}', expected one of {METHODS}."}, 400)
 
     # --- risk-free ---
-    risk_free = np.float64(risk_free) / 100.0
-    if risk_free_type == '^TNX':
-        risk_free = np.float64(yf.Ticker('^TNX').history(period='1d')['Close'].values[0] / 100.0)
-    elif risk_free_type == 'STR':
-        risk_free = euribor_rate()
-
-    # --- build returns matrix from stored daily returns (aligned) ---
-    portfolio = {t: _get_security_info(t)[0]['daily_returns'] for t in tickers}
-    min_l = min(len(portfolio[t]) for t in tickers)
-    adj = {t: portfolio[t][:min_l] for t in tickers}
-    df = pd.DataFrame(adj)
-    mu = df.mean()
-    Sigma = df.cov()
+    # cached / persisted rate, refreshed in the background; never fetched on this thread
+    with _stage("risk_free"):
+        risk_free, risk_free_meta = _get_risk_free_rate(risk_free_type, np.float64(risk_free) / 100.0)
+
+    moments, error = _load_moments(tickers, alignment, align_window, cov_estimator, factors)
+    if error:
+        return None, error
+    mu, cov, cov_version = moments
+    qp = PortfolioQP(cov, mu)
 
     # --- initial weights aligned to tickers ---
     w0 = np.array([weights.get(t, 0.0) for t in tickers], dtype=float)
@@ -111,68 +183,203 @@ def _get_optimal_portfolio(tickers, weights, risk_free, risk_free_type,
 
     # --- liquid mask from UI labels ---
     m_liq = _liquid_mask_from_labels(tickers, labels_override or {})
-    n_liq = int(m_liq.sum())
 
     # --- target (percent or fraction) ---
-    t_liq = None
-    if liquidity_factor is not None:
-        t = float(liquidity_factor)
-        if t > 1.0:  # treat as %
-            t = t / 100.0
-        t_liq = float(np.clip(t, 0.0, 1.0))
-        if n_liq == 0 and t_liq > 0:
-            return {"error": f"Requested liquid share {t_liq:.2%} infeasible: no liquid tickers in selection."}, 400
+    t_liq, error = _liquidity_target(liquidity_factor, m_liq)
+    if error:
+        return None, ({"error": error}, 400)
+    if t_liq is not None:
         # warm start to satisfy ≥ target
         w0 = _project_w_ge_target(w0, m_liq, t_liq)
 
-    # --- constraints & bounds ---
-    constraints = [
-        {'type': 'eq', 'fun': lambda x: np.sum(x) - 1.0},               # sum(w)=1
-    ]
-    if t_liq is not None:
-        # >= target  →  np.dot(m_liq, w) - t_liq  >= 0
-        constraints.append({'type': 'ineq',
-                            'fun': lambda x, m=m_liq, t=t_liq: float(np.dot(x, m) - t)})
-
     bounds = ((0.0, 1.0),) * len(tickers)
 
-    # --- solve min-variance subject to constraints ---
-    res = minimize(
-        _portfolio_risk,
-        w0,
-        args=(Sigma,),
-        method="SLSQP",
-        constraints=constraints,
-        bounds=bounds,
-        options={"ftol": 1e-9, "disp": False, "maxiter": 1000}
-    )
+    problem = {
+        "tickers": list(tickers),
+        "method": method,
+        "risk_free": risk_free,
+        "risk_free_meta": risk_free_meta,
+        "cov_version": cov_version,
+        "cov_estimator": cov_estimator,
+        "mu": mu,
+        "qp": qp,
+        "m_liq": m_liq,
+        "t_liq": t_liq,
+        "bounds": bounds,
+    }
+
+    # --- HRP: cluster allocation, then shifted onto the liquid-share target ---
+    if method == "hrp":
+        with _stage("hrp"):
+            w = _hrp_weights(qp.Sigma)
+        # with a liquid ticker in the selection the projection always reaches the target
+        # (_liquidity_target has already turned away targets on all-illiquid selections)
+        problem["w_star"] = w if t_liq is None else _project_w_ge_target(w, m_liq, t_liq)
+        return problem, None
+
+    # --- solve min-variance subject to constraints (analytic gradients) ---
+    with _stage("min_variance"):
+        if session is not None:
+            session.share(qp)
+            res = _pooled_min_variance(session, w0, m_liq, t_liq, bounds)
+        else:
+            # sum(w)=1 and, with a target, np.dot(m_liq, w) - t_liq >= 0
+            constraints = [qp.budget_constraint()]
+            if t_liq is not None:
+                constraints.append(qp.liquidity_constraint(m_liq, t_liq))
+            res = qp.min_variance(w0, constraints=constraints, bounds=bounds)
     if not res.success:
-        return {"error": f"SLSQP failed: {getattr(res,'message','Optimization failed')}"}, 400
+        return None, ({"error": f"SLSQP failed: {getattr(res,'message','Optimization failed')}"}, 400)
+
+    problem["w_star"] = res.x
+    return problem, None
 
-    w_star = res.x
-    ret_star = (1 + np.dot(w_star, mu)) ** 252 - 1
-    risk_star = _portfolio_risk(w_star, Sigma) * np.sqrt(252)
+def _min_variance_summary(problem):
+    """The min-variance (or HRP) part of the optimal-portfolio response."""
+    tickers, w_star, qp, risk_free = problem["tickers"], problem["w_star"], problem["qp"], problem["risk_free"]
+    t_liq = problem["t_liq"]
+    ret_star = (1 + np.dot(w_star, problem["mu"])) ** 252 - 1
+    risk_star = qp.risk(w_star) * np.sqrt(252)
     sharpe_star = (ret_star - risk_free) / risk_star if risk_star != 0 else None
+    return {
+        'riskFree': np.float64(risk_free),
+        'riskFreeSource': problem["risk_free_meta"],
+        'cov_version': problem["cov_version"],
+        'cov_estimator': problem["cov_estimator"],
+        "method": problem["method"],
+        "optimal_weights": {tickers[i]: round(w * 100, 2) for i, w in enumerate(w_star.tolist())},
+        "optimal_return": round(ret_star * 100, 2),
+        "optimal_risk": round(risk_star * 100, 2),
+        "optimal_sharpe": round(sharpe_star, 2) if sharpe_star is not None else None,
+        "liquid_target_min": None if t_liq is None else round(t_liq * 100, 2),
+        "liquid_share_achieved": round(float(np.dot(w_star, problem["m_liq"])) * 100, 2),
+    }
+
+def _max_sharpe_problem(problem):
+    """Max-Sharpe (tangency) portfolio under the problem's constraints. Returns (summary or None, error)."""
+    mu, qp, risk_free = problem["mu"], problem["qp"], problem["risk_free"]
+    rf_daily = (1 + risk_free) ** (1/252) - 1
+    with _stage("tangency"):
+        w_tan, tan_error = _tangency_portfolio(qp, mu.to_numpy(), rf_daily, problem["m_liq"], problem["t_liq"])
+    if w_tan is None:
+        return None, tan_error
+    return _max_sharpe_summary(problem["tickers"], w_tan, mu, qp, risk_free, problem["m_liq"]), tan_error
+
+def _get_optimal_portfolio(tickers, weights, risk_free, risk_free_type,
+                           liquidity_factor=None, labels_override=None,
+                           alignment="intersection", align_window=None,
+                           cov_estimator="sample", factors=DEFAULT_FACTORS, frontier_format="records",
+                           method="min_variance", include_frontier=True):
+    try:
+        with _solver_session() as session:
+            return _solve_optimal_portfolio(session, tickers, weights, risk_free, risk_free_type,
+                                            liquidity_factor, labels_override, alignment, align_window,
+                                            cov_estimator, factors, frontier_format, method, include_frontier)
+    except (SolverBusy, SolverTimeout) as e:
+        return e.to_response()
+
+def _solve_optimal_portfolio(session, tickers, weights, risk_free, risk_free_type,
+                             liquidity_factor, labels_override, alignment, align_window,
+                             cov_estimator, factors, frontier_format, method="min_variance",
+                             include_frontier=True):
+    """
+    _get_optimal_portfolio with the solves on the pool: tangency and corners
+    run side by side. Without `include_frontier` only the allocation itself
+    is computed (for large HRP selections): no max-Sharpe solve, corners or
+    frontier.
+    """
+    problem, error = _min_variance_problem(tickers, weights, risk_free, risk_free_type, liquidity_factor,
+                                           labels_override, alignment, align_window, cov_estimator, factors,
+                                           session=session, method=method)
+    if error:
+        return error
+    mu, qp, bounds, w_star = problem["mu"], problem["qp"], problem["bounds"], problem["w_star"]
+    m_liq, t_liq = problem["m_liq"], problem["t_liq"]
 
     min_var_port = {
         'Optimal Weights': w_star,
-        'Return': (ret_star + 1) ** (1/252) - 1,
-        'Risk': risk_star / np.sqrt(252)
+        'Return': np.dot(w_star, mu),
+        'Risk': qp.risk(w_star)
     }
 
-    eff_front = _compute_efficient_frontier(
-        tickers, mu, Sigma, min_var_port, num_points=500, bounds=bounds
-    )
+    rf_daily = (1 + problem["risk_free"]) ** (1/252) - 1
+    lb, ub = (np.array(b) for b in zip(*bounds))
+    if not include_frontier:
+        return {
+            **_min_variance_summary(problem),
+            "efficient_frontier": [],
+            "frontier_corners": [],
+            "max_sharpe_portfolio": None,
+            "max_sharpe_error": "Skipped (includeFrontier is false)."
+        }, 200
+    if method == "hrp":
+        session.share(qp)    # the min-variance step shared nothing
+    tangency = session.submit(_task_tangency, rf_daily, m_liq, t_liq)
+    cla = session.submit(_task_corners, lb, ub)
+
+    # --- max-Sharpe (tangency) portfolio under the same constraints ---
+    with _stage("tangency"):
+        w_tan, tan_error = session.result(tangency)
+    max_sharpe = None
+    if w_tan is not None:
+        max_sharpe = _max_sharpe_summary(tickers, w_tan, mu, qp, problem["risk_free"], m_liq)
 
-    liq_share = float(np.dot(w_star, m_liq))
+    # --- exact corner portfolios once, then interpolate the frontier between them ---
+    Sigma = qp.Sigma
+    with _stage("corners"):
+        try:
+            corners = session.result(cla)
+        except (np.linalg.LinAlgError, ValueError, RuntimeError):
+            corners = []    # failed: straight to the pooled sweep, never rerun inline
+            _count("solver_failures_total", solver="critical_line")
+
+    with _stage("frontier"):
+        eff_front = _frontier_columns(
+            tickers, mu, Sigma, min_var_port, num_points=500, bounds=bounds, corners=corners, qp=qp,
+            sweep=lambda targets, w_start, b: _pooled_sweep(session, targets, w_start, b)
+        )
+
+    # "columnar": one ticker list and a weights matrix instead of a w_<ticker> key per point
+    if frontier_format == "columnar":
+        corner_front = _corner_columns(tickers, corners, mu, Sigma)
+    else:
+        eff_front = _frontier_records(eff_front)
+        corner_front = _corner_records(tickers, corners, mu, Sigma) if corners else []
 
     return {
-        'riskFree': np.float64(risk_free),
-        "optimal_weights": {tickers[i]: round(w * 100, 2) for i, w in enumerate(w_star.tolist())},
-        "optimal_return": round(ret_star * 100, 2),
-        "optimal_risk": round(risk_star * 100, 2),
-        "optimal_sharpe": round(sharpe_star, 2) if sharpe_star is not None else None,
+        **_min_variance_summary(problem),
         "efficient_frontier": eff_front,
-        "liquid_target_min": None if t_liq is None else round(t_liq * 100, 2),
-        "liquid_share_achieved": round(liq_share * 100, 2)
-    }, 200
\ No newline at end of file
+        "frontier_corners": corner_front,
+        "max_sharpe_portfolio": max_sharpe,
+        "max_sharpe_error": tan_error
+    }, 200
+
+def _get_optimal_portfolio_cached(tickers, weights, risk_free, risk_free_type,
+                                  liquidity_factor=None, labels_override=None,
+                                  alignment="intersection", align_window=None,
+                                  cov_estimator="sample", factors=DEFAULT_FACTORS, frontier_format="records",
+                                  method="min_variance", include_frontier=True):
+    """
+    _get_optimal_portfolio through the result cache. The key holds everything
+    the result depends on: the resolved risk-free rate, the liquidity mask
+    rather than the raw labels, and the data version of every ticker. Initial
+    weights are left out, as they only seed the (convex) solve.
+    """
+    rate, _ = _get_risk_free_rate(risk_free_type, np.float64(risk_free) / 100.0)
+    inputs = {
+        "tickers": list(tickers),
+        "risk_free": float(rate),
+        "liquidity_factor": None if liquidity_factor is None else float(liquidity_factor),
+        "liquid_mask": _liquid_mask_from_labels(tickers, labels_override or {}),
+        "alignment": alignment,
+        "align_window": align_window,
+        "cov_estimator": cov_estimator,
+        "factors": int(factors) if cov_estimator == "factor" else None,
+        "format": frontier_format,
+        "method": method,
+        "include_frontier": bool(include_frontier),
+    }
+    return _cached_result("optimal_portfolio", tickers, inputs, _get_optimal_portfolio,
+                          tickers, weights, risk_free, risk_free_type, liquidity_factor, labels_override,
+                          alignment, align_window, cov_estimator, factors, frontier_format,
+                          method, include_frontier)
@@ -1,5 +1,6 @@
 from db_config import db
 import numpy as np
+from utils.returnsCodec import _decode_returns
 
 def _get_security_info(ticker):
     try:
@@ -10,7 +11,7 @@ def _get_security_info(ticker):
         security_data = db.securities.find_one({"ticker": ticker})
 
         if security_data:
-            daily_return = np.array(security_data["daily_return"])
+            daily_return = _decode_returns(security_data["daily_return"])
             expected_return = daily_return.mean()*250*100
             variance_pct = daily_return.var()*250*100
             std_dev = np.sqrt(daily_return.var()*250)*100
@@ -0,0 +1,58 @@
+import numpy as np
+from scipy.cluster.hierarchy import linkage, leaves_list
+from scipy.spatial.distance import squareform
+from utils.alignReturns import _corr_from_cov
+
+HRP_LINKAGES = ("single", "average", "complete", "ward")
+
+
+def _quasi_diag_order(corr, method="single"):
+    """
+    Leaf order of a hierarchical clustering on the correlation distance
+    sqrt((1 - rho) / 2): similar assets end up next to each other, so the
+    reordered covariance is close to block diagonal. Single linkage runs on
+    the minimum spanning tree, O(N²).
+    """
+    dist = np.sqrt(np.clip((1.0 - corr) / 2.0, 0.0, 1.0))
+    np.fill_diagonal(dist, 0.0)
+    return leaves_list(linkage(squareform(dist, checks=False), method=method))
+
+
+def _hrp_weights(Sigma, method="single"):
+    """
+    Hierarchical Risk Parity (López de Prado): cluster, quasi-diagonalize,
+    then split the ordered assets in halves recursively, dividing each
+    parent's weight between its halves in inverse proportion to their
+    inverse-variance-portfolio variance. No matrix is inverted, and the
+    variance blocks of one bisection level together cover at most half the
+    matrix of the level above, so the whole bisection is O(N²).
+    Returns long-only weights summing to 1.
+    """
+    Sigma = np.asarray(Sigma, dtype=np.float64)
+    n = Sigma.shape[0]
+    var = np.diag(Sigma).copy()
+    var[var <= 0] = np.finfo(float).tiny
+    if n == 1:
+        return np.ones(1)
+
+    corr = np.nan_to_num(_corr_from_cov(Sigma), nan=0.0)
+    order = _quasi_diag_order(np.clip(corr, -1.0, 1.0), method)
+
+    def cluster_var(items):
+        ivp = 1.0 / var[items]
+        ivp /= ivp.sum()
+        return float(ivp @ Sigma[np.ix_(items, items)] @ ivp)
+
+    w = np.ones(n)
+    stack = [order]
+    while stack:
+        items = stack.pop()
+        if items.size < 2:
+            continue
+        left, right = items[:items.size // 2], items[items.size // 2:]
+        v_left, v_right = cluster_var(left), cluster_var(right)
+        alpha = 1.0 - v_left / (v_left + v_right) if v_left + v_right > 0 else 0.5
+        w[left] *= alpha
+        w[right] *= 1.0 - alpha
+        stack += [left, right]
+    return w / w.sum()
@@ -0,0 +1,140 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from os import getenv
+import numpy as np
+from pymongo import UpdateOne
+from db_config import db
+from models.SecurityModel import _load_securities_map
+from utils.priceProvider import _get_price_provider
+from utils.returnsCodec import SCHEMA_VERSION, _encode_returns, _encode_dates
+from utils.returnsPanel import _invalidate_returns_panel
+from utils.covarianceStore import _schedule_covariance_rebuild
+from utils.resultCache import _invalidate_results
+
+INGEST_BATCH_SIZE = int(getenv("INGEST_BATCH_SIZE", "50"))
+INGEST_MAX_WORKERS = int(getenv("INGEST_MAX_WORKERS", "8"))
+INGEST_RETRIES = int(getenv("INGEST_RETRIES", "3"))
+INGEST_BACKOFF = float(getenv("INGEST_BACKOFF", "1.0"))
+
+
+def _with_retry(fn, *args, retries=INGEST_RETRIES, backoff=INGEST_BACKOFF, **kwargs):
+    """Call fn, retrying with exponential backoff. Returns (result, attempts)."""
+    for attempt in range(1, retries + 1):
+        try:
+            return fn(*args, **kwargs), attempt
+        except Exception as e:
+            if attempt == retries:
+                raise
+            logging.warning("%s failed (attempt %d/%d): %s", getattr(fn, "__name__", fn), attempt, retries, e)
+            time.sleep(backoff * 2 ** (attempt - 1))
+
+
+def _long_name(provider, ticker, retries, backoff):
+    try:
+        info, _ = _with_retry(provider.info, ticker, retries=retries, backoff=backoff)
+        return info.get("longName") or info.get("shortName") or ticker
+    except Exception:
+        return ticker
+
+
+def _ingest_batch(items, provider, pool, retries, backoff):
+    """Download, transform and write one batch. Returns per-ticker results."""
+    tickers = [it["ticker"] for it in items]
+    sec_map = _load_securities_map()
+
+    existing = {d["ticker"] for d in db.securities.find({"ticker": {"$in": tickers}}, {"_id": 0, "ticker": 1})}
+    new = [t for t in tickers if t not in existing]
+
+    results, ops = {}, []
+    prices, attempts = None, 0
+    if new:
+        try:
+            prices, attempts = _with_retry(provider.download, new, period="5y", retries=retries, backoff=backoff)
+        except Exception as e:
+            logging.error("Batch download failed for %d tickers: %s", len(new), e)
+            results.update({t: {"status": 500, "message": str(e), "attempts": retries} for t in new})
+            new = []
+
+    if new:
+        # info lookups run concurrently while the batch's returns are computed
+        names = {t: pool.submit(_long_name, provider, t, retries, backoff) for t in new}
+        prices = prices.reindex(columns=new)
+        # per column: a return spans the ticker's own previous price, whichever dates the others traded
+        log_ret = {t: np.log(prices[t].dropna()).diff().dropna() for t in new}
+        fetched_on = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+    by_ticker = {it["ticker"]: it for it in items}
+    for t in tickers:
+        meta = sec_map.get(t, {})
+        labels = {
+            "liquidity_label": by_ticker[t].get("label") or meta.get("label"),
+            "proxy_category": by_ticker[t].get("proxy_category") or meta.get("proxy_category"),
+        }
+        if t in existing:
+            # as before: existing securities are not re-downloaded, only re-tagged
+            ops.append(UpdateOne({"ticker": t}, {"$set": labels}))
+            results[t] = {"status": 400, "message": "Security is already in the DB."}
+            continue
+        if t in results:
+            continue
+
+        col = log_ret[t]
+        if col.empty:
+            results[t] = {"status": 404, "message": "No price data found.", "attempts": attempts}
+            continue
+        ops.append(UpdateOne({"ticker": t}, {"$set": {
+            "ticker": t,
+            "long_name": names[t].result(),
+            "schema_version": SCHEMA_VERSION,
+            "close_date": _encode_dates(col.index.values),
+            "daily_return": _encode_returns(col.to_numpy()),
+            "fetched_on": fetched_on,
+            **labels,
+        }}, upsert=True))
+        results[t] = {"status": 201, "attempts": attempts}
+
+    if ops:
+        try:
+            _with_retry(db.securities.bulk_write, ops, ordered=False, retries=retries, backoff=backoff)
+        except Exception as e:
+            logging.error("Batch write failed: %s", e)
+            for t in tickers:
+                if results[t]["status"] in (201, 400):
+                    results[t] = {"status": 500, "message": str(e)}
+
+    return [{"ticker": t, **results[t]} for t in tickers]
+
+
+def _ingest_securities(items, provider=None, batch_size=INGEST_BATCH_SIZE, max_workers=INGEST_MAX_WORKERS,
+                       retries=INGEST_RETRIES, backoff=INGEST_BACKOFF, progress=None):
+    """
+    Batched ingestion of new securities.
+
+    `items` are {ticker, label, proxy_category} dicts. Each batch of
+    `batch_size` tickers is downloaded with one provider call, the info
+    lookups go through a thread pool of at most `max_workers`, log returns
+    are computed per ticker on its own trading dates and the batch is written
+    with one bulk_write.
+    Provider calls and writes are retried with exponential backoff.
+    Returns one {"ticker", "status", ...} per item (201 inserted, 400 already
+    stored and re-tagged, 404 no data, 500 failed).
+    `progress(done, total)` is called after every batch.
+    """
+    provider = provider or _get_price_provider()
+    items = list({it["ticker"]: it for it in items}.values())
+    batch_size = max(1, int(batch_size))
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, int(max_workers))) as pool:
+        for i in range(0, len(items), batch_size):
+            results.extend(_ingest_batch(items[i:i + batch_size], provider, pool, retries, backoff))
+            if progress is not None:
+                progress(len(results), len(items))
+
+    if any(r["status"] in (201, 400) for r in results):
+        _invalidate_returns_panel()
+        _invalidate_results([r["ticker"] for r in results if r["status"] in (201, 400)])
+        _schedule_covariance_rebuild()
+    return results
@@ -0,0 +1,181 @@
+import cProfile
+import io
+import logging
+import pstats
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from os import getenv
+from pathlib import Path
+from flask import g, has_request_context, request
+
+# Latency histogram buckets (seconds)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Opt-in request profiling: PROFILE_REQUESTS=1 enables it for requests with ?profile=1
+# (or an X-Profile header); PROFILE_SAMPLE_RATE additionally profiles a random share
+PROFILE_REQUESTS = getenv("PROFILE_REQUESTS", "").lower() in ("1", "true", "yes")
+PROFILE_SAMPLE_RATE = float(getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = Path(getenv("PROFILE_DIR", Path(__file__).resolve().parent.parent / "cache" / "profiles"))
+
+_METRICS = {
+    "http_request_duration_seconds": ("histogram", "Request latency by route, method and status."),
+    "stage_duration_seconds": ("histogram", "Time spent in named stages of a request or job."),
+    "solver_solves_total": ("counter", "Optimizer runs by solver."),
+    "solver_iterations_total": ("counter", "Optimizer iterations by solver."),
+    "solver_failures_total": ("counter", "Optimizer runs that did not converge, by solver."),
+    "solver_rejections_total": ("counter", "Requests turned away because every solver slot was taken."),
+    "solver_timeouts_total": ("counter", "Requests whose solver work exceeded SOLVER_TIMEOUT."),
+    "solver_pool_restarts_total": ("counter", "Solver pools replaced after a worker process died."),
+    "result_cache_requests_total": ("counter", "Result cache lookups by kind and outcome (hit_memory, hit_mongo, miss, bypass)."),
+    "frontier_streams_total": ("counter", "Streamed frontier responses by outcome (complete, cancelled, error)."),
+}
+_LOCK = threading.Lock()
+_HISTOGRAMS = {}   # (name, labels) -> [bucket counts..., +Inf count, sum]
+_COUNTERS = {}     # (name, labels) -> value
+
+
+def _labels(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _observe(name, seconds, **labels):
+    key = (name, _labels(labels))
+    with _LOCK:
+        h = _HISTOGRAMS.get(key)
+        if h is None:
+            h = _HISTOGRAMS[key] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+        for i, le in enumerate(LATENCY_BUCKETS):
+            if seconds <= le:
+                h[i] += 1
+        h[len(LATENCY_BUCKETS)] += 1
+        h[-1] += seconds
+
+
+def _count(name, value=1, **labels):
+    key = (name, _labels(labels))
+    with _LOCK:
+        _COUNTERS[key] = _COUNTERS.get(key, 0) + value
+
+
+def _route():
+    if has_request_context():
+        return request.url_rule.rule if request.url_rule else "unmatched"
+    return "background"
+
+
+@contextmanager
+def _stage(name):
+    """
+    Time a named stage. Inside a request the duration is added to that
+    request's Server-Timing breakdown; it always feeds the stage histogram.
+    """
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        if has_request_context() and hasattr(g, "_timings"):
+            g._timings[name] = g._timings.get(name, 0.0) + dt
+        _observe("stage_duration_seconds", dt, stage=name, route=_route())
+
+
+def _record_solve(solver, res):
+    """Count one optimizer run (scipy OptimizeResult) for the solver metrics."""
+    _count("solver_solves_total", solver=solver)
+    _count("solver_iterations_total", int(getattr(res, "nit", 0)), solver=solver)
+    if not getattr(res, "success", False):
+        _count("solver_failures_total", solver=solver)
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+def _render_metrics():
+    """All metrics of this process in the Prometheus text exposition format."""
+    with _LOCK:
+        histograms = {k: list(v) for k, v in _HISTOGRAMS.items()}
+        counters = dict(_COUNTERS)
+
+    lines = []
+    for name, (kind, help_text) in _METRICS.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        if kind == "counter":
+            for (n, labels), value in sorted(counters.items()):
+                if n == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+            continue
+        for (n, labels), h in sorted(histograms.items()):
+            if n != name:
+                continue
+            for le, c in zip(LATENCY_BUCKETS, h):
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', repr(le))])} {c}")
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {h[len(LATENCY_BUCKETS)]}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {h[-1]:.6f}")
+            lines.append(f"{name}_count{_format_labels(labels)} {h[len(LATENCY_BUCKETS)]}")
+    return "\n".join(lines) + "\n"
+
+
+# --- Flask hooks ---
+
+def _wants_profile():
+    if not PROFILE_REQUESTS:
+        return False
+    if request.args.get("profile") == "1" or request.headers.get("X-Profile"):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def _save_profile(profiler):
+    """Dump the request's profile next to the others and log its top functions."""
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    endpoint = (request.endpoint or "unmatched").replace(".", "_")
+    path = PROFILE_DIR / f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}-{endpoint}.prof"
+    profiler.dump_stats(path)
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(15)
+    logging.info("Profile of %s %s saved to %s\n%s", request.method, request.path, path, out.getvalue())
+    return path.name
+
+
+def _before_request():
+    g._timings = {}
+    g._t0 = time.perf_counter()
+    g._profiler = None
+    if _wants_profile():
+        g._profiler = cProfile.Profile()
+        g._profiler.enable()
+
+
+def _after_request(response):
+    t0 = getattr(g, "_t0", None)
+    if t0 is None:
+        return response
+    total = time.perf_counter() - t0
+
+    profiler = getattr(g, "_profiler", None)
+    if profiler is not None:
+        profiler.disable()
+        try:
+            response.headers["X-Profile"] = _save_profile(profiler)
+        except OSError as e:
+            logging.warning("Could not save request profile: %s", e)
+
+    timings = [f"{name};dur={dt * 1e3:.2f}" for name, dt in g._timings.items()]
+    timings.append(f"total;dur={total * 1e3:.2f}")
+    response.headers["Server-Timing"] = ", ".join(timings)
+    _observe("http_request_duration_seconds", total, route=_route(), method=request.method,
+             status=response.status_code)
+    return response
+
+
+def _init_instrumentation(app):
+    """Install the timing / profiling hooks on the Flask app."""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
@@ -0,0 +1,151 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from os import getenv
+import numpy as np
+from db_config import db
+
+JOB_WORKERS = int(getenv("JOB_WORKERS", "2"))
+# How often a running job re-reads its document for a cancel request from another worker
+_CANCEL_POLL_SECONDS = 1.0
+
+_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
+_FUTURES = {}
+
+FINAL_STATES = ("succeeded", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def _to_plain(obj):
+    """Recursively turn NumPy scalars/arrays into BSON/JSON-friendly Python values."""
+    if isinstance(obj, dict):
+        return {str(k): _to_plain(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_to_plain(v) for v in obj]
+    if isinstance(obj, np.ndarray):
+        return _to_plain(obj.tolist())
+    if isinstance(obj, np.generic):
+        obj = obj.item()
+    if isinstance(obj, float) and not np.isfinite(obj):
+        return None
+    return obj
+
+
+class JobContext:
+    """Handed to a running job: reports progress and raises JobCancelled when asked to stop."""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self._last_poll = 0.0
+
+    def cancelled(self):
+        now = time.monotonic()
+        if now - self._last_poll < _CANCEL_POLL_SECONDS:
+            return False
+        self._last_poll = now
+        doc = db.jobs.find_one({"_id": self.job_id}, {"cancel_requested": 1})
+        return bool(doc and doc.get("cancel_requested"))
+
+    def progress(self, done, total, message=None):
+        db.jobs.update_one({"_id": self.job_id}, {"$set": {
+            "progress": {"done": int(done), "total": int(total), "message": message},
+            "updated_at": datetime.utcnow(),
+        }})
+        if self.cancelled():
+            raise JobCancelled()
+
+
+def _executor():
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+        return _EXECUTOR
+
+
+def _finish(job_id, **fields):
+    db.jobs.update_one({"_id": job_id}, {"$set": {**fields, "finished_at": datetime.utcnow()}})
+
+
+def _run_job(job_id, fn, args, kwargs, with_progress):
+    try:
+        res = db.jobs.update_one(
+            {"_id": job_id, "status": "queued"},
+            {"$set": {"status": "running", "started_at": datetime.utcnow()}}
+        )
+        if res.modified_count == 0:
+            return  # cancelled before it started
+
+        ctx = JobContext(job_id)
+        if with_progress:
+            kwargs = {**kwargs, "progress": ctx.progress}
+        result = fn(*args, **kwargs)
+
+        # optimizer-style functions return (payload, http_status)
+        status_code = 200
+        if isinstance(result, tuple) and len(result) == 2 and isinstance(result[1], int):
+            result, status_code = result
+        _finish(job_id, status="succeeded" if status_code < 400 else "failed",
+                result=_to_plain(result), result_status=status_code)
+
+    except JobCancelled:
+        _finish(job_id, status="cancelled")
+    except Exception as e:
+        logging.error("Job %s failed: %s", job_id, e)
+        _finish(job_id, status="failed", error=str(e))
+    finally:
+        _FUTURES.pop(job_id, None)
+
+
+def _submit_job(kind, fn, *args, with_progress=False, **kwargs):
+    """
+    Run fn(*args, **kwargs) on the local job pool and track it in `db.jobs`.
+    With `with_progress`, fn also receives `progress=callback(done, total, message)`,
+    which is how long jobs report progress and notice cancellation.
+    Returns the job id.
+    """
+    job_id = uuid.uuid4().hex
+    db.jobs.insert_one({
+        "_id": job_id,
+        "kind": kind,
+        "status": "queued",
+        "progress": None,
+        "result": None,
+        "error": None,
+        "cancel_requested": False,
+        "created_at": datetime.utcnow(),
+    })
+    _FUTURES[job_id] = _executor().submit(_run_job, job_id, fn, args, kwargs, with_progress)
+    return job_id
+
+
+def _get_job(job_id):
+    doc = db.jobs.find_one({"_id": job_id})
+    if doc:
+        doc["id"] = doc.pop("_id")
+    return doc
+
+
+def _cancel_job(job_id):
+    """
+    Request cancellation. Queued jobs are cancelled immediately; running jobs
+    stop at their next progress report. Returns the updated job, or None.
+    """
+    doc = db.jobs.find_one_and_update(
+        {"_id": job_id, "status": {"$nin": list(FINAL_STATES)}},
+        {"$set": {"cancel_requested": True}}
+    )
+    if doc is not None:
+        db.jobs.update_one({"_id": job_id, "status": "queued"},
+                           {"$set": {"status": "cancelled", "finished_at": datetime.utcnow()}})
+        fut = _FUTURES.get(job_id)
+        if fut is not None:
+            fut.cancel()
+    return _get_job(job_id)
@@ -0,0 +1,55 @@
+"""
+Rewrite legacy securities (list-of-floats returns, "%Y-%m-%d" date strings)
+into the binary columnar layout (schema 2).
+
+    cd backend && python -m utils.migrateReturnsStorage [--dry-run] [--batch-size 200]
+"""
+import argparse
+import logging
+from pymongo import UpdateOne
+from db_config import db
+from utils.returnsCodec import SCHEMA_VERSION, _decode_security, _encode_returns, _encode_dates, _days_to_dates
+from utils.returnsPanel import _invalidate_returns_panel
+
+
+def _migrate_returns_storage(batch_size=200, dry_run=False):
+    query = {"schema_version": {"$ne": SCHEMA_VERSION}}
+    projection = {"_id": 1, "ticker": 1, "daily_return": 1, "close_date": 1}
+
+    migrated, skipped, ops = 0, [], []
+    for doc in db.securities.find(query, projection):
+        days, ret = _decode_security(doc)
+        if days.size != ret.size:
+            skipped.append(doc.get("ticker"))
+            continue
+        ops.append(UpdateOne(
+            {"_id": doc["_id"], "schema_version": {"$ne": SCHEMA_VERSION}},
+            {"$set": {
+                "daily_return": _encode_returns(ret),
+                "close_date": _encode_dates(_days_to_dates(days)),
+                "schema_version": SCHEMA_VERSION,
+            }}
+        ))
+        if len(ops) >= batch_size:
+            if not dry_run:
+                db.securities.bulk_write(ops, ordered=False)
+            migrated += len(ops)
+            ops = []
+    if ops:
+        if not dry_run:
+            db.securities.bulk_write(ops, ordered=False)
+        migrated += len(ops)
+
+    if migrated and not dry_run:
+        _invalidate_returns_panel()
+    return {"migrated": migrated, "skipped": skipped, "dry_run": dry_run}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate stored returns to binary columnar storage.")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    summary = _migrate_returns_storage(args.batch_size, args.dry_run)
+    logging.info("Migration finished: %s", summary)
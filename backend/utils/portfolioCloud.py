@@ -0,0 +1,137 @@
+from os import getenv
+import numpy as np
+from utils.qpCore import PortfolioQP
+from utils.riskFreeRates import _get_risk_free_rate
+from utils.instrumentation import _stage
+from utils.covEstimators import DEFAULT_FACTORS
+from utils.getOptimalPortfolio import _load_moments, _liquid_mask_from_labels, _liquidity_target
+
+CLOUD_MAX_SAMPLES = int(getenv("CLOUD_MAX_SAMPLES", "2000000"))
+# Weights held in memory per chunk (rows x tickers), ~16 MB of float64
+CLOUD_CHUNK_ELEMENTS = int(getenv("CLOUD_CHUNK_ELEMENTS", "2000000"))
+CLOUD_MAX_BINS = 200
+CLOUD_MAX_POINTS = 20000
+
+
+def _keep_smallest(keys, rows, new_keys, new_rows, k):
+    """Merge a chunk into the running sample: the k rows with the smallest random keys (uniform without replacement)."""
+    keys = np.concatenate([keys, new_keys])
+    rows = np.concatenate([rows, new_rows])
+    if keys.size > k:
+        idx = np.argpartition(keys, k - 1)[:k]
+        keys, rows = keys[idx], rows[idx]
+    return keys, rows
+
+
+def _portfolio_cloud(tickers, samples=100000, alpha=1.0, risk_free=0.03, risk_free_type=None,
+                     labels_override=None, liquidity_factor=None, bins=60, max_points=2000, seed=None,
+                     alignment="intersection", align_window=None, cov_estimator="sample",
+                     factors=DEFAULT_FACTORS, progress=None):
+    """
+    Random long-only portfolios w ~ Dirichlet(alpha), optionally keeping only
+    those whose liquid share meets the liquidity target. Return, volatility
+    and Sharpe are computed chunk by chunk (one matmul + row-wise einsum per
+    chunk), and only bounded summaries are kept:
+
+      * a `bins` x `bins` histogram over (risk, return) with the mean Sharpe per cell,
+      * a uniform sample of at most `max_points` (risk, return, sharpe) points,
+      * the best-Sharpe portfolio seen.
+
+    The histogram ranges are known up front: a long-only portfolio's return
+    lies between the lowest and highest asset return and its volatility
+    below the highest asset volatility.
+    Returns (payload, status).
+    """
+    samples = int(samples)
+    if not tickers or len(tickers) < 2:
+        return {"error": "Insufficient number of tickers"}, 400
+    if not 1 <= samples <= CLOUD_MAX_SAMPLES:
+        return {"error": f"samples must be between 1 and {CLOUD_MAX_SAMPLES}."}, 400
+    if float(alpha) <= 0:
+        return {"error": "alpha must be positive."}, 400
+    bins = int(np.clip(bins, 1, CLOUD_MAX_BINS))
+    max_points = int(np.clip(max_points, 0, CLOUD_MAX_POINTS))
+
+    moments, error = _load_moments(tickers, alignment, align_window, cov_estimator, factors)
+    if error:
+        return error
+    mu, cov, cov_version = moments
+    qp = PortfolioQP(cov, mu)
+    mu_arr = mu.to_numpy()
+    n = len(tickers)
+
+    m_liq = _liquid_mask_from_labels(tickers, labels_override or {})
+    t_liq, error = _liquidity_target(liquidity_factor, m_liq)
+    if error:
+        return {"error": error}, 400
+    risk_free, _ = _get_risk_free_rate(risk_free_type, np.float64(risk_free) / 100.0)
+
+    # --- fixed histogram ranges (annualized) ---
+    asset_vol = np.sqrt(np.diag(qp.Sigma) if qp.op is None else qp.op.diag())
+    ret_edges = np.linspace((1 + mu_arr.min()) ** 252 - 1, (1 + mu_arr.max()) ** 252 - 1, bins + 1)
+    risk_edges = np.linspace(0.0, asset_vol.max() * np.sqrt(252), bins + 1)
+    counts = np.zeros((bins, bins), dtype=np.int64)
+    sharpe_sum = np.zeros((bins, bins))
+
+    rng = np.random.default_rng(seed)
+    chunk = max(1000, CLOUD_CHUNK_ELEMENTS // n)
+    keys, points = np.empty(0), np.empty((0, 3))
+    best_sharpe, best_w = -np.inf, None
+    accepted = 0
+
+    with _stage("cloud"):
+        for start in range(0, samples, chunk):
+            size = min(chunk, samples - start)
+            W = rng.dirichlet(np.full(n, float(alpha)), size=size)
+            if t_liq:
+                W = W[W @ m_liq >= t_liq]
+                if not W.shape[0]:
+                    continue
+
+            ret = (1 + W @ mu_arr) ** 252 - 1
+            vol = np.sqrt(np.maximum(qp.variances(W), 0.0) * 252)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                sharpe = np.where(vol > 0, (ret - risk_free) / vol, np.nan)
+            accepted += W.shape[0]
+
+            # clip rounding overshoot at the range ends into the outer bins
+            hv, hr = np.clip(vol, risk_edges[0], risk_edges[-1]), np.clip(ret, ret_edges[0], ret_edges[-1])
+            h, _, _ = np.histogram2d(hv, hr, bins=(risk_edges, ret_edges))
+            s, _, _ = np.histogram2d(hv, hr, bins=(risk_edges, ret_edges), weights=np.nan_to_num(sharpe))
+            counts += h.astype(np.int64)
+            sharpe_sum += s
+
+            i = int(np.nanargmax(sharpe)) if np.isfinite(sharpe).any() else None
+            if i is not None and sharpe[i] > best_sharpe:
+                best_sharpe, best_w = float(sharpe[i]), W[i].copy()
+
+            if max_points:
+                keys, points = _keep_smallest(keys, points, rng.random(W.shape[0]),
+                                              np.column_stack([vol, ret, sharpe]), max_points)
+            if progress is not None:
+                progress(start + size, samples)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_sharpe = np.where(counts > 0, sharpe_sum / counts, np.nan)
+    points = points[np.argsort(points[:, 0])] if points.size else points
+
+    return {
+        "tickers": list(tickers),
+        "cov_version": cov_version,
+        "riskFree": np.float64(risk_free),
+        "samples": samples,
+        "accepted": accepted,
+        "acceptance_rate": accepted / samples,
+        "liquid_target_min": None if t_liq is None else round(t_liq * 100, 2),
+        "density": {
+            "risk_edges": risk_edges,
+            "return_edges": ret_edges,
+            "counts": counts,              # [risk bin][return bin]
+            "mean_sharpe": mean_sharpe,
+        },
+        "points": {"Risk": points[:, 0], "Return": points[:, 1], "Sharpe": points[:, 2]},
+        "max_sharpe_sample": None if best_w is None else {
+            "weights": {tickers[i]: round(w * 100, 2) for i, w in enumerate(best_w.tolist())},
+            "sharpe": round(best_sharpe, 4),
+        },
+    }, 200
@@ -0,0 +1,97 @@
+import zlib
+from os import getenv
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+
+class YahooPriceProvider:
+    """Adjusted close prices and security info from Yahoo Finance."""
+
+    def download(self, tickers, start=None, period=None):
+        """
+        Adjusted closes for `tickers` as a DataFrame (naive DatetimeIndex, one
+        column per ticker). Pass either `start` (inclusive) or `period` ("5y").
+        """
+        tickers = list(tickers)
+        kwargs = {"start": pd.Timestamp(start).strftime("%Y-%m-%d")} if start is not None else {"period": period or "5y"}
+        df = yf.download(
+            tickers=tickers,
+            progress=False,
+            auto_adjust=False,
+            group_by="column",
+            threads=True,
+            **kwargs
+        )
+        if df is None or df.empty:
+            return pd.DataFrame(columns=tickers, dtype="float64")
+
+        fields = df.columns.get_level_values(0) if isinstance(df.columns, pd.MultiIndex) else df.columns
+        px = df["Adj Close"] if "Adj Close" in fields else df["Close"]
+        if isinstance(px, pd.Series):
+            px = px.to_frame(tickers[0])
+        px = px.astype("float64")
+        px.index = pd.to_datetime(px.index, utc=False).tz_localize(None)
+        return px.reindex(columns=tickers)
+
+    def info(self, ticker):
+        return yf.Ticker(ticker).info or {}
+
+
+class FakePriceProvider:
+    """
+    Offline stand-in: deterministic geometric random-walk prices per ticker on
+    business days up to `as_of`. Overlapping downloads return identical prices,
+    so incremental refreshes can be checked against full downloads.
+    `closed` maps tickers to dates they do not trade (another exchange's
+    holidays, halts), which come back as NaN in multi-ticker downloads.
+    """
+
+    def __init__(self, as_of=None, origin="2015-01-01", missing=(), closed=None):
+        self.as_of = pd.Timestamp(as_of or pd.Timestamp.today()).normalize()
+        self.origin = pd.Timestamp(origin)
+        self.missing = {t.upper() for t in missing}
+        self.closed = {t.upper(): pd.DatetimeIndex(pd.to_datetime(list(d))) for t, d in (closed or {}).items()}
+        self.calls = []
+
+    def _path(self, ticker):
+        days = pd.bdate_range(self.origin, self.as_of)
+        rng = np.random.default_rng(zlib.crc32(ticker.encode()))
+        steps = rng.normal(0.0003, 0.012, size=days.size)
+        path = pd.Series(100.0 * np.exp(np.cumsum(steps)), index=days)
+        if ticker.upper() in self.closed:
+            path = path.drop(self.closed[ticker.upper()], errors="ignore")
+        return path
+
+    def download(self, tickers, start=None, period=None):
+        tickers = list(tickers)
+        self.calls.append(("download", tuple(tickers), start, period))
+        if start is not None:
+            lo = pd.Timestamp(start)
+        else:
+            years = int(str(period or "5y").rstrip("y"))
+            lo = self.as_of - pd.DateOffset(years=years)
+        cols = {t: self._path(t).loc[lo:] for t in tickers if t.upper() not in self.missing}
+        return pd.DataFrame(cols).reindex(columns=tickers)
+
+    def info(self, ticker):
+        self.calls.append(("info", ticker))
+        if ticker.upper() in self.missing:
+            return {}
+        return {"longName": f"{ticker} Fake Corp.", "shortName": ticker}
+
+
+_PROVIDER = None
+
+
+def _get_price_provider():
+    """Process-wide provider; PRICE_PROVIDER=fake selects the offline stand-in."""
+    global _PROVIDER
+    if _PROVIDER is None:
+        _PROVIDER = FakePriceProvider() if getenv("PRICE_PROVIDER", "").lower() == "fake" else YahooPriceProvider()
+    return _PROVIDER
+
+
+def _set_price_provider(provider):
+    global _PROVIDER
+    _PROVIDER = provider
@@ -0,0 +1,124 @@
+import numpy as np
+from scipy.optimize import minimize
+from utils.instrumentation import _record_solve
+from utils.covEstimators import FactorCovariance
+
+
+class PortfolioQP:
+    """
+    Shared mean-variance optimization core.
+
+    Holds one NumPy covariance (plain and Cholesky-factorized, built once per
+    request) and hands out objectives, constraints and their exact gradients
+    for scipy's SLSQP. The variance objective is scaled by the mean asset
+    variance so solver tolerances mean the same thing for any universe.
+    A FactorCovariance is used as an operator: risk and gradients cost O(NK)
+    and the dense matrix is only built if a caller asks for `Sigma`.
+    """
+
+    def __init__(self, Sigma, mu=None):
+        if isinstance(Sigma, FactorCovariance):
+            self.op = Sigma
+            self._dense = None
+            diag = Sigma.diag()
+            self.chol = None
+        else:
+            self.op = None
+            self._dense = np.ascontiguousarray(np.asarray(Sigma, dtype=np.float64))
+            diag = np.diag(self._dense)
+            self.chol = self._factorize(self._dense)
+        self.n = diag.shape[0]
+        self.mu = None if mu is None else np.asarray(mu, dtype=np.float64).ravel()
+        self.scale = 1.0 / diag.mean() if diag.mean() > 0 else 1.0
+        self.nit = 0
+
+    @property
+    def Sigma(self):
+        """Dense covariance (materialized on first use for a factor model)."""
+        if self._dense is None:
+            self._dense = self.op.dense()
+        return self._dense
+
+    def _matvec(self, w):
+        return self.op.matvec(w) if self.op is not None else self._dense @ w
+
+    @staticmethod
+    def _factorize(Sigma):
+        # lower-triangular L with Sigma = L L'; add a tiny ridge if the sample
+        # covariance is only semi-definite
+        jitter = 0.0
+        eps = 1e-12 * max(np.abs(np.diag(Sigma)).max(), 1e-300)
+        for _ in range(6):
+            try:
+                return np.linalg.cholesky(Sigma + jitter * np.eye(Sigma.shape[0]))
+            except np.linalg.LinAlgError:
+                jitter = eps if jitter == 0.0 else jitter * 100
+        return None
+
+    # --- objectives ---
+    def variance(self, w):
+        if self.op is not None:
+            return self.op.quad(w)
+        return float(w @ self._dense @ w)
+
+    def variance_grad(self, w):
+        return 2.0 * self._matvec(w)
+
+    def variances(self, W):
+        """w'Σw for every row of W."""
+        if self.op is not None:
+            return self.op.quad_rows(W)
+        # one BLAS matmul, then a row-wise dot (much faster than a three-operand einsum)
+        return np.einsum("ij,ij->i", W @ self._dense, W)
+
+    def risk(self, w):
+        if self.chol is not None:
+            return float(np.linalg.norm(self.chol.T @ w))
+        return float(np.sqrt(max(self.variance(w), 0.0)))
+
+    def risk_grad(self, w):
+        r = self.risk(w)
+        return self._matvec(w) / r if r > 0 else np.zeros(self.n)
+
+    def objective(self, w):
+        return self.scale * self.variance(w)
+
+    def objective_grad(self, w):
+        return self.scale * self.variance_grad(w)
+
+    # --- constraints ---
+    def budget_constraint(self):
+        ones = np.ones(self.n)
+        return {'type': 'eq', 'fun': lambda x: float(x.sum() - 1.0), 'jac': lambda x: ones}
+
+    def liquidity_constraint(self, mask, target):
+        m = np.asarray(mask, dtype=np.float64)
+        t = float(target)
+        return {'type': 'ineq', 'fun': lambda x: float(x @ m - t), 'jac': lambda x: m}
+
+    def return_constraint(self, target):
+        mu = self.mu
+        t = float(target)
+        return {'type': 'eq', 'fun': lambda x: float(x @ mu - t), 'jac': lambda x: mu}
+
+    # --- solves ---
+    def min_variance(self, w0, constraints=None, bounds=None, options=None):
+        """SLSQP min-variance solve with analytic gradients."""
+        if constraints is None:
+            constraints = [self.budget_constraint()]
+        if bounds is None:
+            bounds = ((0.0, 1.0),) * self.n
+        opts = {"ftol": 1e-10, "disp": False, "maxiter": 1000}
+        opts.update(options or {})
+        res = minimize(
+            self.objective,
+            np.asarray(w0, dtype=np.float64),
+            jac=self.objective_grad,
+            method="SLSQP",
+            constraints=constraints,
+            bounds=bounds,
+            options=opts
+        )
+        self.nit += int(getattr(res, "nit", 0))
+        _record_solve("min_variance", res)
+        return res
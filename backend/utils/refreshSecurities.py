@@ -0,0 +1,166 @@
+import logging
+from datetime import datetime
+import numpy as np
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+from db_config import db
+from utils.priceProvider import _get_price_provider
+from utils.returnsCodec import SCHEMA_VERSION, _decode_security, _encode_returns, _encode_dates, _days_to_dates
+from utils.returnsPanel import _invalidate_returns_panel
+from utils.covarianceStore import _schedule_covariance_rebuild, _build_covariance_store
+from utils.resultCache import _invalidate_results
+
+# Rolling window kept per security: ~5 years of trading days
+ROLLING_WINDOW = 5 * 252
+
+
+def _new_log_returns(prices, last_day):
+    """
+    Log returns for the price rows strictly after `last_day` (int day number),
+    chained to the last price on or before it.
+    Returns (days, returns) - empty if there is nothing new.
+    """
+    s = prices.dropna()
+    days = s.index.values.astype("datetime64[D]").astype(np.int32)
+    base = np.searchsorted(days, last_day, side="right") - 1
+    if base < 0 or base >= days.size - 1:
+        return days[:0], np.array([], dtype=np.float64)
+    log_px = np.log(s.to_numpy(dtype=np.float64)[base:])
+    return days[base + 1:], np.diff(log_px)
+
+
+def _refresh_update(doc, new_days, new_ret, fetched_on, window):
+    """
+    Append the new tail to a stored security, keeping the last `window` rows.
+    Legacy list documents are appended in place with $push/$slice; binary
+    documents cannot be pushed to, so the trimmed blobs are rewritten with $set.
+    The filter on the previous fetched_on skips documents refreshed concurrently.
+    """
+    if doc.get("schema_version") == SCHEMA_VERSION:
+        days, ret = _decode_security(doc)
+        days = np.concatenate([days, new_days])[-window:]
+        ret = np.concatenate([ret, new_ret])[-window:]
+        update = {"$set": {
+            "close_date": _encode_dates(_days_to_dates(days)),
+            "daily_return": _encode_returns(ret),
+            "fetched_on": fetched_on,
+        }}
+    else:
+        update = {
+            "$push": {
+                "daily_return": {"$each": new_ret.tolist(), "$slice": -window},
+                "close_date": {"$each": [str(d) for d in _days_to_dates(new_days)], "$slice": -window},
+            },
+            "$set": {"fetched_on": fetched_on},
+        }
+    return UpdateOne({"ticker": doc["ticker"], "fetched_on": doc.get("fetched_on")}, update)
+
+
+def _apply_refresh(ops, results, fetched_on):
+    """
+    Write the (ticker, UpdateOne) pairs in one unordered bulk_write and correct
+    `results` for the ones that did not land: failed writes become "error",
+    and updates whose fetched_on filter no longer matched (a concurrent
+    refresh got there first) become "conflict". Matched updates are only
+    looked up ticker by ticker when the bulk result shows some went unmatched.
+    Returns the tickers actually updated.
+    """
+    tickers = [t for t, _ in ops]
+    failed = {}
+    try:
+        matched = db.securities.bulk_write([op for _, op in ops], ordered=False).matched_count
+    except BulkWriteError as e:
+        failed = {tickers[err["index"]]: err.get("errmsg", "write failed") for err in e.details.get("writeErrors", [])}
+        matched = e.details.get("nMatched", 0)
+    except PyMongoError as e:
+        logging.error("Refresh bulk_write failed: %s", e)
+        failed = {t: str(e) for t in tickers}
+        matched = 0
+
+    for t, message in failed.items():
+        results[t] = {"status": "error", "message": message}
+    pending = [t for t in tickers if t not in failed]
+    if matched < len(pending):
+        landed = {d["ticker"] for d in db.securities.find(
+            {"ticker": {"$in": pending}, "fetched_on": fetched_on}, {"_id": 0, "ticker": 1})}
+        for t in pending:
+            if t not in landed:
+                results[t] = {"status": "conflict", "message": "Changed by a concurrent refresh; not written."}
+        pending = [t for t in pending if t in landed]
+    return pending
+
+
+def _refresh_securities(tickers=None, provider=None, window=ROLLING_WINDOW, batch_size=100):
+    """
+    Incremental refresh: download only the prices after each security's last
+    stored close_date and append the new log returns.
+    Securities sharing a last date are downloaded together, `batch_size`
+    tickers per provider call, and all writes go out in one bulk_write.
+    Returns a list of {"ticker", "status", ...} per security.
+    """
+    provider = provider or _get_price_provider()
+    query = {} if tickers is None else {"ticker": {"$in": list(tickers)}}
+    projection = {"_id": 0, "ticker": 1, "close_date": 1, "daily_return": 1, "schema_version": 1, "fetched_on": 1}
+    docs = list(db.securities.find(query, projection))
+
+    results = {}
+    if tickers is not None:
+        found = {d["ticker"] for d in docs}
+        results.update({t: {"status": "not_found"} for t in tickers if t not in found})
+
+    # group by last stored date so one download covers a whole group
+    groups = {}
+    for doc in docs:
+        days, _ = _decode_security(doc)
+        if days.size == 0:
+            results[doc["ticker"]] = {"status": "empty"}
+            continue
+        groups.setdefault(int(days[-1]), []).append(doc)
+
+    fetched_on = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+    ops = []
+    for last_day, group in groups.items():
+        start = np.datetime64(last_day, "D")
+        for i in range(0, len(group), batch_size):
+            chunk = group[i:i + batch_size]
+            try:
+                prices = provider.download([d["ticker"] for d in chunk], start=start)
+            except Exception as e:
+                logging.error("Refresh download failed from %s: %s", start, e)
+                results.update({d["ticker"]: {"status": "error", "message": str(e)} for d in chunk})
+                continue
+
+            for doc in chunk:
+                t = doc["ticker"]
+                if t not in prices.columns or prices[t].isna().all():
+                    results[t] = {"status": "no_data"}
+                    continue
+                new_days, new_ret = _new_log_returns(prices[t], last_day)
+                if new_days.size == 0:
+                    results[t] = {"status": "up_to_date"}
+                    continue
+                ops.append((t, _refresh_update(doc, new_days, new_ret, fetched_on, window)))
+                results[t] = {"status": "updated", "added": int(new_days.size),
+                              "last_date": str(np.datetime64(int(new_days[-1]), "D"))}
+
+    if ops:
+        updated = _apply_refresh(ops, results, fetched_on)
+        if updated:
+            _invalidate_returns_panel()
+            _invalidate_results(updated)
+            _schedule_covariance_rebuild()
+
+    order = list(tickers) if tickers is not None else [d["ticker"] for d in docs]
+    return [{"ticker": t, **results[t]} for t in order if t in results]
+
+
+def _refresh_security(ticker, provider=None, window=ROLLING_WINDOW):
+    return _refresh_securities([ticker], provider=provider, window=window)[0]
+
+
+if __name__ == "__main__":
+    # nightly job: cd backend && python -m utils.refreshSecurities
+    results = _refresh_securities()
+    _build_covariance_store()   # the process exits right away, so build in the foreground
+    logging.info("Refreshed %d securities (%d updated)",
+                 len(results), sum(1 for r in results if r["status"] == "updated"))
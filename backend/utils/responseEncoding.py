@@ -0,0 +1,93 @@
+import gzip
+import numpy as np
+import orjson
+from flask import Response, request, stream_with_context
+
+try:
+    import brotli
+except ImportError:    # optional: without it responses are gzip-compressed only
+    brotli = None
+
+FORMATS = ("records", "columnar")
+COLUMNAR_MIMETYPE = "application/vnd.markowitz.columnar+json"
+# Bodies smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = 1024
+STREAM_MIMETYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+_ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj):
+    # orjson hands over what it cannot encode natively: non-contiguous arrays, odd dtypes, pandas objects
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def _dumps(payload):
+    """NumPy-aware JSON bytes; arrays are encoded directly, NaN/inf become null."""
+    return orjson.dumps(payload, default=_default, option=_ORJSON_OPTIONS)
+
+
+def _response_format():
+    """'columnar' when asked for with ?format=columnar or the columnar Accept type, else 'records'."""
+    fmt = request.args.get("format")
+    if fmt in FORMATS:
+        return fmt
+    return "columnar" if COLUMNAR_MIMETYPE in request.headers.get("Accept", "") else "records"
+
+
+def _accepted_encoding():
+    accept = request.headers.get("Accept-Encoding", "").lower()
+    if brotli is not None and "br" in accept:
+        return "br"
+    if "gzip" in accept:
+        return "gzip"
+    return None
+
+
+def _json_response(payload, status=200):
+    """JSON response encoded with orjson and compressed per Accept-Encoding (br, else gzip)."""
+    body = _dumps(payload)
+    headers = {"Vary": "Accept-Encoding"}
+    encoding = _accepted_encoding() if len(body) >= COMPRESS_MIN_BYTES else None
+    if encoding == "br":
+        body = brotli.compress(body, quality=5)
+    elif encoding == "gzip":
+        body = gzip.compress(body, compresslevel=5)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(body, status=status, mimetype="application/json", headers=headers)
+
+
+def _stream_format():
+    """'sse' when asked for with ?stream=sse or an event-stream Accept type, else 'ndjson'."""
+    fmt = request.args.get("stream")
+    if fmt in STREAM_MIMETYPES:
+        return fmt
+    return "sse" if STREAM_MIMETYPES["sse"] in request.headers.get("Accept", "") else "ndjson"
+
+
+def _stream_response(messages, fmt="ndjson"):
+    """
+    Stream dict messages as NDJSON lines or Server-Sent Events (event name =
+    the message's "type"). Left uncompressed so that each message reaches the
+    client as soon as it is produced; closing the response closes `messages`.
+    """
+    def body():
+        try:
+            for seq, msg in enumerate(messages):
+                data = _dumps(msg)
+                if fmt == "sse":
+                    yield b"id: %d\nevent: %s\ndata: %s\n\n" % (seq, str(msg.get("type", "message")).encode(), data)
+                else:
+                    yield data + b"\n"
+        finally:
+            messages.close()
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}   # no proxy buffering either
+    return Response(stream_with_context(body()), mimetype=STREAM_MIMETYPES[fmt], headers=headers)
@@ -0,0 +1,119 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from os import getenv
+import orjson
+from pymongo import ASCENDING
+from db_config import db
+from utils.instrumentation import _count
+from utils.jobRunner import _to_plain
+from utils.returnsPanel import _sync_returns_panel
+
+RESULT_CACHE_SIZE = int(getenv("RESULT_CACHE_SIZE", "256"))           # in-process entries
+RESULT_CACHE_TTL = float(getenv("RESULT_CACHE_TTL", str(6 * 3600)))   # seconds, both tiers
+RESULT_CACHE_MONGO = getenv("RESULT_CACHE_MONGO", "1").lower() in ("1", "true", "yes")
+
+_LRU = OrderedDict()   # key -> (payload, tickers, monotonic store time)
+_LRU_LOCK = threading.Lock()
+
+db.results.create_index([("created_at", ASCENDING)], expireAfterSeconds=int(RESULT_CACHE_TTL))
+db.results.create_index([("tickers", ASCENDING)])
+
+
+def _versions(tickers):
+    """{ticker: fetched_on} for the stored securities among `tickers` (one round trip)."""
+    docs = db.securities.find({"ticker": {"$in": list(tickers)}}, {"_id": 0, "ticker": 1, "fetched_on": 1})
+    return {d["ticker"]: str(d.get("fetched_on")) for d in docs}
+
+
+def _result_key(kind, inputs, versions):
+    """Canonical hash of the inputs and the data version of every involved ticker."""
+    blob = orjson.dumps({"kind": kind, "inputs": inputs, "versions": versions},
+                        option=orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return hashlib.sha256(blob).hexdigest()
+
+
+def _lru_get(key):
+    with _LRU_LOCK:
+        entry = _LRU.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[2] > RESULT_CACHE_TTL:
+            del _LRU[key]
+            return None
+        _LRU.move_to_end(key)
+        return entry[0]
+
+
+def _lru_put(key, payload, tickers):
+    with _LRU_LOCK:
+        _LRU[key] = (payload, frozenset(tickers), time.monotonic())
+        _LRU.move_to_end(key)
+        while len(_LRU) > RESULT_CACHE_SIZE:
+            _LRU.popitem(last=False)
+
+
+def _cached_result(kind, tickers, inputs, fn, *args, **kwargs):
+    """
+    fn(*args, **kwargs) -> (payload, status), memoized on `inputs` plus the
+    fetched_on of every ticker. Looks in the in-process LRU, then in the
+    shared `results` collection; only 200 responses are stored. Requests
+    naming unknown tickers bypass the cache.
+    """
+    versions = _versions(tickers)
+    if len(versions) < len(set(tickers)):
+        _count("result_cache_requests_total", kind=kind, outcome="bypass")
+        return fn(*args, **kwargs)
+    key = _result_key(kind, inputs, versions)
+
+    payload = _lru_get(key)
+    if payload is not None:
+        _count("result_cache_requests_total", kind=kind, outcome="hit_memory")
+        return payload, 200
+
+    if RESULT_CACHE_MONGO:
+        doc = db.results.find_one({"_id": key}, {"payload": 1})
+        if doc is not None:
+            _count("result_cache_requests_total", kind=kind, outcome="hit_mongo")
+            _lru_put(key, doc["payload"], tickers)
+            return doc["payload"], 200
+
+    _count("result_cache_requests_total", kind=kind, outcome="miss")
+    # the panel may lag Mongo by up to RETURNS_PANEL_CHECK_SECONDS: catch it up
+    # so the result stored under these versions is computed from them
+    _sync_returns_panel(versions)
+    payload, status = fn(*args, **kwargs)
+    if status != 200:
+        return payload, status
+
+    payload = _to_plain(payload)
+    _lru_put(key, payload, tickers)
+    if RESULT_CACHE_MONGO:
+        try:
+            db.results.replace_one({"_id": key}, {
+                "kind": kind,
+                "tickers": sorted(set(tickers)),
+                "payload": payload,
+                "created_at": datetime.utcnow(),
+            }, upsert=True)
+        except Exception as e:   # e.g. DocumentTooLarge for very large universes
+            logging.warning("Result not stored in the shared cache: %s", e)
+    return payload, status
+
+
+def _invalidate_results(tickers=None):
+    """Drop cached results involving any of `tickers` (every result when None) from both tiers."""
+    with _LRU_LOCK:
+        if tickers is None:
+            _LRU.clear()
+        else:
+            changed = set(tickers)
+            for key in [k for k, (_, ts, _) in _LRU.items() if ts & changed]:
+                del _LRU[key]
+    if tickers is None:
+        db.results.delete_many({})
+    elif tickers:
+        db.results.delete_many({"tickers": {"$in": list(tickers)}})
@@ -0,0 +1,53 @@
+import numpy as np
+from bson.binary import Binary
+
+# Storage layout of a security document:
+#   schema 1 (legacy): daily_return = [float, ...], close_date = ["%Y-%m-%d", ...]
+#   schema 2:          daily_return = Binary(little-endian float64),
+#                      close_date   = Binary(little-endian int32 days since 1970-01-01)
+SCHEMA_VERSION = 2
+
+_RETURN_DTYPE = np.dtype("<f8")
+_DATE_DTYPE = np.dtype("<i4")
+
+
+def _encode_returns(values):
+    return Binary(np.ascontiguousarray(values, dtype=_RETURN_DTYPE).tobytes())
+
+
+def _encode_dates(dates):
+    """Dates (strings, datetimes or datetime64) -> int32 day offsets blob."""
+    days = np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+    return Binary(days.astype(_DATE_DTYPE).tobytes())
+
+
+def _decode_returns(value):
+    """float64 array from either storage format (zero-copy for schema 2)."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return np.frombuffer(value, dtype=_RETURN_DTYPE)
+    return np.asarray(value or [], dtype=np.float64)
+
+
+def _decode_dates(value):
+    """int32 day numbers (days since 1970-01-01) from either storage format."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return np.frombuffer(value, dtype=_DATE_DTYPE)
+    if not value:
+        return np.array([], dtype=np.int32)
+    return np.asarray(value, dtype="datetime64[D]").astype(np.int32)
+
+
+def _days_to_dates(days):
+    return np.asarray(days).astype("datetime64[D]")
+
+
+def _decode_security(doc):
+    """
+    (days, returns) for a security document, aligned element by element.
+    Legacy documents may carry more dates than returns; the last ones match.
+    """
+    ret = _decode_returns(doc.get("daily_return"))
+    days = _decode_dates(doc.get("close_date"))
+    if days.size > ret.size:
+        days = days[-ret.size:] if ret.size else days[:0]
+    return days, ret
@@ -0,0 +1,162 @@
+import logging
+import threading
+import time
+from os import getenv
+import numpy as np
+from db_config import db
+from utils.returnsCodec import _decode_security
+from utils.alignReturns import _union_matrix, _select_rows
+from utils.bulkReads import MissingTickersError
+from utils.instrumentation import _stage
+
+# How often a worker checks Mongo for securities written by another process.
+_CHECK_SECONDS = float(getenv("RETURNS_PANEL_CHECK_SECONDS", "30"))
+
+_PANEL = None
+_PANEL_LOCK = threading.Lock()
+_DIRTY = False
+_LAST_CHECK = 0.0
+
+
+class ReturnsPanel:
+    """
+    All stored daily returns in one contiguous float64 array.
+
+    `values` is (n_dates, n_tickers) in Fortran order, so every ticker column is
+    a contiguous block and `column()` is a zero-copy view. Dates missing for a
+    ticker are NaN. The array is never written after construction, which keeps
+    its pages shared copy-on-write between pre-forked workers.
+    """
+
+    def __init__(self, days, tickers, values, signature=None, versions=None):
+        self.days = days                            # int day numbers, sorted
+        self.tickers = list(tickers)
+        self.index = {t: j for j, t in enumerate(self.tickers)}
+        self.values = values
+        self.values.flags.writeable = False
+        self.signature = signature
+        self.versions = versions or {}              # ticker -> str(fetched_on) of the data loaded
+
+    def __contains__(self, ticker):
+        return ticker in self.index
+
+    def missing(self, tickers):
+        return [t for t in tickers if t not in self.index]
+
+    def column(self, ticker):
+        """Zero-copy view of one ticker's returns over the full date index."""
+        return self.values[:, self.index[ticker]]
+
+    def matrix(self, tickers, how="intersection", window=None):
+        """
+        Date-aligned returns matrix for `tickers` (see utils.alignReturns).
+        Returns (days, X) with X of shape (n_dates, len(tickers)).
+        """
+        cols = np.fromiter((self.index[t] for t in tickers), dtype=np.intp, count=len(tickers))
+        return _select_rows(self.days, np.take(self.values, cols, axis=1), how=how, window=window)
+
+
+def _panel_signature():
+    """Cheap fingerprint of the collection: document count and newest fetched_on."""
+    with _stage("mongo"):
+        newest = db.securities.find_one({}, {"_id": 0, "fetched_on": 1}, sort=[("fetched_on", -1)])
+        return db.securities.count_documents({}), str((newest or {}).get("fetched_on"))
+
+
+def _build_returns_panel():
+    signature = _panel_signature()
+    with _stage("mongo"):
+        docs = list(db.securities.find({}, {"_id": 0, "ticker": 1, "close_date": 1, "daily_return": 1,
+                                            "fetched_on": 1}))
+
+    tickers, series, versions = [], [], {}
+    for doc in docs:
+        days, ret = _decode_security(doc)
+        if ret.size == 0 or days.size != ret.size:
+            continue
+        tickers.append(doc["ticker"])
+        series.append((days, ret))
+        versions[doc["ticker"]] = str(doc.get("fetched_on"))
+
+    days, values = _union_matrix(series)
+    logging.info("Returns panel built: %d tickers x %d dates", len(tickers), days.size)
+    return ReturnsPanel(days, tickers, values, signature, versions)
+
+
+def _invalidate_returns_panel():
+    """Mark the panel stale; call after inserting, updating or deleting securities."""
+    global _DIRTY
+    _DIRTY = True
+
+
+def _lacks(panel, need):
+    if isinstance(need, dict):
+        return any(panel.versions.get(t) != v for t, v in need.items())
+    return bool(panel.missing(need))
+
+
+def _get_returns_panel(force=False, need=None):
+    """
+    Process-wide returns panel, rebuilt when invalidated locally or when another
+    worker changed the collection (checked at most every RETURNS_PANEL_CHECK_SECONDS).
+    With `need` (tickers, or {ticker: fetched_on}), `force` only rebuilds if
+    the panel still lacks one of them, or holds another version of it, once
+    the lock is held (another thread may have just rebuilt it).
+    """
+    global _PANEL, _DIRTY, _LAST_CHECK
+    with _PANEL_LOCK:
+        now = time.monotonic()
+        if force and need is not None and _PANEL is not None:
+            force = _lacks(_PANEL, need)
+        stale = force or _PANEL is None or _DIRTY
+        if not stale and now - _LAST_CHECK >= _CHECK_SECONDS:
+            _LAST_CHECK = now
+            stale = _panel_signature() != _PANEL.signature
+        if stale:
+            _PANEL = _build_returns_panel()
+            _DIRTY = False
+            _LAST_CHECK = now
+        return _PANEL
+
+
+def _panel_with(tickers):
+    """
+    Shared panel for a request on `tickers`. Tickers it lacks are looked up in
+    Mongo first, and the panel is rebuilt only if some of them are stored
+    (written by another worker since the last build): unknown or misspelled
+    tickers never trigger a reload.
+    """
+    with _stage("returns_panel"):
+        panel = _get_returns_panel()
+        missing = panel.missing(tickers)
+        if missing:
+            with _stage("mongo"):
+                stored = db.securities.find_one({"ticker": {"$in": missing}}, {"_id": 1})
+            if stored is not None:
+                panel = _get_returns_panel(force=True, need=missing)
+    return panel
+
+
+def _panel_matrix(tickers, how="intersection", window=None):
+    """
+    (days, X) for `tickers` from the shared panel (see _panel_with).
+    Raises MissingTickersError.
+    """
+    panel = _panel_with(tickers)
+    missing = panel.missing(tickers)
+    if missing:
+        raise MissingTickersError(missing)
+    with _stage("matrix"):
+        return panel.matrix(tickers, how=how, window=window)
+
+
+def _sync_returns_panel(versions):
+    """
+    Make sure the shared panel holds `versions` ({ticker: fetched_on} as just
+    read from Mongo), rebuilding it first if another worker refreshed any of
+    those tickers since it was built. Results keyed on `versions` are then
+    computed on the data the key names.
+    """
+    if _lacks(_get_returns_panel(), versions):
+        with _stage("returns_panel"):
+            _get_returns_panel(force=True, need=versions)
@@ -0,0 +1,120 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from os import getenv
+import numpy as np
+import yfinance as yf
+import requests as req
+from bs4 import BeautifulSoup
+from db_config import db
+
+RATE_SOURCES = ("^TNX", "STR")
+
+# Seconds a fetched rate is considered fresh, per source
+RATE_TTL = {
+    "^TNX": float(getenv("RATE_TTL_TNX", "3600")),
+    "STR": float(getenv("RATE_TTL_STR", str(6 * 3600))),
+}
+
+_CACHE = {}            # source -> (value, as_of datetime, monotonic fetch time)
+_CACHE_LOCK = threading.Lock()
+_REFRESHING = set()
+_FAILED_AT = {}        # source -> monotonic time of the last failed fetch
+_RETRY_AFTER = float(getenv("RATE_RETRY_SECONDS", "60"))
+
+
+def _fetch_tnx():
+    hist = yf.Ticker('^TNX').history(period='5d')['Close'].dropna()
+    if hist.empty:
+        raise ValueError("No ^TNX quotes returned.")
+    return np.float64(hist.values[-1] / 100.0)
+
+
+def _fetch_euribor():
+    res = req.get('https://www.euribor-rates.eu/en/current-euribor-rates/', timeout=10)
+    res.raise_for_status()
+    soup = BeautifulSoup(res.text, 'html.parser')
+    for tr in soup.find_all("tr"):
+        th = tr.find("th")
+        if th and th.find("a", href='/en/current-euribor-rates/4/euribor-rate-12-months/'):
+            return np.float64(tr.find('td').text.replace(' %', '')) / 100
+    raise ValueError("12-month Euribor row not found.")
+
+
+_FETCHERS = {"^TNX": _fetch_tnx, "STR": _fetch_euribor}
+
+
+def _set_rate_fetchers(fetchers):
+    """Swap the network fetchers, e.g. {"^TNX": lambda: 0.042} for tests or offline runs."""
+    _FETCHERS.update(fetchers)
+    with _CACHE_LOCK:
+        _CACHE.clear()
+        _FAILED_AT.clear()
+
+
+if getenv("RATE_PROVIDER", "").lower() == "fake":
+    _set_rate_fetchers({"^TNX": lambda: np.float64(0.04), "STR": lambda: np.float64(0.03)})
+
+
+def _refresh_rate(source):
+    """Fetch one source now; on success update the cache and the persisted snapshot."""
+    try:
+        value = np.float64(_FETCHERS[source]())
+        as_of = datetime.utcnow()
+        with _CACHE_LOCK:
+            _CACHE[source] = (value, as_of, time.monotonic())
+        db.rates.update_one({"_id": source}, {"$set": {"value": float(value), "as_of": as_of}}, upsert=True)
+        return value
+    except Exception as e:
+        logging.warning("Risk-free rate refresh failed for %s: %s", source, e)
+        with _CACHE_LOCK:
+            _FAILED_AT[source] = time.monotonic()
+        return None
+    finally:
+        with _CACHE_LOCK:
+            _REFRESHING.discard(source)
+
+
+def _refresh_rate_async(source):
+    """Start a background refresh unless one is already running for this source."""
+    with _CACHE_LOCK:
+        if source in _REFRESHING or time.monotonic() - _FAILED_AT.get(source, float("-inf")) < _RETRY_AFTER:
+            return
+        _REFRESHING.add(source)
+    threading.Thread(target=_refresh_rate, args=(source,), daemon=True, name=f"rate-{source}").start()
+
+
+def _load_snapshot(source):
+    doc = db.rates.find_one({"_id": source})
+    if not doc or doc.get("value") is None:
+        return None
+    entry = (np.float64(doc["value"]), doc.get("as_of"), float("-inf"))   # always due for a refresh
+    with _CACHE_LOCK:
+        _CACHE.setdefault(source, entry)
+        return _CACHE[source]
+
+
+def _get_risk_free_rate(risk_free_type, fixed_rate):
+    """
+    Risk-free rate (as a fraction) for `risk_free_type` without any network
+    call on the caller's thread. Serves the in-memory value, else the last
+    good value persisted in Mongo, else `fixed_rate`; stale or missing values
+    trigger a background refresh.
+    Returns (rate, {"source", "as_of", "stale"}).
+    """
+    if risk_free_type not in RATE_SOURCES:
+        return np.float64(fixed_rate), {"source": "fixed", "as_of": None, "stale": False}
+
+    with _CACHE_LOCK:
+        entry = _CACHE.get(risk_free_type)
+    if entry is None:
+        entry = _load_snapshot(risk_free_type)
+
+    stale = entry is None or time.monotonic() - entry[2] > RATE_TTL[risk_free_type]
+    if stale:
+        _refresh_rate_async(risk_free_type)
+
+    if entry is None:
+        return np.float64(fixed_rate), {"source": "fixed", "as_of": None, "stale": True}
+    return entry[0], {"source": risk_free_type, "as_of": entry[1], "stale": stale}
@@ -0,0 +1,132 @@
+from os import getenv
+import numpy as np
+from utils.returnsPanel import _panel_matrix
+from utils.returnsCodec import _days_to_dates
+from utils.bulkReads import MissingTickersError
+from utils.instrumentation import _stage
+
+ROLLING_KINDS = ("correlation", "covariance")
+ROLLING_LAYOUTS = ("upper", "full")
+# Upper bound on the numbers in one response (matrices x entries per matrix)
+ROLLING_MAX_VALUES = int(getenv("ROLLING_MAX_VALUES", "5000000"))
+# Windowed running sums are rebuilt from scratch after this many slid rows to bound rounding drift
+_RESYNC_ROWS = 2048
+
+
+def _rolling_covariance(X, window, step=1, halflife=None):
+    """
+    Covariance of the trailing `window` rows of X, every `step` rows.
+
+    Windowed: running sums of x and xx' gain the rows entering the window and
+    lose the rows leaving it, as one block product per step, so each update
+    costs O(step * N²) instead of recomputing the whole window.
+    EWMA (`halflife` in rows): exponentially decayed sums over all rows so
+    far, with the first matrix after `window` rows of warm-up.
+    Returns (ends, covs): ends[k] is the exclusive end row of matrix k and
+    covs has shape (len(ends), N, N).
+    """
+    T, n = X.shape
+    ends = np.arange(window, T + 1, step)
+    covs = np.empty((ends.size, n, n))
+
+    if halflife:
+        lam = 0.5 ** (1.0 / float(halflife))
+        s0, S1, S2 = 0.0, np.zeros(n), np.zeros((n, n))
+        prev = 0
+        for k, e in enumerate(ends):
+            B = X[prev:e]
+            d = lam ** np.arange(B.shape[0] - 1, -1, -1)           # newest row weighs 1
+            decay = lam ** B.shape[0]
+            s0 = decay * s0 + d.sum()
+            S1 = decay * S1 + d @ B
+            S2 = decay * S2 + B.T @ (d[:, None] * B)
+            m = S1 / s0
+            covs[k] = S2 / s0 - np.outer(m, m)
+            prev = e
+        return ends, covs
+
+    S1, S2 = None, None
+    slid = 0
+    for k, e in enumerate(ends):
+        if S1 is None or slid >= _RESYNC_ROWS or step >= window:
+            W = X[e - window:e]
+            S1, S2 = W.sum(axis=0), W.T @ W
+            slid = 0
+        else:
+            add, drop = X[e - step:e], X[e - step - window:e - window]
+            S1 += add.sum(axis=0) - drop.sum(axis=0)
+            S2 += add.T @ add - drop.T @ drop
+            slid += step
+        covs[k] = (S2 - np.outer(S1, S1) / window) / (window - 1)
+    return ends, covs
+
+
+def _stack_corr(covs):
+    """Correlation matrices of a (K, N, N) covariance stack."""
+    sd = np.sqrt(np.maximum(np.diagonal(covs, axis1=1, axis2=2), 0.0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return covs / (sd[:, :, None] * sd[:, None, :])
+
+
+def _get_rolling_covariance(tickers, window=60, step=5, halflife=None, kind="correlation",
+                            layout="upper", max_matrices=None):
+    """
+    Rolling (or EWMA) covariance / correlation of `tickers` over their shared
+    dates, one matrix every `step` days. `max_matrices` widens the step so
+    that at most that many are returned. "upper" packs each matrix as its
+    upper triangle row by row (diagonal included); "full" gives N x N.
+    The average pairwise correlation is returned for every matrix as a
+    compact regime indicator.
+    Returns (payload, status).
+    """
+    tickers = list(dict.fromkeys(tickers))
+    if len(tickers) < 2:
+        return {"error": "Not enough data to compute covariance or correlation matrices."}, 400
+    if kind not in ROLLING_KINDS:
+        return {"error": f"Unknown kind '{kind}', expected one of {ROLLING_KINDS}."}, 400
+    if layout not in ROLLING_LAYOUTS:
+        return {"error": f"Unknown layout '{layout}', expected one of {ROLLING_LAYOUTS}."}, 400
+    window, step = int(window), max(1, int(step))
+    if window < 2:
+        return {"error": "window must be at least 2 days."}, 400
+    if halflife is not None and float(halflife) <= 0:
+        return {"error": "halflife must be positive."}, 400
+
+    try:
+        days, X = _panel_matrix(tickers)
+    except MissingTickersError as e:
+        return e.to_response()
+    if X.shape[0] < window:
+        return {"error": f"Not enough shared history: {X.shape[0]} days for a {window}-day window."}, 400
+
+    n = len(tickers)
+    count = (X.shape[0] - window) // step + 1
+    if max_matrices:
+        step *= -(-count // max(1, int(max_matrices)))       # ceil(count / max) times coarser
+        count = (X.shape[0] - window) // step + 1
+    per_matrix = n * (n + 1) // 2 if layout == "upper" else n * n
+    if count * per_matrix > ROLLING_MAX_VALUES:
+        return {"error": f"{count} matrices of {n} tickers exceed the response limit; use a larger step or maxMatrices."}, 400
+
+    with _stage("rolling_covariance"):
+        ends, covs = _rolling_covariance(X, window, step, halflife)
+        corr = _stack_corr(covs)
+        iu = np.triu_indices(n, k=1)
+        avg_corr = corr[:, iu[0], iu[1]].mean(axis=1)
+        out = corr if kind == "correlation" else covs
+        if layout == "upper":
+            rows, cols = np.triu_indices(n)
+            out = out[:, rows, cols]
+
+    return {
+        "tickers": tickers,
+        "kind": kind,
+        "layout": layout,
+        "window": window,
+        "step": step,
+        "halflife": None if halflife is None else float(halflife),
+        "dates": _days_to_dates(days[ends - 1]).astype(str),   # last day in each window
+        "matrices": out,
+        "average_correlation": avg_corr,
+        "volatility": np.sqrt(np.maximum(np.diagonal(covs, axis1=1, axis2=2), 0.0)),   # daily, per ticker
+    }, 200
@@ -0,0 +1,194 @@
+from os import getenv
+import numpy as np
+from utils.qpCore import PortfolioQP
+from utils.riskFreeRates import _get_risk_free_rate
+from utils.tangencyPortfolio import _tangency_portfolio
+from utils.instrumentation import _stage
+from utils.covEstimators import DEFAULT_FACTORS
+from utils.getOptimalPortfolio import (_load_moments, _liquid_mask_from_labels, _liquidity_target,
+                                       _project_w_ge_target, _max_sharpe_summary)
+from utils.getEfficientFrontier import (_frontier_columns, _frontier_records, _frontier_corners,
+                                       _corner_records, _corner_columns)
+
+MAX_SCENARIOS = int(getenv("MAX_SCENARIOS", "200"))
+
+
+def _scenario_bounds(tickers, spec):
+    """
+    Per-ticker (lo, hi) bounds from a scenario's "bounds": [lo, hi] for every
+    ticker, or {ticker: [lo, hi]} with (0, 1) for the others.
+    Returns (bounds, error).
+    """
+    n = len(tickers)
+    if spec is None:
+        return ((0.0, 1.0),) * n, None
+    if isinstance(spec, dict):
+        unknown = [t for t in spec if t not in tickers]
+        if unknown:
+            return None, f"Bounds given for tickers outside the selection: {unknown}"
+        pairs = [spec.get(t, (0.0, 1.0)) for t in tickers]
+    else:
+        pairs = [spec] * n
+    try:
+        lb, ub = np.clip(np.array(pairs, dtype=float).reshape(n, 2), 0.0, 1.0).T
+    except (TypeError, ValueError):
+        return None, "Bounds must be [lo, hi] or {ticker: [lo, hi]}."
+    if (lb > ub).any() or lb.sum() > 1.0 + 1e-12 or ub.sum() < 1.0 - 1e-12:
+        return None, "Bounds are infeasible: no fully invested portfolio satisfies them."
+    return tuple(zip(lb.tolist(), ub.tolist())), None
+
+
+def _run_scenarios(tickers, scenarios, weights=None, risk_free=0.03, risk_free_type=None,
+                   liquidity_factor=None, labels_override=None, alignment="intersection", align_window=None,
+                   cov_estimator="sample", factors=DEFAULT_FACTORS, include_frontier=True,
+                   frontier_format="records", progress=None):
+    """
+    Optimize one ticker set under many scenarios ({"name", "liquidityFactor",
+    "riskFree", "riskFree_Type", "bounds"}; missing fields fall back to the
+    batch-level values).
+
+    Moments are loaded and the covariance factored once. Scenarios are solved
+    grouped by bounds in ascending liquidity target, each min-variance solve
+    warm-started from its neighbour's solution; identical (bounds, target)
+    pairs share a solve, and the frontier (which depends on the bounds only)
+    is computed once per distinct bounds and referenced by id.
+    `progress(done, total)` is reported as scenarios are worked through.
+    Returns (payload, status).
+    """
+    if not tickers or len(tickers) < 2:
+        return {"error": "Insufficient number of tickers"}, 400
+    if not scenarios:
+        return {"error": "At least one scenario is required."}, 400
+    if len(scenarios) > MAX_SCENARIOS:
+        return {"error": f"Too many scenarios ({len(scenarios)}), at most {MAX_SCENARIOS} per batch."}, 400
+
+    moments, error = _load_moments(tickers, alignment, align_window, cov_estimator, factors)
+    if error:
+        return error
+    mu, cov, cov_version = moments
+    with _stage("factor"):
+        qp = PortfolioQP(cov, mu)
+    mu_arr = mu.to_numpy()
+    m_liq = _liquid_mask_from_labels(tickers, labels_override or {})
+    n = len(tickers)
+
+    w_init = np.array([(weights or {}).get(t, 0.0) for t in tickers], dtype=float)
+    w_init = w_init / w_init.sum() if w_init.sum() > 0 else np.ones(n) / n
+
+    # --- parse and validate every scenario up front ---
+    results = [None] * len(scenarios)
+    parsed = []
+    for i, sc in enumerate(scenarios):
+        sc = sc if isinstance(sc, dict) else {}
+        bounds, error = _scenario_bounds(tickers, sc.get("bounds"))
+        t_liq, liq_error = _liquidity_target(sc.get("liquidityFactor", liquidity_factor), m_liq)
+        if error or liq_error:
+            results[i] = {"scenario": i, "name": sc.get("name"), "error": error or liq_error}
+            continue
+        parsed.append({"index": i, "name": sc.get("name"), "bounds": bounds, "t_liq": t_liq,
+                       "risk_free": sc.get("riskFree", risk_free),
+                       "risk_free_type": sc.get("riskFree_Type", risk_free_type)})
+
+    # neighbours (same bounds, adjacent targets) warm-start each other
+    parsed.sort(key=lambda p: (p["bounds"], -1.0 if p["t_liq"] is None else p["t_liq"]))
+
+    min_var, tangency, frontiers, frontier_ids = {}, {}, {}, {}
+    last_w = {}
+    for done, p in enumerate(parsed):
+        if progress is not None:
+            progress(done, len(parsed))
+        bounds, t_liq = p["bounds"], p["t_liq"]
+        lb, ub = np.array(bounds).T
+
+        # --- min-variance: one solve per distinct (bounds, target) ---
+        key = (bounds, t_liq)
+        if key not in min_var:
+            warm = bounds in last_w
+            w0 = last_w.get(bounds, w_init)
+            if t_liq is not None:
+                w0 = _project_w_ge_target(w0, m_liq, t_liq)
+            constraints = [qp.budget_constraint()]
+            if t_liq is not None:
+                constraints.append(qp.liquidity_constraint(m_liq, t_liq))
+            with _stage("min_variance"):
+                res = qp.min_variance(np.clip(w0, lb, ub), constraints=constraints, bounds=bounds)
+            if res.success:
+                last_w[bounds] = res.x
+            min_var[key] = (res, warm)
+        res, warm = min_var[key]
+        if not res.success:
+            results[p["index"]] = {"scenario": p["index"], "name": p["name"],
+                                   "error": f"SLSQP failed: {getattr(res, 'message', 'Optimization failed')}"}
+            continue
+
+        rf, rf_meta = _get_risk_free_rate(p["risk_free_type"], np.float64(p["risk_free"]) / 100.0)
+        w_star = res.x
+        ret_star = (1 + np.dot(w_star, mu_arr)) ** 252 - 1
+        risk_star = qp.risk(w_star) * np.sqrt(252)
+
+        # --- tangency: one solve per distinct (bounds, target, rate) ---
+        tkey = (bounds, t_liq, float(rf))
+        if tkey not in tangency:
+            rf_daily = (1 + rf) ** (1/252) - 1
+            with _stage("tangency"):
+                tangency[tkey] = _tangency_portfolio(qp, mu_arr, rf_daily, m_liq, t_liq, bounds=bounds)
+        w_tan, tan_error = tangency[tkey]
+
+        # --- frontier: one per distinct bounds ---
+        frontier_id = None
+        if include_frontier:
+            if bounds not in frontier_ids:
+                frontier_ids[bounds] = f"f{len(frontier_ids)}"
+                frontiers[frontier_ids[bounds]] = _bounded_frontier(tickers, mu, qp, bounds, frontier_format)
+            frontier_id = frontier_ids[bounds]
+
+        results[p["index"]] = {
+            "scenario": p["index"],
+            "name": p["name"],
+            "riskFree": np.float64(rf),
+            "riskFreeSource": rf_meta,
+            "optimal_weights": {tickers[i]: round(w * 100, 2) for i, w in enumerate(w_star.tolist())},
+            "optimal_return": round(ret_star * 100, 2),
+            "optimal_risk": round(risk_star * 100, 2),
+            "optimal_sharpe": round((ret_star - rf) / risk_star, 2) if risk_star != 0 else None,
+            "liquid_target_min": None if t_liq is None else round(t_liq * 100, 2),
+            "liquid_share_achieved": round(float(np.dot(w_star, m_liq)) * 100, 2),
+            "max_sharpe_portfolio": None if w_tan is None else _max_sharpe_summary(tickers, w_tan, mu, qp, rf, m_liq),
+            "max_sharpe_error": tan_error,
+            "frontier": frontier_id,
+            "warm_started": warm,
+        }
+    if progress is not None:
+        progress(len(parsed), len(parsed))
+
+    return {
+        "tickers": list(tickers),
+        "cov_version": cov_version,
+        "cov_estimator": cov_estimator,
+        "results": results,
+        "frontiers": frontiers,
+        "stats": {
+            "scenarios": len(scenarios),
+            "min_variance_solves": len(min_var),
+            "tangency_solves": len(tangency),
+            "frontiers": len(frontiers),
+            "solver_iterations": qp.nit,
+        },
+    }, 200
+
+
+def _bounded_frontier(tickers, mu, qp, bounds, frontier_format):
+    """Frontier and corner portfolios under `bounds` (without the liquidity constraint, as in the single endpoint)."""
+    Sigma = qp.Sigma
+    with _stage("corners"):
+        try:
+            corners = _frontier_corners(tickers, mu, Sigma, bounds)
+        except (np.linalg.LinAlgError, ValueError, RuntimeError):
+            corners = []    # failed: the frontier goes straight to the sweep
+    with _stage("frontier"):
+        front = _frontier_columns(tickers, mu, Sigma, None, num_points=500, bounds=bounds, corners=corners, qp=qp)
+    if frontier_format == "columnar":
+        return {"bounds": bounds, "efficient_frontier": front,
+                "frontier_corners": _corner_columns(tickers, corners, mu, Sigma)}
+    return {"bounds": bounds, "efficient_frontier": _frontier_records(front),
+            "frontier_corners": _corner_records(tickers, corners, mu, Sigma) if corners else []}
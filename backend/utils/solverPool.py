@@ -0,0 +1,276 @@
+"""
+Process pool for the optimizer: SLSQP and critical-line work leaves the
+request thread (and its GIL) for a bounded set of solver processes.
+
+A request opens a session, which is its admission ticket and its deadline.
+The session publishes the covariance and the mean returns once through
+`multiprocessing.shared_memory`; every task receives only the block names,
+not pickled matrices. SOLVER_WORKERS=0 runs the same tasks inline.
+
+A worker that dies (OOM kill, crash in BLAS) breaks the whole executor; the
+pool is then replaced for later requests and the affected request finishes
+its remaining tasks inline.
+"""
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from multiprocessing import get_context, shared_memory
+from os import getenv
+import numpy as np
+from utils.qpCore import PortfolioQP
+from utils.criticalLine import _critical_line
+from utils.tangencyPortfolio import _tangency_portfolio
+from utils.instrumentation import _count, _record_solve
+
+SOLVER_WORKERS = int(getenv("SOLVER_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Requests allowed to hold solver work at once; beyond that a request waits
+# SOLVER_ADMIT_WAIT seconds for a slot and is then turned away with a 503
+SOLVER_MAX_INFLIGHT = int(getenv("SOLVER_MAX_INFLIGHT", str(max(2, 2 * SOLVER_WORKERS))))
+SOLVER_ADMIT_WAIT = float(getenv("SOLVER_ADMIT_WAIT", "2"))
+SOLVER_TIMEOUT = float(getenv("SOLVER_TIMEOUT", "60"))               # seconds per request
+SOLVER_START_METHOD = getenv("SOLVER_START_METHOD", "spawn")         # fork is unsafe in a threaded server
+SOLVER_BLAS_THREADS = getenv("SOLVER_BLAS_THREADS", "1")             # per worker; the pool is the parallelism
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+_SLOTS = threading.BoundedSemaphore(SOLVER_MAX_INFLIGHT)
+
+
+class SolverBusy(RuntimeError):
+    """Raised when every solver slot is taken for longer than SOLVER_ADMIT_WAIT."""
+
+    def to_response(self):
+        return {"error": "The optimizer is busy, please retry shortly.", "retry_after": 1}, 503
+
+
+class SolverTimeout(TimeoutError):
+    """Raised when a request's solver work outlives SOLVER_TIMEOUT."""
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        super().__init__(f"Optimization exceeded the {timeout:g}s time limit.")
+
+    def to_response(self):
+        return {"error": str(self)}, 504
+
+
+def _solver_pool():
+    """The process pool, started on first use; None when SOLVER_WORKERS=0."""
+    global _POOL
+    if SOLVER_WORKERS <= 0:
+        return None
+    with _POOL_LOCK:
+        if _POOL is None:
+            # children inherit the environment: one BLAS thread each instead of N per worker
+            for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+                os.environ.setdefault(var, SOLVER_BLAS_THREADS)
+            _POOL = ProcessPoolExecutor(max_workers=SOLVER_WORKERS, mp_context=get_context(SOLVER_START_METHOD))
+        return _POOL
+
+
+def _replace_broken_pool(pool):
+    """Drop `pool` after one of its workers died, so the next session starts a fresh one."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not pool:
+            return       # another request already replaced it
+        _POOL = None
+    _count("solver_pool_restarts_total")
+    pool.shutdown(wait=False)    # its futures have all failed with BrokenProcessPool already
+
+
+# --- shared arrays ---
+
+def _share(arr):
+    """Copy `arr` into a new shared-memory block. Returns (block, spec)."""
+    arr = np.ascontiguousarray(arr, dtype=np.float64)
+    shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+    np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+    return shm, (shm.name, arr.shape)
+
+
+def _attach(spec):
+    """Read-only view of a shared block inside a worker. Returns (block, array)."""
+    name, shape = spec
+    # the parent owns and unlinks the block (workers share its resource tracker before Python 3.13)
+    try:
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+    arr = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    arr.flags.writeable = False
+    return shm, arr
+
+
+def _run_task(task, sigma_spec, mu_spec, args):
+    """Worker entry point: attach the shared moments, run task(qp, *args), detach."""
+    shm_s, Sigma = _attach(sigma_spec)
+    shm_m, mu = _attach(mu_spec)
+    try:
+        return task(PortfolioQP(Sigma, mu), *args)
+    finally:
+        del Sigma, mu
+        shm_s.close()
+        shm_m.close()
+
+
+# --- session ---
+
+class SolverSession:
+    """
+    One request's use of the pool: shares (Sigma, mu) once, submits tasks
+    against them and waits on results against the request deadline.
+    """
+
+    def __init__(self, pool, timeout):
+        self.pool = pool
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout
+        self._blocks = []
+        self._specs = None
+        self._qp = None
+        self._futures = []
+        self._tasks = {}         # pooled future -> (task, args), rerun inline if the pool breaks
+
+    def share(self, qp):
+        """Publish the moments of `qp` that the following tasks run against."""
+        self._qp = qp            # inline: tasks use the request's own (already factorized) problem
+        if self.pool is None:
+            return
+        shm_s, spec_s = _share(qp.Sigma)
+        shm_m, spec_m = _share(qp.mu)
+        self._blocks += [shm_s, shm_m]
+        self._specs = (spec_s, spec_m)
+
+    def _inline(self, task, args):
+        fut = Future()
+        try:
+            fut.set_result(task(self._qp, *args))
+        except Exception as e:
+            fut.set_exception(e)
+        return fut
+
+    def _pool_broken(self):
+        """A worker died: replace the pool for later requests and run the rest of this one inline."""
+        if self.pool is not None:
+            _replace_broken_pool(self.pool)
+            self.pool = None
+
+    def submit(self, task, *args):
+        """task(qp, *args) on a solver process (or inline). Returns a Future."""
+        if self.pool is not None:
+            try:
+                fut = self.pool.submit(_run_task, task, *self._specs, args)
+            except (BrokenProcessPool, RuntimeError):
+                self._pool_broken()     # broken, or already shut down by another request
+            else:
+                self._futures.append(fut)
+                self._tasks[fut] = (task, args)
+                return fut
+        return self._inline(task, args)
+
+    def result(self, fut):
+        """The task's result; raises SolverTimeout once the request deadline has passed."""
+        try:
+            return fut.result(timeout=max(0.0, self.deadline - time.monotonic()))
+        except FutureTimeout:
+            _count("solver_timeouts_total")
+            raise SolverTimeout(self.timeout) from None
+        except BrokenProcessPool:
+            self._pool_broken()
+            task, args = self._tasks[fut]
+            return self._inline(task, args).result()
+
+    def map(self, task, chunks):
+        """Run task(qp, *chunk) for every chunk in parallel; results in chunk order."""
+        return [self.result(f) for f in [self.submit(task, *c) for c in chunks]]
+
+    def close(self):
+        """Drop queued tasks and the shared blocks; returns the futures still running."""
+        running = [f for f in self._futures if not f.cancel() and not f.done()]
+        for shm in self._blocks:
+            shm.close()
+            shm.unlink()   # workers that already attached keep their mapping
+        self._blocks = []
+        return running
+
+
+@contextmanager
+def _solver_session(timeout=SOLVER_TIMEOUT):
+    """
+    Admission control plus a SolverSession. Raises SolverBusy when no slot
+    frees up within SOLVER_ADMIT_WAIT. A request that times out keeps its slot
+    until its last running task has finished, so the slots always reflect
+    the work actually on the pool.
+    """
+    if not _SLOTS.acquire(timeout=SOLVER_ADMIT_WAIT):
+        _count("solver_rejections_total")
+        raise SolverBusy()
+    session = SolverSession(_solver_pool(), timeout)
+    try:
+        yield session
+    finally:
+        running = session.close()
+        if not running:
+            _SLOTS.release()
+        else:
+            pending = [len(running)]
+            lock = threading.Lock()
+
+            def done(_):
+                with lock:
+                    pending[0] -= 1
+                    last = pending[0] == 0
+                if last:
+                    _SLOTS.release()
+            for f in running:
+                f.add_done_callback(done)
+
+
+# --- tasks (module level so that they pickle by reference) ---
+
+def _task_min_variance(qp, w0, m_liq, t_liq, bounds):
+    constraints = [qp.budget_constraint()]
+    if t_liq is not None:
+        constraints.append(qp.liquidity_constraint(m_liq, t_liq))
+    return qp.min_variance(w0, constraints=constraints, bounds=bounds)
+
+
+def _task_tangency(qp, rf_daily, m_liq, t_liq):
+    return _tangency_portfolio(qp, qp.mu, rf_daily, m_liq, t_liq)
+
+
+def _task_corners(qp, lb, ub):
+    return _critical_line(qp.mu, qp.Sigma, lb, ub)
+
+
+def _task_sweep(qp, targets, w_start, bounds):
+    """One contiguous run of frontier targets, each solve warm-started from the previous one."""
+    weights, last_w = [], np.asarray(w_start, dtype=float)
+    for target in targets:
+        cons = [qp.budget_constraint(), qp.return_constraint(target)]
+        res = qp.min_variance(last_w, constraints=cons, bounds=bounds, options={"ftol": 1e-9})
+        weights.append(res.x if res.success else None)
+        if res.success:
+            last_w = res.x
+    return weights
+
+
+def _pooled_min_variance(session, w0, m_liq, t_liq, bounds):
+    res = session.result(session.submit(_task_min_variance, w0, m_liq, t_liq, bounds))
+    if session.pool is not None:
+        _record_solve("min_variance", res)   # the worker's own metrics are not scraped
+    return res
+
+
+def _pooled_sweep(session, targets, w_start, bounds):
+    """
+    SLSQP frontier sweep split into one contiguous run of targets per worker,
+    each run warm-started along its own targets (from `w_start` at its first).
+    Returns the successful weights in target order.
+    """
+    chunks = [(part, w_start, bounds) for part in np.array_split(np.asarray(targets), max(1, SOLVER_WORKERS)) if part.size]
+    return [w for ws in session.map(_task_sweep, chunks) for w in ws if w is not None]
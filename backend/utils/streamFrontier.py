@@ -0,0 +1,200 @@
+import logging
+import time
+import numpy as np
+from utils.instrumentation import _count, _observe, _route
+from utils.covEstimators import DEFAULT_FACTORS
+from utils.criticalLine import _iter_critical_line, _interpolate_frontier
+from utils.getOptimalPortfolio import _min_variance_problem, _min_variance_summary, _max_sharpe_problem
+
+STREAM_NUM_POINTS = 500     # same target grid as the buffered endpoint
+STREAM_FIRST_LEVEL = 9      # points in the first (coarsest) frontier batch
+STREAM_BATCH_SIZE = 128     # at most this many frontier points per message
+
+
+def _refinement_levels(n, first=STREAM_FIRST_LEVEL):
+    """
+    Indices 0..n-1 coarse to fine: about `first` evenly spaced indices (both
+    ends included), then the midpoints between those, and so on until every
+    index has been given once. Yields (stride, indices).
+    """
+    stride = 1
+    while (n - 1) / stride > max(first - 1, 1):
+        stride *= 2
+    seen = np.zeros(n, dtype=bool)
+    while stride >= 1:
+        idx = np.unique(np.append(np.arange(0, n, stride), n - 1))
+        idx = idx[~seen[idx]]
+        seen[idx] = True
+        if idx.size:
+            yield stride, idx
+        stride //= 2
+
+
+def _sweep_points(qp, targets, idx, solved, w_start, bounds):
+    """SLSQP fallback for one batch: each target warm-started from the nearest point solved so far."""
+    done = np.array(sorted(solved), dtype=int)
+    kept, W = [], []
+    for i in idx:
+        w0 = solved[done[np.abs(done - i).argmin()]] if done.size else w_start
+        cons = [qp.budget_constraint(), qp.return_constraint(targets[i])]
+        res = qp.min_variance(w0, constraints=cons, bounds=bounds, options={"ftol": 1e-9})
+        if res.success:
+            solved[int(i)] = res.x
+            kept.append(int(i))
+            W.append(res.x)
+    return np.array(kept, dtype=int), np.array(W).reshape(len(kept), len(w_start))
+
+
+def _points(W, mu_arr, qp):
+    """Annualized return and risk of each row of W, columnar."""
+    return {
+        "weights": W,
+        "Return": (1 + W @ mu_arr)**252 - 1,
+        "Risk": np.sqrt(np.maximum(qp.variances(W), 0.0)) * np.sqrt(252),
+    }
+
+
+def _stream_optimal_portfolio(tickers, weights, risk_free, risk_free_type,
+                              liquidity_factor=None, labels_override=None,
+                              alignment="intersection", align_window=None,
+                              cov_estimator="sample", factors=DEFAULT_FACTORS,
+                              num_points=STREAM_NUM_POINTS, batch_size=STREAM_BATCH_SIZE,
+                              method="min_variance"):
+    """
+    _get_optimal_portfolio as a stream of messages. The min-variance problem is
+    solved up front, so bad input still gets a plain error response; everything
+    after it is produced lazily by the returned generator.
+    Returns (message generator, None) or (None, (error, status)).
+    """
+    t0 = time.perf_counter()
+    problem, error = _min_variance_problem(tickers, weights, risk_free, risk_free_type, liquidity_factor,
+                                           labels_override, alignment, align_window, cov_estimator, factors,
+                                           method=method)
+    if error:
+        return None, error
+    num_points = int(np.clip(num_points, 2, 5000))
+    batch_size = max(1, int(batch_size))
+    setup = time.perf_counter() - t0    # moments and the min-variance solve
+    return _frontier_messages(problem, t0, setup, num_points, batch_size), None
+
+
+def _frontier_messages(problem, t0, setup, num_points, batch_size):
+    """
+    Messages, in order:
+
+      * "min_variance": the min-variance summary of the buffered endpoint, plus its point;
+      * "max_sharpe": the tangency portfolio;
+      * "seeds": the pure single-asset portfolios (assets with a non-negative
+        mean) that the buffered frontier is seeded with;
+      * "corner": each corner portfolio of the critical line as soon as it is found;
+      * "discard_corners": only if the critical line fails after some corners
+        were sent; drop them, the points that follow come from the SLSQP sweep;
+      * "points": frontier points in batches, coarse to fine over the same
+        target grid as the buffered endpoint, each with its grid `index`;
+      * "summary": counts and timings (or "error" if the frontier breaks down).
+
+    Together, the "min_variance" point, the seeds and the points are the
+    buffered endpoint's frontier, which drops exact duplicates among them.
+
+    Work only happens while the consumer asks for the next message: when the
+    client disconnects, the server closes the generator at its current yield
+    and no further corners or points are solved.
+    """
+    tickers, mu, qp, bounds = problem["tickers"], problem["mu"], problem["qp"], problem["bounds"]
+    mu_arr = mu.to_numpy()
+    lb, ub = (np.array(b) for b in zip(*bounds))
+    timings = {}
+    counts = {"seeds": 0, "corners": 0, "points": 0, "messages": 0}
+    outcome = "cancelled"
+
+    def timed(stage, fn, *args):
+        t = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - t
+
+    def message(msg):
+        counts["messages"] += 1
+        return msg
+
+    try:
+        yield message({"type": "min_variance", **_min_variance_summary(problem),
+                       "tickers": tickers, "point": _points(problem["w_star"][None, :], mu_arr, qp)})
+        first_message = time.perf_counter() - t0
+
+        max_sharpe, tan_error = timed("tangency", _max_sharpe_problem, problem)
+        yield message({"type": "max_sharpe", "max_sharpe_portfolio": max_sharpe, "max_sharpe_error": tan_error})
+
+        # --- the same pure-asset seed points as _frontier_columns ---
+        seeds = np.eye(len(tickers))[np.flatnonzero(mu_arr >= 0)]
+        counts["seeds"] = len(seeds)
+        yield message({"type": "seeds", **_points(seeds, mu_arr, qp)})
+
+        # --- corners as the critical line finds them ---
+        corners = []
+        cla = _iter_critical_line(mu_arr, qp.Sigma, lb, ub)
+        try:
+            while True:
+                c = timed("corners", next, cla, None)
+                if c is None:
+                    break
+                corners.append(c)
+                counts["corners"] += 1
+                yield message({"type": "corner", "lambda": c["lambda"],
+                               **_points(c["weights"][None, :], mu_arr, qp)})
+        except (np.linalg.LinAlgError, ValueError, RuntimeError) as e:
+            _count("solver_failures_total", solver="critical_line")
+            if corners:
+                # the frontier below comes from the sweep: the corners already sent no longer apply
+                yield message({"type": "discard_corners", "count": len(corners),
+                               "reason": f"Critical line failed ({e}); falling back to SLSQP."})
+            corners = []
+        method = "critical_line" if corners else "slsqp"
+
+        # --- frontier points, coarse to fine ---
+        if corners:
+            ret_lo, ret_hi = corners[-1]["return"], corners[0]["return"]
+            targets = np.linspace(max(0, ret_lo), ret_hi, num_points)
+            inside = (targets >= ret_lo) & (targets <= ret_hi)
+        else:
+            targets = np.linspace(max(0, mu_arr.min()), mu_arr.max(), num_points)
+        solved = {}
+        for level, (stride, idx) in enumerate(_refinement_levels(num_points)):
+            for batch in np.array_split(idx, -(-idx.size // batch_size)):
+                if corners:
+                    batch = batch[inside[batch]]
+                    W = timed("frontier", _interpolate_frontier, corners, targets[batch])
+                else:
+                    batch, W = timed("frontier", _sweep_points, qp, targets, batch, solved,
+                                     problem["w_star"], bounds)
+                if not batch.size:
+                    continue
+                counts["points"] += int(batch.size)
+                yield message({"type": "points", "level": level, "stride": int(stride),
+                               "index": batch, **_points(W, mu_arr, qp)})
+
+        outcome = "complete"
+        yield message({
+            "type": "summary",
+            "method": method,
+            "num_points": num_points,
+            **counts,
+            "setup_ms": round(setup * 1e3, 2),
+            "first_message_ms": round(first_message * 1e3, 2),
+            "elapsed_ms": round((time.perf_counter() - t0) * 1e3, 2),
+            "timings_ms": {k: round(v * 1e3, 2) for k, v in timings.items()},
+        })
+    except GeneratorExit:
+        logging.info("Frontier stream closed by the client after %d messages.", counts["messages"])
+        raise
+    except Exception as e:
+        outcome = "error"
+        logging.exception("Frontier stream failed")
+        yield {"type": "error", "error": f"An error occurred: {str(e)}"}
+    finally:
+        # the tangency solve is already timed by its own stage
+        for stage in ("corners", "frontier"):
+            if stage in timings:
+                _observe("stage_duration_seconds", timings[stage], stage=stage, route=_route())
+        _count("frontier_streams_total", outcome=outcome)
@@ -0,0 +1,358 @@
+import time
+import numpy as np
+from scipy import sparse
+from scipy.optimize import OptimizeResult, linprog
+from scipy.stats import norm
+from utils.qpCore import PortfolioQP
+from utils.returnsPanel import _panel_matrix
+from utils.returnsCodec import _days_to_dates
+from utils.bulkReads import MissingTickersError
+from utils.getEfficientFrontier import _frontier_columns
+from utils.getOptimalPortfolio import _liquid_mask_from_labels, _liquidity_target
+from utils.instrumentation import _stage, _record_solve
+
+try:
+    import highspy
+except ImportError:    # optional: without it every frontier target is a fresh linprog solve
+    highspy = None
+
+TAIL_CONFIDENCES = (0.95, 0.99)
+# Each mean-CVaR frontier point is one LP over every scenario
+MEAN_CVAR_MAX_POINTS = 50
+
+
+def _tail_count(T, alpha):
+    """Scenarios in the (1 - alpha) tail of T: ceil((1 - alpha) T), at least one."""
+    return max(1, int(np.ceil(round((1.0 - alpha) * T, 9))))
+
+
+def _historical_tail(X, W, alphas):
+    """
+    One-day historical VaR and CVaR (as positive losses) of every row of W
+    over the scenarios in X, for each confidence in `alphas`. Portfolio
+    returns come from one (K, n) x (n, T) product, laid out so each
+    portfolio's scenarios are contiguous; a single np.partition on all tail
+    sizes then puts each k-th worst return in place with the k worst in front
+    of it, so VaR is that order statistic and CVaR the mean of the entries
+    before it. O(T K) after the product, no full sort.
+    Returns (var, cvar), each of shape (len(alphas), K).
+    """
+    P = W @ X.T
+    ks = [_tail_count(P.shape[1], a) for a in alphas]
+    kth = sorted(set(k - 1 for k in ks))
+    part = np.partition(P, kth, axis=1)
+    worst = np.cumsum(part[:, :kth[-1] + 1], axis=1)
+    var = np.array([-part[:, k - 1] for k in ks])
+    cvar = np.array([-worst[:, k - 1] / k for k in ks])
+    return var, cvar
+
+
+def _parametric_tail(mu_p, sigma_p, alphas):
+    """
+    One-day Gaussian VaR and CVaR (positive losses) from each portfolio's daily
+    mean and volatility. Returns (var, cvar), each of shape (len(alphas), K).
+    """
+    a = np.asarray(alphas, dtype=float)[:, None]
+    z = norm.ppf(a)
+    var = z * sigma_p - mu_p
+    cvar = norm.pdf(z) / (1.0 - a) * sigma_p - mu_p
+    return var, cvar
+
+
+def _tail_columns(X, W, mu, qp, alphas):
+    """Historical and parametric VaR/CVaR of every row of W, as (len(alphas), K) arrays."""
+    h_var, h_cvar = _historical_tail(X, W, alphas)
+    p_var, p_cvar = _parametric_tail(W @ mu, np.sqrt(np.maximum(qp.variances(W), 0.0)), alphas)
+    return {
+        "confidence": list(alphas),
+        "historical_var": h_var,
+        "historical_cvar": h_cvar,
+        "parametric_var": p_var,
+        "parametric_cvar": p_cvar,
+    }
+
+
+def _tail_records(columns, j=0):
+    """Column j of `_tail_columns` as one record per confidence, in percent."""
+    return [
+        {"confidence": a, **{k: round(float(columns[k][i, j]) * 100, 4)
+                             for k in ("historical_var", "historical_cvar", "parametric_var", "parametric_cvar")}}
+        for i, a in enumerate(columns["confidence"])
+    ]
+
+
+def _check_confidences(alphas):
+    """Confidence levels as a tuple of floats in (0.5, 1). Returns (alphas, error)."""
+    if isinstance(alphas, (int, float)):
+        alphas = [alphas]
+    alphas = tuple(float(a) for a in alphas or TAIL_CONFIDENCES)
+    if any(not 0.5 < a < 1.0 for a in alphas):
+        return None, "confidence levels must lie between 0.5 and 1 (e.g. 0.95)."
+    return alphas, None
+
+
+def _tail_returns(tickers, window):
+    """
+    Scenario matrix for the tail-risk endpoints: the tickers' shared daily
+    returns, the last `window` days if given.
+    Returns ((days, X), None) or (None, (error, status)).
+    """
+    if window is not None and int(window) < 2:
+        return None, ({"error": "window must be at least 2 days."}, 400)
+    try:
+        days, X = _panel_matrix(tickers, window=window)
+    except MissingTickersError as e:
+        return None, e.to_response()
+    if X.shape[0] < 2:
+        return None, ({"error": f"Not enough shared history: {X.shape[0]} days."}, 400)
+    return (days, X), None
+
+
+def _get_tail_risk(tickers, weights=None, alphas=TAIL_CONFIDENCES, window=None,
+                   include_frontier=False, num_points=100):
+    """
+    Historical and parametric one-day VaR/CVaR of a portfolio over the tickers'
+    shared daily returns (all of them, or the last `window` days). `weights`
+    maps tickers to weights, normalized to sum to 1; equal weights when empty.
+    With `include_frontier` the long-only efficient frontier of the same
+    returns is built and every point is evaluated in the same product.
+    Returns (payload, status).
+    """
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers:
+        return {"error": "Insufficient number of tickers"}, 400
+    alphas, error = _check_confidences(alphas)
+    if error:
+        return {"error": error}, 400
+    loaded, error = _tail_returns(tickers, window)
+    if error:
+        return error
+    days, X = loaded
+
+    w = np.array([float((weights or {}).get(t, 0.0)) for t in tickers])
+    if w.sum() <= 0:
+        w = np.ones(len(tickers))
+    w = w / w.sum()
+
+    mu = X.mean(axis=0)
+    Sigma = np.cov(X, rowvar=False).reshape(len(tickers), len(tickers))
+    qp = PortfolioQP(Sigma, mu)
+
+    frontier = None
+    W = w[None, :]
+    if include_frontier and len(tickers) > 1:
+        with _stage("frontier"):
+            frontier = _frontier_columns(tickers, mu, Sigma, None, num_points, qp=qp)
+        W = np.vstack([W, frontier["weights"]])
+
+    with _stage("tail_risk"):
+        columns = _tail_columns(X, W, mu, qp, alphas)
+
+    dates = _days_to_dates(days[[0, -1]]).astype(str)
+    payload = {
+        "tickers": tickers,
+        "observations": int(X.shape[0]),
+        "start": dates[0],
+        "end": dates[1],
+        "confidence": list(alphas),
+        "portfolio": {
+            "weights": {t: np.float64(w[j]) for j, t in enumerate(tickers)},
+            "Return": round(((1 + float(w @ mu))**252 - 1) * 100, 2),
+            "Risk": round(float(qp.risk(w)) * np.sqrt(252) * 100, 2),
+            "tail": _tail_records(columns),
+        },
+    }
+    if frontier is not None:
+        # columnar, daily fractions: one row per confidence, one column per frontier point
+        payload["frontier"] = {**frontier, **{k: v[:, 1:] for k, v in columns.items() if k != "confidence"}}
+    return payload, 200
+
+
+# --- mean-CVaR (Rockafellar-Uryasev linear program) ---
+
+def _mean_cvar_lp(X, alpha, m_liq=None, t_liq=None, max_weight=1.0):
+    """
+    min  zeta + 1 / ((1 - alpha) T) * sum(u)
+    s.t. u_t >= -x_t . w - zeta,  u >= 0,  sum(w) = 1,  0 <= w <= max_weight,
+         mu . w >= target (row 0 of A_ub, set per solve),  m_liq . w >= t_liq.
+    Variables [w (n), zeta, u (T)]. Only the n scenario columns are dense: the
+    u block is an identity, so the constraint matrix has T (n + 2) nonzeros.
+    At the optimum zeta is the portfolio's VaR and the objective its CVaR.
+    Returns the linprog arguments, b_ub[0] at min(mu) (never binding) until a target is set.
+    """
+    T, n = X.shape
+    c = np.concatenate([np.zeros(n), [1.0], np.full(T, 1.0 / ((1.0 - alpha) * T))])
+    mu = X.mean(axis=0)
+    rows = [sparse.hstack([sparse.csr_matrix(-mu[None, :]), sparse.csr_matrix((1, 1 + T))])]
+    b_ub = [-mu.min()]
+    if t_liq is not None:
+        rows.append(sparse.hstack([sparse.csr_matrix(-m_liq[None, :]), sparse.csr_matrix((1, 1 + T))]))
+        b_ub.append(-t_liq)
+    rows.append(sparse.hstack([sparse.csr_matrix(-X), sparse.csr_matrix(-np.ones((T, 1))), -sparse.identity(T)]))
+    b_ub = np.concatenate([b_ub, np.zeros(T)])
+    A_eq = sparse.hstack([sparse.csr_matrix(np.ones((1, n))), sparse.csr_matrix((1, 1 + T))]).tocsr()
+    bounds = [(0.0, max_weight)] * n + [(None, None)] + [(0.0, None)] * T
+    return {"c": c, "A_ub": sparse.vstack(rows).tocsr(), "b_ub": b_ub, "A_eq": A_eq, "b_eq": [1.0], "bounds": bounds}
+
+
+def _solve_mean_cvar(lp, target=None):
+    """One HiGHS solve of `_mean_cvar_lp`, with mu . w >= target when given."""
+    b_ub = lp["b_ub"].copy()
+    if target is not None:
+        b_ub[0] = -target
+    res = linprog(lp["c"], A_ub=lp["A_ub"], b_ub=b_ub, A_eq=lp["A_eq"], b_eq=lp["b_eq"],
+                  bounds=lp["bounds"], method="highs")
+    _record_solve("mean_cvar", res)
+    return res
+
+
+def _highs_model(lp):
+    """
+    `_mean_cvar_lp` as one highspy model, rows as lower <= A x <= upper
+    (the inequalities, then the budget). Only row 0's bound changes between
+    frontier targets, so every re-solve starts from the previous optimal basis.
+    """
+    inf = highspy.kHighsInf
+    A = sparse.vstack([lp["A_ub"], lp["A_eq"]]).tocsc()
+    model = highspy.HighsLp()
+    model.num_col_, model.num_row_ = A.shape[1], A.shape[0]
+    model.col_cost_ = lp["c"]
+    model.col_lower_ = np.array([-inf if lo is None else lo for lo, _ in lp["bounds"]])
+    model.col_upper_ = np.array([inf if hi is None else hi for _, hi in lp["bounds"]])
+    model.row_lower_ = np.concatenate([np.full(lp["A_ub"].shape[0], -inf), lp["b_eq"]])
+    model.row_upper_ = np.concatenate([lp["b_ub"], lp["b_eq"]])
+    model.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+    model.a_matrix_.start_, model.a_matrix_.index_, model.a_matrix_.value_ = A.indptr, A.indices, A.data
+    h = highspy.Highs()
+    h.setOptionValue("output_flag", False)
+    h.passModel(model)
+    return h
+
+
+def _mean_cvar_frontier(lp, targets, progress=None):
+    """
+    Min-CVaR solves of `lp` at each target return, in order. With highspy the
+    model is built once and warm-started from target to target (a few simplex
+    iterations each); without it each target is a separate linprog call.
+    Returns a list of OptimizeResult (x, fun, success, nit).
+    """
+    h = _highs_model(lp) if highspy is not None else None
+    results = []
+    for k, t in enumerate(targets):
+        if progress is not None:
+            progress(k, len(targets))
+        if h is None:
+            results.append(_solve_mean_cvar(lp, t))
+            continue
+        h.changeRowBounds(0, -highspy.kHighsInf, -t)
+        h.run()
+        ok = h.getModelStatus() == highspy.HighsModelStatus.kOptimal
+        info = h.getInfo()
+        res = OptimizeResult(x=np.array(h.getSolution().col_value) if ok else None,
+                             fun=info.objective_function_value if ok else None,
+                             success=ok, nit=info.simplex_iteration_count)
+        _record_solve("mean_cvar", res)
+        results.append(res)
+    if progress is not None:
+        progress(len(targets), len(targets))
+    return results
+
+
+def _max_return(mu, m_liq, t_liq, max_weight):
+    """Highest daily mean return a long-only portfolio reaches under the weight cap and liquid-share target."""
+    n = mu.size
+    res = linprog(-mu, A_ub=None if t_liq is None else -m_liq[None, :], b_ub=None if t_liq is None else [-t_liq],
+                  A_eq=np.ones((1, n)), b_eq=[1.0], bounds=[(0.0, max_weight)] * n, method="highs")
+    return -float(res.fun) if res.success else float(mu.max())
+
+
+def _get_mean_cvar_portfolio(tickers, alpha=0.95, target_return=None, liquidity_factor=None,
+                             labels_override=None, window=None, max_weight=1.0, num_points=0,
+                             progress=None):
+    """
+    Long-only portfolio with the lowest historical CVaR at confidence `alpha`
+    over the tickers' shared daily returns, optionally subject to an annual
+    return target (percent) and the liquid-share target. `num_points` adds a
+    mean-CVaR frontier from that portfolio's return to the highest reachable
+    one, one LP per point. optimal_var / optimal_cvar are the LP's values,
+    whose tail holds exactly (1 - alpha) T scenarios; "tail" gives the
+    order-statistic figures of _get_tail_risk, equal when that is whole.
+    Returns (payload, status).
+    """
+    tickers = list(dict.fromkeys(tickers))
+    if len(tickers) < 2:
+        return {"error": "Insufficient number of tickers"}, 400
+    alphas, error = _check_confidences(alpha)
+    if error or len(alphas) != 1:
+        return {"error": error or "alpha must be a single confidence level."}, 400
+    alpha = alphas[0]
+    max_weight = float(max_weight)
+    if not 1.0 / len(tickers) <= max_weight <= 1.0:
+        return {"error": f"maxWeight must lie between 1/{len(tickers)} and 1."}, 400
+    num_points = min(max(int(num_points or 0), 0), MEAN_CVAR_MAX_POINTS)
+    loaded, error = _tail_returns(tickers, window)
+    if error:
+        return error
+    days, X = loaded
+
+    m_liq = _liquid_mask_from_labels(tickers, labels_override or {})
+    t_liq, error = _liquidity_target(liquidity_factor, m_liq)
+    if error:
+        return {"error": error}, 400
+    target = None if target_return is None else (1 + float(target_return) / 100.0) ** (1 / 252) - 1
+
+    with _stage("mean_cvar"):
+        lp = _mean_cvar_lp(X, alpha, m_liq, t_liq, max_weight)
+        t0 = time.perf_counter()
+        res = _solve_mean_cvar(lp, target)
+        seconds = time.perf_counter() - t0
+    if res.status == 2:
+        return {"error": "No portfolio meets the return and liquidity targets."}, 400
+    if not res.success:
+        return {"error": f"HiGHS failed: {res.message}"}, 400
+
+    n = len(tickers)
+    w = np.clip(res.x[:n], 0.0, None)
+    w /= w.sum()
+    mu = X.mean(axis=0)
+    qp = PortfolioQP(np.cov(X, rowvar=False), mu)
+    with _stage("tail_risk"):
+        columns = _tail_columns(X, w[None, :], mu, qp, (alpha,))
+
+    dates = _days_to_dates(days[[0, -1]]).astype(str)
+    payload = {
+        "tickers": tickers,
+        "observations": int(X.shape[0]),
+        "start": dates[0],
+        "end": dates[1],
+        "confidence": alpha,
+        "target_return": None if target_return is None else float(target_return),
+        "liquid_target_min": None if t_liq is None else round(t_liq * 100, 2),
+        "optimal_weights": {t: np.float64(w[j]) for j, t in enumerate(tickers)},
+        "optimal_return": round(((1 + float(w @ mu))**252 - 1) * 100, 2),
+        "optimal_risk": round(float(qp.risk(w)) * np.sqrt(252) * 100, 2),
+        "optimal_var": round(float(res.x[n]) * 100, 4),
+        "optimal_cvar": round(float(res.fun) * 100, 4),
+        "liquid_share_achieved": round(float(w @ m_liq) * 100, 2),
+        "tail": _tail_records(columns),
+        "solver": {"method": "highs", "iterations": int(getattr(res, "nit", 0)),
+                   "seconds": round(seconds, 4), "variables": int(lp["c"].size),
+                   "constraints": int(lp["A_ub"].shape[0] + 1), "nonzeros": int(lp["A_ub"].nnz + n)},
+    }
+
+    # --- mean-CVaR frontier: min-CVaR return up to the best return the constraints allow ---
+    if num_points > 1:
+        top = _max_return(mu, m_liq, t_liq, max_weight)
+        targets = np.linspace(float(w @ mu), max(top, float(w @ mu)), num_points)
+        with _stage("mean_cvar_frontier"):
+            solved = [r for r in _mean_cvar_frontier(lp, targets - 1e-12 * np.abs(targets), progress) if r.success]
+        W = np.vstack([np.clip(r.x[:n], 0.0, None) for r in solved]) if solved else np.zeros((0, n))
+        cvar = [r.fun for r in solved]
+        payload["frontier"] = {
+            "tickers": tickers,
+            "weights": W,
+            "Return": (1 + W @ mu)**252 - 1,
+            "Risk": np.sqrt(np.maximum(qp.variances(W), 0.0)) * np.sqrt(252),
+            "CVaR": np.array(cvar),     # daily fraction
+        }
+    return payload, 200
@@ -0,0 +1,69 @@
+import numpy as np
+from scipy.optimize import minimize
+from utils.instrumentation import _record_solve
+
+
+def _tangency_portfolio(qp, mu, risk_free, mask=None, target=None, bounds=None):
+    """
+    Long-only max-Sharpe (tangency) portfolio via the convex reformulation:
+
+        min y'Σy  s.t.  (mu - rf)'y = 1,  y >= 0  [, (m - t)'y >= 0]
+
+    then w = y / sum(y). The liquidity share m'w >= t is homogeneous in y, so
+    it stays linear; so do weight bounds lb <= w <= ub (as y - lb*sum(y) >= 0
+    and ub*sum(y) - y >= 0). `mu` and `risk_free` are per-period (daily) values.
+    Returns (weights, error); weights is None when no solution exists.
+    """
+    mu = np.asarray(mu, dtype=np.float64)
+    excess = mu - np.float64(risk_free)
+    if not (excess > 0).any():
+        return None, "No asset has an expected return above the risk-free rate."
+
+    # rescale so y is O(1): (excess / s)'y = 1  with y = s * y_original
+    s = np.abs(excess).max()
+    a = excess / s
+
+    constraints = [{'type': 'eq', 'fun': lambda y: float(a @ y - 1.0), 'jac': lambda y: a}]
+    liquid = mask is not None and target is not None and target > 0
+    if liquid:
+        c = np.asarray(mask, dtype=np.float64) - float(target)
+        constraints.append({'type': 'ineq', 'fun': lambda y: float(c @ y), 'jac': lambda y: c})
+
+    if bounds is not None:
+        lb = np.array([b[0] for b in bounds], dtype=np.float64)
+        ub = np.array([b[1] for b in bounds], dtype=np.float64)
+        n = len(mu)
+        # only the bounds that bind beyond y >= 0, w <= 1
+        G = np.vstack([np.eye(n)[lb > 0] - lb[lb > 0, None], ub[ub < 1, None] - np.eye(n)[ub < 1]])
+        if G.shape[0]:
+            constraints.append({'type': 'ineq', 'fun': lambda y: G @ y, 'jac': lambda y: G})
+
+    # feasible start: equal weight on positive-excess assets, topped up with liquid
+    # names if needed, then scaled onto the excess-return plane
+    y0 = np.where(a > 0, 1.0, 0.0)
+    if liquid:
+        m = np.asarray(mask, dtype=np.float64)
+        if target >= 1.0:
+            y0 = np.where((a > 0) & (m > 0), 1.0, 0.0)
+            if not y0.any():
+                return None, "No liquid asset has an expected return above the risk-free rate."
+        elif -(c @ y0) > 0 and m.sum() > 0:
+            y0 = y0 + m * -(c @ y0) / ((1.0 - target) * m.sum())
+    y0 = y0 / (a @ y0) if a @ y0 > 0 else y0
+
+    res = minimize(
+        qp.objective,
+        y0,
+        jac=qp.objective_grad,
+        method="SLSQP",
+        constraints=constraints,
+        bounds=((0.0, None),) * len(mu),
+        options={"ftol": 1e-12, "disp": False, "maxiter": 1000}
+    )
+    qp.nit += int(getattr(res, "nit", 0))
+    _record_solve("tangency", res)
+    if not res.success or res.x.sum() <= 0:
+        return None, f"Tangency solve failed: {getattr(res, 'message', 'Optimization failed')}"
+
+    y = np.clip(res.x, 0.0, None)
+    return y / y.sum(), None